@@ -0,0 +1,113 @@
+"""Benchmark the CPU profiles of the PyTorch detector.
+
+Reports frames/sec per profile and how far its results drift from the default profile.
+Each profile runs in a fresh process because torch thread settings are process wide.
+
+Run with:
+    python -m benchmarks.bench_detector [--profiles throughput shared] [--images DIR]
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_splitter import make_synthetic_clip
+from grunz.detector import CpuProfile, convert_result, create_detector
+from grunz.json_parser.json_parser import JSONParser
+from grunz.loader.loader import Prefetcher
+from grunz.splitter.splitter import Splitter, SplitterBackend
+
+
+def run_profile(cpu_profile: str, image_paths: list, warmup: int) -> tuple:
+    """:return: (frames/sec, converted results) for one profile."""
+    detector = create_detector(cpu_profile=cpu_profile)
+    # Unreadable images are skipped, so paths are taken from the records that are
+    # loaded.
+    loaded = list(Prefetcher({"file": path} for path in image_paths))
+
+    for _, image in loaded[:warmup]:
+        detector.single_image_detection(image, img_path="warmup")
+
+    start = time.perf_counter()
+    results = [
+        convert_result(detector.single_image_detection(image, img_path=frame["file"]))
+        for frame, image in loaded
+    ]
+    return len(loaded) / (time.perf_counter() - start), results
+
+
+def drift(reference: list, results: list) -> tuple:
+    """:return: (max abs difference in max animal confidence, changed verdicts)."""
+    max_difference, changed = 0.0, 0
+    expected_by_file = {expected["file"]: expected for expected in reference}
+    for actual in results:
+        expected = expected_by_file.get(actual["file"])
+        if expected is None:
+            continue
+        expected_conf = JSONParser.max_animal_confidence(expected["detections"])
+        actual_conf = JSONParser.max_animal_confidence(actual["detections"])
+        max_difference = max(max_difference, abs(expected_conf - actual_conf))
+        changed += JSONParser.is_confidence_rating_minimum_or_above(
+            expected_conf
+        ) != JSONParser.is_confidence_rating_minimum_or_above(actual_conf)
+    return max_difference, changed
+
+
+def synthetic_frames(work_dir: Path, count: int) -> list:
+    clip = work_dir / "PICT0000.AVI"
+    make_synthetic_clip(clip, "1920x1080", duration=count)
+    frames = Splitter(
+        str(clip), work_dir, SplitterBackend.FFMPEG
+    ).export_frames_to_jpeg(1.0)
+    return [frame["file"] for frame in frames]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=[profile.value for profile in CpuProfile],
+        default=[
+            profile.value for profile in CpuProfile if profile is not CpuProfile.DEFAULT
+        ],
+    )
+    parser.add_argument(
+        "--images", help="Directory of JPEG frames. Synthetic frames by default."
+    )
+    parser.add_argument(
+        "--frames", type=int, default=50, help="Number of synthetic frames."
+    )
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.images:
+            image_paths = sorted(
+                str(path) for path in Path(args.images).rglob("*.jp*g")
+            )
+        else:
+            image_paths = synthetic_frames(Path(work_dir), args.frames)
+
+        context = multiprocessing.get_context("spawn")
+        rows = []
+        for cpu_profile in [CpuProfile.DEFAULT.value] + args.profiles:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                future = pool.submit(run_profile, cpu_profile, image_paths, args.warmup)
+                rows.append((cpu_profile, *future.result()))
+
+    reference = rows[0][2]
+    print(f"{'profile':<12}{'frames/s':>10}{'max drift':>11}{'changed':>9}")
+    for cpu_profile, frames_per_second, results in rows:
+        max_difference, changed = drift(reference, results)
+        print(
+            f"{cpu_profile:<12}{frames_per_second:>10.2f}"
+            f"{max_difference:>11.4f}{changed:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
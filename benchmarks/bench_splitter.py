@@ -0,0 +1,80 @@
+"""Benchmark the Splitter backends against each other on synthetic clips.
+
+Run with: python -m benchmarks.bench_splitter [--clips 3] [--duration 60]
+"""
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from moviepy.config import FFMPEG_BINARY
+
+from grunz.splitter.splitter import Splitter, SplitterBackend
+
+
+def make_synthetic_clip(path: Path, size: str, duration: int, rate: int = 25) -> None:
+    """Write an MJPEG AVI of ffmpeg's moving test pattern, like camera trap output."""
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size={size}:rate={rate}:duration={duration}",
+            "-c:v",
+            "mjpeg",
+            "-q:v",
+            "3",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+def time_backend(clips, backend, fps_value, max_size, export_dir) -> tuple:
+    """:return: (seconds, frames) spent splitting every clip with the backend."""
+    frames = 0
+    start = time.perf_counter()
+    for clip in clips:
+        written = Splitter(str(clip), export_dir, backend).export_frames_to_jpeg(
+            fps_value, max_size
+        )
+        frames += len(written)
+        for frame in written:
+            Path(frame["file"]).unlink()
+    return time.perf_counter() - start, frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=3)
+    parser.add_argument("--duration", type=int, default=60, help="Seconds per clip.")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--fps-value", type=float, default=0.4)
+    parser.add_argument("--max-size", type=int, help="Also resize during decode.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        clips = [work_dir / f"PICT{i:04d}.AVI" for i in range(args.clips)]
+        for clip in clips:
+            make_synthetic_clip(clip, args.size, args.duration)
+
+        print(f"{'backend':<10}{'seconds':>10}{'frames':>8}{'frames/s':>10}")
+        for backend in SplitterBackend:
+            seconds, frames = time_backend(
+                clips, backend, args.fps_value, args.max_size, work_dir
+            )
+            print(
+                f"{backend.value:<10}{seconds:>10.2f}"
+                f"{frames:>8}{frames / seconds:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
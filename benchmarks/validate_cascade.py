@@ -0,0 +1,92 @@
+"""Validate a screening cascade band against the full detector.
+
+Scores a validation set with both the screening model and the full model, then
+reports the escalation rate and how often the cascade's verdict matches the full
+model's for each band. Labelled camera trap frames should be used to pick a band;
+synthetic frames only exercise the pipeline.
+
+Run with: python -m benchmarks.validate_cascade --images DIR [--bands 0.5 0.95 0.3 0.98]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_detector import synthetic_frames
+from grunz.detector import (
+    DEFAULT_CASCADE_BAND,
+    MODEL_VERSION,
+    SCREEN_MODEL_VERSION,
+    create_detector,
+    evaluate_cascade,
+)
+from grunz.loader.loader import Prefetcher
+
+
+def score(version: str, loaded: list) -> tuple:
+    """:return: (frames/sec, raw results) for one model version."""
+    detector = create_detector(version=version)
+    start = time.perf_counter()
+    results = [
+        detector.single_image_detection(image, img_path=frame["file"])
+        for frame, image in loaded
+    ]
+    return len(loaded) / (time.perf_counter() - start), results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--images", help="Directory of JPEG frames. Synthetic frames by default."
+    )
+    parser.add_argument(
+        "--frames", type=int, default=50, help="Number of synthetic frames."
+    )
+    parser.add_argument(
+        "--screen", default=SCREEN_MODEL_VERSION, help="Screening model version."
+    )
+    parser.add_argument(
+        "--bands",
+        nargs="+",
+        type=float,
+        default=list(DEFAULT_CASCADE_BAND),
+        help="Pairs of LOW HIGH screening confidences to evaluate.",
+    )
+    args = parser.parse_args()
+    if len(args.bands) % 2:
+        parser.error("--bands takes LOW HIGH pairs")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.images:
+            image_paths = sorted(
+                str(path) for path in Path(args.images).rglob("*.jp*g")
+            )
+        else:
+            image_paths = synthetic_frames(Path(work_dir), args.frames)
+        # Unreadable images are skipped, so paths are taken from the records that are
+        # loaded.
+        loaded = list(Prefetcher({"file": path} for path in image_paths))
+
+        screen_rate, screen_results = score(args.screen, loaded)
+        full_rate, full_results = score(MODEL_VERSION, loaded)
+
+    print(
+        f"screen {args.screen}: {screen_rate:.2f} frames/s, full {MODEL_VERSION}: "
+        f"{full_rate:.2f} frames/s"
+    )
+    print(
+        f"{'band':<12}{'escalated':>10}{'agreement':>11}{'missed':>8}{'frames/s':>10}"
+    )
+    for low, high in zip(args.bands[::2], args.bands[1::2]):
+        report = evaluate_cascade(screen_results, full_results, (low, high))
+        escalated = report["escalation_rate"]
+        cascade_rate = 1 / (1 / screen_rate + escalated / full_rate)
+        print(
+            f"{f'{low}-{high}':<12}{escalated:>10.1%}{report['agreement']:>11.1%}"
+            f"{report['missed_positives']:>8}{cascade_rate:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
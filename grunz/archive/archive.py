@@ -0,0 +1,169 @@
+"""This module handles reading videos straight out of tar and zip archives."""
+
+import logging
+import shutil
+import tarfile
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+    ".zip",
+)
+
+# Separates the archive path from the member path in a video's source.
+MEMBER_SEPARATOR = "!"
+
+# Bytes copied at a time when spooling or extracting a member.
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class Archive:
+    """This class lists and streams the videos of a tar or zip archive without
+    extracting it.
+
+    Members are read in archive order, so a compressed tar is decompressed once
+    rather than once per member.
+    """
+
+    def __init__(self, archive_path: str):
+        self.archive_path = str(archive_path)
+        self.is_zip = self.archive_path.lower().endswith(".zip")
+        self._spooled = {}
+
+    @staticmethod
+    def is_archive(path) -> bool:
+        """
+        :param path: A path given as an input root.
+        :return: True if it is a tar or zip archive.
+        """
+        return Path(path).is_file() and str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+    @staticmethod
+    def is_safe_member(member: str) -> bool:
+        """
+        :return: False for absolute member paths or ones escaping the extraction
+          directory.
+        """
+        member_path = PurePosixPath(member)
+        return not member_path.is_absolute() and ".." not in member_path.parts
+
+    def source(self, member: str) -> str:
+        """
+        :return: The source a member's frames are recorded under, `archive!member`.
+        """
+        return f"{self.archive_path}{MEMBER_SEPARATOR}{member}"
+
+    def list_members(self, extension: str) -> List[str]:
+        """
+        Only the archive's headers are read. Unsafe member paths are logged and skipped.
+        :param extension: A file extension. This is case dependent.
+        :return: A sorted list of the member paths matching the extension.
+        """
+        if self.is_zip:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                names = [
+                    info.filename for info in archive.infolist() if not info.is_dir()
+                ]
+        else:
+            with tarfile.open(self.archive_path) as archive:
+                names = [info.name for info in archive.getmembers() if info.isfile()]
+
+        members = []
+        for name in names:
+            if not name.endswith(f".{extension}"):
+                continue
+            if not Archive.is_safe_member(name):
+                logger.warning("%s has an unsafe path, skipping", self.source(name))
+                continue
+            members.append(name)
+        return sorted(members)
+
+    def member_times(self) -> Dict[str, float]:
+        """
+        :return: The modification time of every member, in seconds since the epoch.
+        """
+        if self.is_zip:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                return {
+                    info.filename: time.mktime(info.date_time + (0, 0, -1))
+                    for info in archive.infolist()
+                }
+        with tarfile.open(self.archive_path) as archive:
+            return {info.name: float(info.mtime) for info in archive.getmembers()}
+
+    def spool_members(self, members: Iterable[str], directory: Path) -> Iterator[str]:
+        """
+        Copies one member at a time into `directory` and removes it once the caller
+        asks for the next, so at most one video is held outside the archive.
+        :param members: The member paths to spool.
+        :param directory: Where members are spooled, ideally scratch.
+        :return: The spooled file path of each member, in archive order.
+        """
+        wanted = set(members)
+        for index, (member, stream) in enumerate(self.__open_members(wanted)):
+            spooled = Path(directory) / f"{index:06d}-{PurePosixPath(member).name}"
+            try:
+                with stream, open(spooled, "wb") as destination:
+                    shutil.copyfileobj(stream, destination, COPY_CHUNK_BYTES)
+                self._spooled[str(spooled)] = member
+                yield str(spooled)
+            finally:
+                self._spooled.pop(str(spooled), None)
+                spooled.unlink(missing_ok=True)
+
+    def member_of(self, spooled_path: str) -> Optional[str]:
+        """
+        :return: The member a currently spooled file holds.
+        """
+        return self._spooled.get(str(spooled_path))
+
+    def extract_members(
+        self, members: Iterable[str], destination_dir: Path, limiter=None
+    ) -> List[Path]:
+        """
+        Extracts only the given members, keeping their paths below `destination_dir`.
+        :param members: The member paths to extract.
+        :param destination_dir: Directory to extract into.
+        :param limiter: A BandwidthLimiter pacing the copy, chunk by chunk.
+        :return: The extracted file paths.
+        """
+        extracted = []
+        for member, stream in self.__open_members(set(members)):
+            if not Archive.is_safe_member(member):
+                logger.warning("%s has an unsafe path, skipping", self.source(member))
+                stream.close()
+                continue
+            destination = Path(destination_dir) / PurePosixPath(member)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with stream, open(destination, "wb") as output:
+                while chunk := stream.read(COPY_CHUNK_BYTES):
+                    output.write(chunk)
+                    if limiter is not None:
+                        limiter.consume(2 * len(chunk))
+            extracted.append(destination)
+        return extracted
+
+    def __open_members(self, wanted: set) -> Iterator[Tuple[str, IO[bytes]]]:
+        if self.is_zip:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for info in archive.infolist():
+                    if info.filename in wanted:
+                        yield info.filename, archive.open(info)
+            return
+
+        # Stream mode reads the tar front to back without seeking.
+        with tarfile.open(self.archive_path, "r|*") as archive:
+            for info in archive:
+                if info.isfile() and info.name in wanted:
+                    yield info.name, archive.extractfile(info)
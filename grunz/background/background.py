@@ -0,0 +1,157 @@
+"""This module handles capping the resources a run takes on a shared machine."""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from grunz.detector import available_core_ids
+
+logger = logging.getLogger(__name__)
+
+# Lowest CPU priority. Children such as ffmpeg inherit it.
+NICENESS = 19
+
+# Lowest best-effort I/O priority. The idle class could starve a run on a busy disk.
+IONICE_ARGS = ("-c", "2", "-n", "7")
+
+# By default a background run keeps to a quarter of the cores.
+DEFAULT_CORE_FRACTION = 4
+
+# Lists one directory per thread of this process on Linux.
+TASK_DIR = Path("/proc/self/task")
+
+
+def _thread_ids() -> List[int]:
+    """
+    :return: The ids of every thread of this process, or just the process id where
+      /proc is not available.
+    """
+    try:
+        return sorted(int(thread_id) for thread_id in os.listdir(TASK_DIR))
+    except OSError:
+        return [os.getpid()]
+
+
+class BandwidthLimiter:
+    """This class paces reads and writes to a number of bytes per second.
+
+    Callers report the bytes they moved and are put to sleep for as long as those
+    bytes take at the cap, so the average rate across all threads stays at or below it.
+    """
+
+    def __init__(self, bytes_per_second: int):
+        self.bytes_per_second = bytes_per_second
+        self.total_bytes = 0
+        self._ready_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, byte_count: int) -> None:
+        """
+        :param byte_count: Bytes just read or written.
+        :return: None, once the cap allows more.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._ready_at = (
+                max(self._ready_at, now) + byte_count / self.bytes_per_second
+            )
+            self.total_bytes += byte_count
+            delay = self._ready_at - now
+        time.sleep(delay)
+
+
+class BackgroundMode:
+    """This class caps the CPU threads, bandwidth and priority of a run.
+
+    The process is pinned to `threads` cores, so decode, ffmpeg and inference threads
+    together never use more, and its CPU and I/O priority is lowered so co-tenants
+    come first. Splitting and copying are paced by a BandwidthLimiter.
+    """
+
+    def __init__(
+        self, threads: Optional[int] = None, bandwidth_bytes: Optional[int] = None
+    ):
+        """
+        :param threads: Maximum number of CPU threads. A quarter of the cores by
+          default.
+        :param bandwidth_bytes: Maximum bytes/sec read and written. Unbounded when None.
+        """
+        cores = available_core_ids()
+        self.threads = min(
+            threads or max(1, len(cores) // DEFAULT_CORE_FRACTION), len(cores)
+        )
+        self.cores = cores[: self.threads]
+        self.limiter = BandwidthLimiter(bandwidth_bytes) if bandwidth_bytes else None
+
+    @property
+    def inference_threads(self) -> int:
+        """Threads left to inference once decoding has its share."""
+        return max(1, self.threads - self.decode_threads)
+
+    @property
+    def decode_threads(self) -> int:
+        """Threads decoding images ahead of inference."""
+        return max(1, self.threads // 4)
+
+    def apply(self) -> None:
+        """
+        Pins every thread of the process to its cores and lowers their CPU and I/O
+        priority. All three are per thread on Linux, so threads already running, such
+        as the BLAS and OpenMP pools numpy and torch start on import, are capped along
+        with the calling thread. Threads and child processes started afterwards
+        inherit the caps.
+        :return: None.
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            logger.warning(
+                "CPU affinity is not supported here, only thread counts are capped"
+            )
+        ionice = shutil.which("ionice")
+        if not ionice:
+            logger.warning("ionice is not available, I/O priority is unchanged")
+
+        # Repeat until no thread is left uncapped, in case one started meanwhile.
+        capped = set()
+        while thread_ids := sorted(set(_thread_ids()) - capped):
+            for thread_id in thread_ids:
+                self.__cap(thread_id)
+            if ionice:
+                subprocess.run(
+                    [ionice, *IONICE_ARGS, "-p", *map(str, thread_ids)], check=False
+                )
+            capped.update(thread_ids)
+
+    def __cap(self, thread_id: int) -> None:
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(thread_id, self.cores)
+            if hasattr(os, "setpriority"):
+                os.setpriority(os.PRIO_PROCESS, thread_id, NICENESS)
+        except ProcessLookupError:
+            pass  # The thread has exited.
+
+    def report(self, frames: int, seconds: float) -> str:
+        """
+        :param frames: Frames scored by the run.
+        :param seconds: Wall-clock duration of the run.
+        :return: The run's throughput against its caps.
+        """
+        frames_per_second = frames / seconds if seconds else 0.0
+        report = (
+            f"Background run: {frames} frames in {seconds:.1f}s, "
+            f"{frames_per_second:.2f} frames/s on a cap of {self.threads} threads "
+            f"({frames_per_second / self.threads:.2f} per thread)"
+        )
+        if self.limiter:
+            megabytes = self.limiter.total_bytes / 2**20
+            rate = megabytes / seconds if seconds else 0.0
+            report += (
+                f", {megabytes:.1f} MiB moved at {rate:.2f} MiB/s "
+                f"on a cap of {self.limiter.bytes_per_second / 2 ** 20:.2f} MiB/s"
+            )
+        return report
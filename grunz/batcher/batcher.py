@@ -0,0 +1,172 @@
+"""This module handles choosing the detection batch size at runtime."""
+
+import logging
+import os
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+# Doubling the batch must cut per-frame latency by at least this fraction to be kept.
+IMPROVEMENT_THRESHOLD = 0.05
+
+
+def current_rss() -> int:
+    """
+    :return: The resident set size of this process in bytes, 0 if it cannot be read.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        # Peak rather than current RSS, reported in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def is_allocation_failure(error: Exception) -> bool:
+    """
+    :param error: An exception raised while scoring a batch.
+    :return: True if it signals that memory could not be allocated.
+    """
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return isinstance(error, RuntimeError) and (
+        "out of memory" in message or "alloc" in message
+    )
+
+
+class AdaptiveBatcher:
+    """This class tunes the detection batch size under memory and latency budgets.
+
+    It starts small and doubles the batch while per-frame latency keeps improving,
+    then settles on the best size seen. It halves the batch whenever RSS exceeds the
+    memory budget, a batch exceeds the latency budget or an allocation fails.
+    Every change is logged so a good size can be pinned with `fixed`.
+    """
+
+    def __init__(
+        self,
+        initial_size: int = 1,
+        max_size: int = 64,
+        memory_budget_bytes: Optional[int] = None,
+        latency_budget: Optional[float] = None,
+        fixed: bool = False,
+    ):
+        """
+        :param initial_size: Batch size to start with.
+        :param max_size: Largest batch size tried.
+        :param memory_budget_bytes: RSS above which the batch size backs off.
+        :param latency_budget: Seconds a single batch may take before the batch size
+          backs off.
+        :param fixed: Keep `initial_size` for the whole run.
+        """
+        self.batch_size = initial_size
+        self.max_size = max_size
+        self.memory_budget_bytes = memory_budget_bytes
+        self.latency_budget = latency_budget
+        self.fixed = fixed
+        self.growing = not fixed
+        self._best_per_frame = None
+        self._best_size = initial_size
+        self._warmed_up = False
+
+    def batches(self, items: Iterable) -> Iterator[List]:
+        """
+        :param items: Anything to be scored.
+        :return: Lists of items, each as long as the batch size when it was started.
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, batch: List, score: Callable[[List], List]) -> List:
+        """
+        Score a batch and adapt the batch size to how long it took. On an allocation
+        failure the batch size backs off and the batch is retried in smaller pieces.
+        :param batch: Items to score.
+        :param score: Scores a list of items, returning one result per item.
+        :return: The results of `score`.
+        """
+        start = time.perf_counter()
+        try:
+            results = score(batch)
+        except Exception as error:
+            if len(batch) == 1 or not is_allocation_failure(error):
+                raise
+            self.growing = False
+            size = max(1, len(batch) // 2)
+            self.__resize(size, f"allocation failure: {error}")
+            return [
+                result
+                for offset in range(0, len(batch), size)
+                for result in self.run(batch[offset : offset + size], score)
+            ]
+
+        self.record(len(batch), time.perf_counter() - start)
+        return results
+
+    def record(self, size: int, seconds: float) -> None:
+        """
+        :param size: Number of items in the batch just scored.
+        :param seconds: Wall-clock time it took.
+        :return: None.
+        """
+        # Partial batches say nothing about the current size, and the first batch pays
+        # for warm-up.
+        if self.fixed or size != self.batch_size:
+            return
+        if not self._warmed_up:
+            self._warmed_up = True
+            return
+
+        per_frame = seconds / size
+        rss = current_rss()
+        if self.memory_budget_bytes and rss > self.memory_budget_bytes:
+            self.growing = False
+            self.__resize(
+                max(1, size // 2), f"RSS of {rss} bytes is over the memory budget"
+            )
+        elif self.latency_budget and seconds > self.latency_budget:
+            self.growing = False
+            self.__resize(
+                max(1, size // 2), f"batch took {seconds:.2f}s, over the latency budget"
+            )
+        elif self.growing:
+            if self._best_per_frame is None or per_frame < self._best_per_frame * (
+                1 - IMPROVEMENT_THRESHOLD
+            ):
+                self._best_per_frame, self._best_size = per_frame, size
+                if size < self.max_size:
+                    self.__resize(
+                        min(self.max_size, size * 2), f"{per_frame * 1000:.1f} ms/frame"
+                    )
+                else:
+                    self.growing = False
+            else:
+                self.growing = False
+                self.__resize(
+                    self._best_size,
+                    f"{per_frame * 1000:.1f} ms/frame is no better than "
+                    f"{self._best_per_frame * 1000:.1f} ms/frame",
+                )
+
+    def __resize(self, size: int, reason: str) -> None:
+        if size != self.batch_size:
+            logger.info(
+                "Detection batch size %d -> %d (%s)", self.batch_size, size, reason
+            )
+        self.batch_size = size
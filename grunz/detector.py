@@ -1,23 +1,692 @@
-"""MegaDetector wrapper using PytorchWildlife."""
+"""MegaDetector wrapper using PytorchWildlife, with an optional ONNX Runtime backend."""
 
+import contextlib
+import logging
+import os
+import re
+from enum import Enum
+from pathlib import Path
+from typing import List, NamedTuple
 
-def create_detector():
+import numpy as np
+from PIL import Image
+
+from grunz.json_parser.json_parser import JSONParser
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = "MDV6-yolov9-c"
+
+# Compact MegaDetectorV6 variant used to screen frames before the full model.
+SCREEN_MODEL_VERSION = "MDV6-yolov10-c"
+
+# Screening scores in [low, high) are too close to ConfidenceRating.MINIMUM to trust.
+DEFAULT_CASCADE_BAND = (0.5, 0.95)
+
+# PytorchWildlife's MegaDetectorV6.IMAGE_SIZE: every image is letterboxed to this
+# size on its longer side.
+DEFAULT_INPUT_SIZE = 1280
+
+# Exported ONNX models are cached here so the export only ever runs once.
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "grunz"
+
+# PytorchWildlife's default detection threshold and the ultralytics NMS defaults.
+DEFAULT_CONF_THRESHOLD = 0.2
+NMS_IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+
+
+class DetectorBackend(Enum):
+    """Inference engines available to run MegaDetector."""
+
+    PYTORCH = "pytorch"
+    ONNX = "onnx"
+
+
+class CpuProfile(Enum):
+    """Optimization profiles for running the PyTorch detector on CPU."""
+
+    DEFAULT = "default"
+    THROUGHPUT = "throughput"
+    SHARED = "shared"
+    BFLOAT16 = "bfloat16"
+    COMPILED = "compiled"
+
+
+class Detections(NamedTuple):
+    """The subset of supervision.Detections that convert_result reads."""
+
+    xyxy: np.ndarray
+    confidence: np.ndarray
+    class_id: np.ndarray
+
+
+def create_detector(
+    backend=DetectorBackend.PYTORCH,
+    quantize=False,
+    cache_dir=None,
+    cpu_profile=CpuProfile.DEFAULT,
+    threads=None,
+    version=MODEL_VERSION,
+):
     """Create and return a MegaDetectorV6 instance.
 
     Weights are downloaded automatically on first invocation.
+
+    The ONNX backend exports the PyTorch model once and caches the artifact in
+    `cache_dir` (~/.cache/grunz by default); later runs load the artifact
+    without touching PyTorch. `quantize` applies int8 dynamic quantization to it.
+    `cpu_profile` tunes the PyTorch backend, see `tune_detector`.
+    `threads` caps the intra-op threads of either backend.
+    `version` selects the MegaDetectorV6 variant.
+    Both backends expose `single_image_detection(img, img_path=None)`.
     """
+    if DetectorBackend(backend) is DetectorBackend.ONNX:
+        cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        return OnnxDetector(
+            _cached_onnx_model(cache_dir, quantize, version), threads=threads
+        )
+
     from PytorchWildlife.models import detection as pw_detection
 
-    return pw_detection.MegaDetectorV6(version="MDV6-yolov9-c")
+    detector = pw_detection.MegaDetectorV6(version=version)
+    if CpuProfile(cpu_profile) is not CpuProfile.DEFAULT:
+        return tune_detector(detector, cpu_profile, threads)
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+    return detector
+
+
+def available_core_ids() -> List[int]:
+    """Return the ids of the cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cores() -> int:
+    """Return the number of cores this process may run on."""
+    return len(available_core_ids())
+
+
+def cpu_profile_settings(cpu_profile, cores=None) -> dict:
+    """Return the torch settings a CpuProfile stands for.
+
+    "throughput" gives inference every core, "shared" only half so splitting and
+    prefetching threads are not oversubscribed. "bfloat16" and "compiled" build on
+    "throughput" with bfloat16 autocast and torch.compile respectively.
+    """
+    cpu_profile = CpuProfile(cpu_profile)
+    if cpu_profile is CpuProfile.DEFAULT:
+        return {}
+
+    cores = cores or available_cores()
+    settings = {
+        "intra_op_threads": cores,
+        "inter_op_threads": 1,
+        "inference_mode": True,
+        "channels_last": True,
+        "bfloat16": cpu_profile is CpuProfile.BFLOAT16,
+        "compile": cpu_profile is CpuProfile.COMPILED,
+    }
+    if cpu_profile is CpuProfile.SHARED:
+        settings["intra_op_threads"] = max(1, cores // 2)
+    return settings
+
+
+def tune_detector(pw_model, cpu_profile, cores=None):
+    """Apply a CpuProfile to a PytorchWildlife detector.
+
+    Thread counts are process wide. Layout, precision and compilation are applied
+    to the torch network in place, and the returned detector runs every
+    detection under the profile's inference mode guard.
+    """
+    import torch
+
+    settings = cpu_profile_settings(cpu_profile, cores)
+    if not settings:
+        return pw_model
+
+    torch.set_num_threads(settings["intra_op_threads"])
+    try:
+        torch.set_num_interop_threads(settings["inter_op_threads"])
+    except RuntimeError:
+        logger.warning("Inter-op threads were already fixed for this process")
+
+    owner, name = _network_owner(pw_model)
+    network = getattr(owner, name)
+    if settings["channels_last"]:
+        network = network.to(memory_format=torch.channels_last)
+    if settings["bfloat16"]:
+        network = _bfloat16_network(network)
+    if settings["compile"]:
+        network = torch.compile(network)
+    setattr(owner, name, network)
+
+    logger.info(
+        "Detector tuned with the %s CPU profile: %s",
+        CpuProfile(cpu_profile).value,
+        settings,
+    )
+    return TunedDetector(pw_model, settings["inference_mode"])
+
+
+def _bfloat16_network(network):
+    """Wrap a torch network to run under bfloat16 autocast and return float32."""
+    import torch
+
+    class Bfloat16Network(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def __getattr__(self, name):
+            try:
+                return super().__getattr__(name)
+            except AttributeError:
+                return getattr(self.inner, name)
+
+        def forward(self, *args, **kwargs):
+            with torch.autocast("cpu", dtype=torch.bfloat16):
+                output = self.inner(*args, **kwargs)
+            return _to_float32(output)
+
+    return Bfloat16Network(network)
+
+
+def _to_float32(output):
+    if isinstance(output, (list, tuple)):
+        return type(output)(_to_float32(item) for item in output)
+    return output.float() if hasattr(output, "float") else output
+
+
+class TunedDetector:
+    """This class runs a PytorchWildlife detector under a CpuProfile's inference guard.
+
+    Every other attribute is delegated to the wrapped detector.
+    """
+
+    def __init__(self, detector, inference_mode: bool):
+        self.detector = detector
+        self.inference_mode = inference_mode
+
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
+
+    def _guard(self):
+        import torch
+
+        return (
+            torch.inference_mode() if self.inference_mode else contextlib.nullcontext()
+        )
+
+    def single_image_detection(self, *args, **kwargs):
+        with self._guard():
+            return self.detector.single_image_detection(*args, **kwargs)
+
+    def batch_image_detection(self, *args, **kwargs):
+        with self._guard():
+            return self.detector.batch_image_detection(*args, **kwargs)
+
+
+def _network_owner(pw_model):
+    """Return (owner, attribute) of the torch network inside a PytorchWildlife model."""
+    owner = (
+        pw_model if getattr(pw_model, "model", None) is not None else pw_model.predictor
+    )
+    # ultralytics wraps the network in an AutoBackend exposing it as `.model`.
+    if getattr(owner.model, "model", None) is not None:
+        owner = owner.model
+    return owner, "model"
+
+
+def _cached_onnx_model(
+    cache_dir: Path, quantize: bool, version: str = MODEL_VERSION
+) -> Path:
+    """Return the cached ONNX artifact, exporting and quantizing it on first use.
+
+    Artifacts are named after the model version and the input size they were
+    exported at, e.g. MDV6-yolov9-c-1280.onnx.
+    """
+    onnx_path = _cached_onnx_path(cache_dir, version)
+    if onnx_path is None:
+        from PytorchWildlife.models import detection as pw_detection
+
+        pw_model = pw_detection.MegaDetectorV6(version=version)
+        onnx_path = cache_dir / f"{version}-{detector_input_size(pw_model)}.onnx"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        logger.info("Exporting %s to %s", version, onnx_path)
+        partial_path = onnx_path.with_suffix(".partial")
+        export_onnx(pw_model, partial_path)
+        partial_path.replace(onnx_path)
+
+    if not quantize:
+        return onnx_path
+
+    int8_path = cache_dir / f"{onnx_path.stem}.int8.onnx"
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantizing %s to %s", onnx_path, int8_path)
+        partial_path = int8_path.with_suffix(".partial")
+        quantize_dynamic(str(onnx_path), str(partial_path), weight_type=QuantType.QInt8)
+        partial_path.replace(int8_path)
+    return int8_path
+
+
+def _cached_onnx_path(cache_dir: Path, version: str = MODEL_VERSION):
+    """Return the ONNX artifact exported for `version`, or None before the export."""
+    pattern = re.compile(rf"{re.escape(version)}-\d+\.onnx")
+    if not cache_dir.is_dir():
+        return None
+    for path in sorted(cache_dir.iterdir()):
+        if pattern.fullmatch(path.name):
+            return path
+    return None
+
+
+def export_onnx(pw_model, onnx_path: Path, image_size: int = None) -> None:
+    """Export the torch module behind a PytorchWildlife YOLO detector to ONNX.
+
+    The exported graph takes a float32 NCHW batch of letterboxed images in
+    [0, 1] and returns the raw (batch, 4 + classes, anchors) head output.
+    Its input is fixed at `image_size`, by default the size the PyTorch model
+    itself letterboxes to, so `OnnxDetector` reads the size back from the graph.
+    """
+    import torch
 
+    image_size = image_size or detector_input_size(pw_model)
 
-def convert_result(pw_result):
+    module = getattr(*_network_owner(pw_model))
+
+    class _HeadOutput(torch.nn.Module):
+        def __init__(self, network):
+            super().__init__()
+            self.network = network
+
+        def forward(self, images):
+            output = self.network(images)
+            return output[0] if isinstance(output, (list, tuple)) else output
+
+    wrapper = _HeadOutput(module).float().eval()
+    with torch.inference_mode():
+        torch.onnx.export(
+            wrapper,
+            torch.zeros(1, 3, image_size, image_size),
+            str(onnx_path),
+            input_names=["images"],
+            output_names=["output"],
+            dynamic_axes={"images": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=17,
+        )
+
+
+def letterbox_image(image: np.ndarray, size: int):
+    """Fit an RGB image onto a size x size canvas the way ultralytics does.
+
+    :return: A (1, 3, size, size) float32 tensor and the letterbox mapping canvas
+      pixels back to image pixels.
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    pad_x = round((size - new_width) / 2 - 0.1)
+    pad_y = round((size - new_height) / 2 - 0.1)
+
+    if (new_width, new_height) != (width, height):
+        image = np.asarray(
+            Image.fromarray(image).resize((new_width, new_height), Image.BILINEAR)
+        )
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y : pad_y + new_height, pad_x : pad_x + new_width] = image
+
+    tensor = canvas.transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0
+    letterbox = {
+        "scale": [new_width / width, new_height / height],
+        "pad": [pad_x, pad_y],
+    }
+    return tensor, letterbox
+
+
+def _non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float):
+    """Greedy NMS. Returns the indices of kept boxes, highest score first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        width = np.clip(
+            np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None
+        )
+        height = np.clip(
+            np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None
+        )
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def decode_yolo_output(
+    output: np.ndarray,
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = NMS_IOU_THRESHOLD,
+    max_detections: int = MAX_DETECTIONS,
+) -> Detections:
+    """Turn one image's raw (4 + classes, anchors) YOLO head output into detections.
+
+    NMS-free heads such as YOLOv10's already output (detections, 6) rows of
+    [x1, y1, x2, y2, conf, class], which are only thresholded.
+    Boxes are returned as xyxy in canvas pixels.
+    """
+    if output.ndim == 2 and output.shape[1] == 6:
+        rows = output[output[:, 4] > conf_threshold][:max_detections]
+        return Detections(rows[:, :4], rows[:, 4], rows[:, 5].astype(int))
+
+    scores = output[4:].T
+    class_id = scores.argmax(axis=1)
+    confidence = scores[np.arange(len(scores)), class_id]
+
+    keep = confidence > conf_threshold
+    cx, cy, w, h = output[:4, keep]
+    xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    confidence, class_id = confidence[keep], class_id[keep]
+
+    # Offsetting boxes per class stops NMS from suppressing across classes.
+    offset = class_id[:, np.newaxis] * 7680.0
+    keep = _non_max_suppression(xyxy + offset, confidence, iou_threshold)[
+        :max_detections
+    ]
+    return Detections(xyxy[keep], confidence[keep], class_id[keep])
+
+
+class OnnxDetector:
+    """This class runs MegaDetector through ONNX Runtime on CPU.
+
+    Results have the same shape as PytorchWildlife's so `convert_result` is unchanged.
+    Images are letterboxed to the square input size the graph was exported at.
+    """
+
+    def __init__(
+        self,
+        onnx_path,
+        conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+        threads: int = None,
+    ):
+        import onnxruntime
+
+        self.conf_threshold = conf_threshold
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(onnx_path), options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.IMAGE_SIZE = model_input.shape[-1]
+        if not isinstance(self.IMAGE_SIZE, int):
+            raise ValueError(f"{onnx_path} has no fixed input size")
+
+    def single_image_detection(self, img, img_path=None, det_conf_thres=None):
+        """
+        :param img: An RGB array, or a path to an image.
+        :param img_path: Reported as "img_id". Defaults to `img` when it is a path.
+        :param det_conf_thres: Minimum confidence kept. Defaults to 0.2 like
+          PytorchWildlife.
+        :return: {"img_id": ..., "detections": Detections} in image pixels.
+        """
+        return self.detect_batch([img], [img_path], det_conf_thres)[0]
+
+    def detect_batch(self, images, img_paths, det_conf_thres=None):
+        """
+        Score several images in a single ONNX Runtime call.
+        :param images: RGB arrays, or paths to images.
+        :param img_paths: Reported as "img_id", one per image.
+        :param det_conf_thres: Minimum confidence kept. Defaults to 0.2 like
+          PytorchWildlife.
+        :return: One {"img_id": ..., "detections": Detections} per image, in image
+          pixels.
+        """
+        if det_conf_thres is None:
+            det_conf_thres = self.conf_threshold
+
+        img_ids, arrays, tensors, letterboxes = [], [], [], []
+        for image, img_path in zip(images, img_paths):
+            if isinstance(image, (str, Path)):
+                img_path = img_path or str(image)
+                with Image.open(image) as opened:
+                    image = np.asarray(opened.convert("RGB"))
+            tensor, letterbox = letterbox_image(image, self.IMAGE_SIZE)
+            img_ids.append(img_path)
+            arrays.append(image)
+            tensors.append(tensor)
+            letterboxes.append(letterbox)
+
+        outputs = self.session.run(None, {self.input_name: np.concatenate(tensors)})[0]
+
+        results = []
+        for img_id, array, output, letterbox in zip(
+            img_ids, arrays, outputs, letterboxes
+        ):
+            detections = decode_yolo_output(output, det_conf_thres)
+            (scale_x, scale_y), (pad_x, pad_y) = letterbox["scale"], letterbox["pad"]
+            height, width = array.shape[:2]
+            xyxy = (detections.xyxy - [pad_x, pad_y, pad_x, pad_y]) / [
+                scale_x,
+                scale_y,
+                scale_x,
+                scale_y,
+            ]
+            xyxy = np.clip(xyxy, 0, [width, height, width, height])
+            results.append(
+                {
+                    "img_id": img_id,
+                    "detections": Detections(
+                        xyxy, detections.confidence, detections.class_id
+                    ),
+                }
+            )
+        return results
+
+
+def detect_batch(detector, images, img_paths):
+    """Score a batch of images.
+
+    Backends with a batched entry point (`detect_batch`) score the batch in one
+    call. PytorchWildlife detectors score it through `batch_image_detection`,
+    which reports each image by its index in the batch; the indices are mapped
+    back to `img_paths`. Detectors with neither score the images one by one.
+    :return: One detection result per image, in order.
+    """
+    if getattr(type(detector), "detect_batch", None) is not None:
+        return detector.detect_batch(images, img_paths)
+    if getattr(type(detector), "batch_image_detection", None) is not None:
+        results = [None] * len(images)
+        for result in detector.batch_image_detection(
+            list(images), batch_size=len(images)
+        ):
+            index = int(result["img_id"])
+            results[index] = {**result, "img_id": img_paths[index]}
+        return results
+    return [
+        detector.single_image_detection(image, img_path=img_path)
+        for image, img_path in zip(images, img_paths)
+    ]
+
+
+def create_cascade(
+    backend=DetectorBackend.PYTORCH,
+    quantize=False,
+    cache_dir=None,
+    cpu_profile=CpuProfile.DEFAULT,
+    threads=None,
+    screen_version=SCREEN_MODEL_VERSION,
+    band=DEFAULT_CASCADE_BAND,
+):
+    """Create a CascadeDetector screening with `screen_version` ahead of the full model.
+
+    Both models are created with `create_detector` and share its settings.
+    """
+    settings = dict(
+        backend=backend,
+        quantize=quantize,
+        cache_dir=cache_dir,
+        cpu_profile=cpu_profile,
+        threads=threads,
+    )
+    return CascadeDetector(
+        create_detector(version=screen_version, **settings),
+        create_detector(**settings),
+        band,
+    )
+
+
+def screening_score(pw_result) -> float:
+    """Return the max animal confidence of a result, as post pro would judge it."""
+    return JSONParser.max_animal_confidence(convert_result(pw_result)["detections"])
+
+
+class CascadeDetector:
+    """This class screens every image with a cheap model and escalates uncertain ones.
+
+    An image escalates to the full model when its screening score falls in
+    `band`, i.e. too close to ConfidenceRating.MINIMUM to decide either way.
+    Every other image keeps its screening result.
+    """
+
+    def __init__(self, screen, full, band=DEFAULT_CASCADE_BAND):
+        self.screen = screen
+        self.full = full
+        self.band = tuple(band)
+        self.IMAGE_SIZE = detector_input_size(full)
+        self.screened = 0
+        self.escalated = 0
+
+    @property
+    def escalation_rate(self) -> float:
+        """Return the fraction of screened images that escalated to the full model."""
+        return self.escalated / self.screened if self.screened else 0.0
+
+    def is_uncertain(self, pw_result) -> bool:
+        low, high = self.band
+        return low <= screening_score(pw_result) < high
+
+    def single_image_detection(self, img, img_path=None):
+        return self.detect_batch([img], [img_path])[0]
+
+    def detect_batch(self, images, img_paths):
+        results = detect_batch(self.screen, images, img_paths)
+        uncertain = [
+            index for index, result in enumerate(results) if self.is_uncertain(result)
+        ]
+        if uncertain:
+            escalated = detect_batch(
+                self.full,
+                [images[i] for i in uncertain],
+                [img_paths[i] for i in uncertain],
+            )
+            for index, result in zip(uncertain, escalated):
+                results[index] = result
+
+        self.screened += len(images)
+        self.escalated += len(uncertain)
+        return results
+
+
+def evaluate_cascade(screen_results, full_results, band=DEFAULT_CASCADE_BAND) -> dict:
+    """Compare the verdicts a cascade would reach with those of the full model alone.
+
+    :param screen_results: Screening model results for a validation set.
+    :param full_results: Full model results for the same images, in the same order.
+    :return: The escalation rate, the fraction of verdicts agreeing with the full
+      model, and the number of full model positives the cascade would miss.
+    """
+    low, high = band
+    escalated = agreed = missed = 0
+    for screen_result, full_result in zip(screen_results, full_results):
+        full_positive = JSONParser.is_confidence_rating_minimum_or_above(
+            screening_score(full_result)
+        )
+        screen_score = screening_score(screen_result)
+        if low <= screen_score < high:
+            escalated += 1
+            cascade_positive = full_positive
+        else:
+            cascade_positive = JSONParser.is_confidence_rating_minimum_or_above(
+                screen_score
+            )
+        agreed += cascade_positive == full_positive
+        missed += full_positive and not cascade_positive
+
+    images = len(full_results)
+    return {
+        "images": images,
+        "escalation_rate": escalated / images if images else 0.0,
+        "agreement": agreed / images if images else 1.0,
+        "missed_positives": missed,
+    }
+
+
+def detector_input_size(detector) -> int:
+    """Return the longer side, in pixels, the detector rescales its input to."""
+    return getattr(detector, "IMAGE_SIZE", DEFAULT_INPUT_SIZE)
+
+
+def model_input_size(
+    backend=DetectorBackend.PYTORCH, cache_dir=None, version=MODEL_VERSION
+) -> int:
+    """Return what `detector_input_size` would for a detector from `create_detector`.
+
+    The model is not loaded. The ONNX backend runs at the size its cached artifact
+    was exported at; otherwise, as for the export itself, the size is
+    MegaDetectorV6.IMAGE_SIZE.
+    """
+    if DetectorBackend(backend) is DetectorBackend.ONNX:
+        cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        onnx_path = _cached_onnx_path(cache_dir, version)
+        if onnx_path is not None:
+            return int(onnx_path.stem.rsplit("-", 1)[1])
+    try:
+        from PytorchWildlife.models import detection as pw_detection
+    except ImportError:
+        return DEFAULT_INPUT_SIZE
+    return detector_input_size(pw_detection.MegaDetectorV6)
+
+
+def _unletterbox(bbox, letterbox):
+    """Map an [x1, y1, x2, y2] bbox from frame pixels back to source video pixels."""
+    (scale_x, scale_y), (pad_x, pad_y) = letterbox["scale"], letterbox["pad"]
+    x1, y1, x2, y2 = bbox
+    return [
+        (x1 - pad_x) / scale_x,
+        (y1 - pad_y) / scale_y,
+        (x2 - pad_x) / scale_x,
+        (y2 - pad_y) / scale_y,
+    ]
+
+
+PROVENANCE_KEYS = ("source", "frame_index", "timestamp", "archive", "member")
+
+
+def convert_result(pw_result, frame=None):
     """Convert a PytorchWildlife detection result to the legacy JSON format.
 
     JSONParser expects each image entry to have:
       - "file": str
       - "max_detection_conf": float
       - "detections": [{"category": str, "conf": float, "bbox": [x1, y1, x2, y2]}]
+
+    When the frame record produced by the Splitter is given, its provenance
+    ("source", "frame_index", "timestamp", plus "archive" and "member" for videos
+    read from an archive) is carried over so post pro never has to recover the
+    source video from the JPEG name. Frames downscaled during
+    decode carry a "letterbox" which maps their bboxes back to source pixels.
     """
     detections_obj = pw_result["detections"]
     boxes = detections_obj.xyxy
@@ -34,8 +703,15 @@ def convert_result(pw_result):
 
     max_conf = float(max(confidences)) if len(confidences) > 0 else 0.0
 
-    return {
+    result = {
         "file": pw_result["img_id"],
         "max_detection_conf": max_conf,
         "detections": detections,
     }
+    if frame is not None and "letterbox" in frame:
+        for detection in detections:
+            detection["bbox"] = _unletterbox(detection["bbox"], frame["letterbox"])
+
+    if frame is not None:
+        result.update({key: frame[key] for key in PROVENANCE_KEYS if key in frame})
+    return result
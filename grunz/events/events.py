@@ -0,0 +1,162 @@
+"""This module handles grouping trigger bursts of videos into animal visits."""
+
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from grunz.json_parser.json_parser import ConfidenceRating
+
+# Videos from one camera less than this many seconds apart belong to one visit.
+DEFAULT_EVENT_GAP = 60.0
+
+# A representative whose max animal confidence falls in this band decides nothing.
+DEFAULT_INCONCLUSIVE_BAND = (0.2, ConfidenceRating.MINIMUM.value)
+
+
+class GroupingPolicy(Enum):
+    """What happens to the rest of an event once its representative is scored."""
+
+    REPRESENTATIVE = "representative"
+    ALL = "all"
+
+
+class EventScheduler:
+    """This class clusters videos into events and decides which of them need scoring.
+
+    Videos are grouped per camera directory, starting a new event whenever the gap
+    between consecutive file timestamps exceeds `gap_seconds`. The first video of
+    each event is its representative and is scored first. Under the
+    "representative" policy the rest of an event is only scored when the
+    representative's verdict is inconclusive; otherwise they inherit its verdict.
+    Under "all" they are always scored, after every representative.
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[str],
+        camera_of: Callable[[str], str],
+        time_of: Callable[[str], float],
+        gap_seconds: float = DEFAULT_EVENT_GAP,
+        policy: GroupingPolicy = GroupingPolicy.REPRESENTATIVE,
+        band: Tuple[float, float] = DEFAULT_INCONCLUSIVE_BAND,
+    ):
+        """
+        :param sources: The videos to schedule.
+        :param camera_of: Returns the camera a video was recorded by.
+        :param time_of: Returns the time a video was recorded, in seconds.
+        :param gap_seconds: Longest gap between two videos of one event.
+        :param policy: A `GroupingPolicy` or its value.
+        :param band: Low and high max animal confidence of an inconclusive
+          representative.
+        """
+        self.policy = GroupingPolicy(policy)
+        self.band = tuple(band)
+        self.events = EventScheduler.group(sources, camera_of, time_of, gap_seconds)
+
+    @staticmethod
+    def group(
+        sources: Iterable[str],
+        camera_of: Callable[[str], str],
+        time_of: Callable[[str], float],
+        gap_seconds: float,
+    ) -> List[List[str]]:
+        """
+        :return: Events as lists of videos in recording order, ordered by camera and
+          time.
+        """
+        by_camera: Dict[str, List[Tuple[float, str]]] = {}
+        for source in sources:
+            by_camera.setdefault(camera_of(source), []).append(
+                (time_of(source), source)
+            )
+
+        events = []
+        for camera in sorted(by_camera):
+            previous = None
+            for recorded, source in sorted(by_camera[camera]):
+                if previous is None or recorded - previous > gap_seconds:
+                    events.append([])
+                events[-1].append(source)
+                previous = recorded
+        return events
+
+    def representatives(self) -> List[str]:
+        """
+        :return: The first video of every event.
+        """
+        return [event[0] for event in self.events]
+
+    def is_inconclusive(self, verdict: Optional[Dict]) -> bool:
+        """
+        :param verdict: A representative's verdict, None if it could not be scored.
+        """
+        if verdict is None:
+            return True
+        low, high = self.band
+        return low <= verdict["max_animal_conf"] < high
+
+    def remaining(self, verdicts: Dict[str, Dict]) -> List[str]:
+        """
+        :param verdicts: Representative verdicts by source.
+        :return: The other videos of every event that still needs scoring.
+        """
+        return [
+            source
+            for event in self.events
+            if self.policy is GroupingPolicy.ALL
+            or self.is_inconclusive(verdicts.get(event[0]))
+            for source in event[1:]
+        ]
+
+    def inferred(self, verdicts: Dict[str, Dict]) -> List[Dict]:
+        """
+        :param verdicts: Representative verdicts by source.
+        :return: A verdict for every video that was skipped, copied from its
+          representative and naming it under "inferred_from". Archive provenance
+          is not copied.
+        """
+        skipped = set(self.remaining(verdicts))
+        inferred = []
+        for event in self.events:
+            representative = verdicts.get(event[0])
+            for source in event[1:]:
+                if source in skipped or representative is None:
+                    continue
+                inferred.append(
+                    {
+                        **{
+                            key: value
+                            for key, value in representative.items()
+                            if key not in ("archive", "member")
+                        },
+                        "file": source,
+                        "first_positive_timestamp": None,
+                        "inferred_from": event[0],
+                    }
+                )
+        return inferred
+
+    def report(
+        self, frames_per_video: Dict[str, int], verdicts: Dict[str, Dict]
+    ) -> str:
+        """
+        A skipped video is assumed to hold as many frames as its representative.
+        :param frames_per_video: Frames scored per source.
+        :param verdicts: Representative verdicts by source.
+        :return: The frames saved against scoring every video.
+        """
+        skipped = 0
+        saved = 0
+        for event in self.events:
+            if self.policy is GroupingPolicy.ALL or self.is_inconclusive(
+                verdicts.get(event[0])
+            ):
+                continue
+            skipped += len(event) - 1
+            saved += (len(event) - 1) * frames_per_video.get(event[0], 0)
+
+        baseline = sum(frames_per_video.values()) + saved
+        share = saved / baseline if baseline else 0.0
+        return (
+            f"Event grouping: {len(self.events)} events, {skipped} videos skipped, "
+            f"~{saved} of ~{baseline} frames saved ({share:.1%})"
+        )
@@ -2,10 +2,14 @@
 
 import time
 from pathlib import Path
-from shutil import copy2
+from shutil import copy2, copystat
 from typing import List
 
 
+# Bytes copied between bandwidth checks when a copy is paced.
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
 class FileUtils:
     """This class is responsible for finding, renaming and sorting file inputs and outputs."""
 
@@ -47,23 +51,35 @@ class FileUtils:
         ]
 
     @staticmethod
-    def copy_file(source_path: str, destination_path: str) -> None:
+    def copy_file(source_path: str, destination_path: str, limiter=None) -> None:
         """
         :param source_path: Path to file to copy.
         :param destination_path: Path to destination dir, including filename.
+        :param limiter: A BandwidthLimiter pacing the copy, chunk by chunk.
         :return: None.
         """
-        return copy2(source_path, destination_path)
+        if limiter is None:
+            return copy2(source_path, destination_path)
+
+        with (
+            open(source_path, "rb") as source,
+            open(destination_path, "wb") as destination,
+        ):
+            while chunk := source.read(COPY_CHUNK_BYTES):
+                destination.write(chunk)
+                limiter.consume(2 * len(chunk))
+        copystat(source_path, destination_path)
 
     @staticmethod
-    def create_json_output_file(output_dir: Path) -> str:
+    def create_json_output_file(output_dir: Path, extension: str = "json") -> str:
         """Create a timestamped JSON output file in the given directory.
         :param output_dir: Directory to create the file in.
+        :param extension: "json", or e.g. "json.gz" for compressed output.
         :return: Path to the created file as a string.
         """
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         time_stamp = time.strftime("%Y%m%d-%H%M")
-        filename = Path(output_dir) / f"{time_stamp}.json"
+        filename = Path(output_dir) / f"{time_stamp}.{extension}"
         filename.touch(exist_ok=True)
         return str(filename)
 
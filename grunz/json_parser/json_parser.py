@@ -1,10 +1,153 @@
 """This module handles parsing the JSON output file after camera traps have been processed."""
 
+import bz2
+import functools
+import gzip
 import json
+import lzma
 import re
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Compressed JSON is recognised by its last suffix, e.g. `output.json.gz`.
+CODECS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".lzma": functools.partial(lzma.open, format=lzma.FORMAT_ALONE),
+}
+
+# Characters that may continue a number decoded at the end of the buffer, e.g. "0."
+NUMBER_CHARACTERS = "0123456789.eE+-"
+
+# Characters decompressed and decoded per read while streaming JSON in.
+CHUNK_SIZE = 64 * 1024
+
+
+def open_json(path, mode: str = "rt") -> IO:
+    """
+    :param path: Path to a JSON file, compressed when its suffix is one of `CODECS`.
+    :param mode: "rt" or "wt".
+    :return: A text stream that compresses or decompresses incrementally.
+    """
+    codec = CODECS.get(Path(path).suffix.lower(), open)
+    return codec(path, mode, encoding="utf-8")
+
+
+def write_json(path, document: Dict[str, Any]) -> None:
+    """
+    Writes a top level object one array item at a time, so the full text is never
+    held in memory. The codec is chosen by the suffix of `path`, see `open_json`.
+    :param path: Path to write.
+    :param document: Object to write. List values are streamed item by item.
+    """
+    with open_json(path, "wt") as stream:
+        stream.write("{")
+        for index, (key, value) in enumerate(document.items()):
+            stream.write(f"{', ' if index else ''}{json.dumps(key)}: ")
+            if isinstance(value, list):
+                stream.write("[")
+                for item_index, item in enumerate(value):
+                    stream.write(f"{', ' if item_index else ''}{json.dumps(item)}")
+                stream.write("]")
+            else:
+                stream.write(json.dumps(value))
+        stream.write("}")
+
+
+class _JsonStream:
+    """Decodes a top level JSON object from a text stream, one array item at a time."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, stream: IO):
+        self.stream = stream
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def members(self) -> Iterator[Tuple[str, Any]]:
+        """
+        :return: (key, value) pairs. Array values are iterators that must be exhausted
+          before the next pair is requested.
+        """
+        self.__expect("{")
+        if self.__peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.__value()
+            self.__expect(":")
+            yield key, self.__items() if self.__peek() == "[" else self.__value()
+            if self.__peek() == "}":
+                self.position += 1
+                return
+            self.__expect(",")
+
+    def __items(self) -> Iterator[Any]:
+        self.__expect("[")
+        if self.__peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.__value()
+            if self.__peek() == "]":
+                self.position += 1
+                return
+            self.__expect(",")
+
+    def __fill(self) -> bool:
+        chunk = self.stream.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def __peek(self) -> str:
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position].isspace()
+            ):
+                self.position += 1
+            if self.position < len(self.buffer) or not self.__fill():
+                return self.buffer[self.position : self.position + 1]
+
+    def __expect(self, character: str) -> None:
+        found = self.__peek()
+        if found != character:
+            raise ValueError(
+                f"Expected {character!r} but found {found!r} in JSON stream"
+            )
+        self.position += 1
+
+    def __value(self) -> Any:
+        self.__peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.__fill():
+                    raise
+                continue
+            # A number followed by nothing but number characters may continue in the
+            # next chunk, e.g. "0." decodes as 0 until "85" is read.
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            tail = self.buffer[end:]
+            if (
+                is_number
+                and not tail.strip(NUMBER_CHARACTERS)
+                and not self.eof
+                and self.__fill()
+            ):
+                continue
+            self.position = end
+            return value
 
 
 class ConfidenceRating(Enum):
@@ -30,10 +173,43 @@ class JSONParser:
 
     def read(self) -> Dict:
         """
+        Compressed JSON is decompressed and decoded incrementally, see `open_json`.
         :return: deserialized JSON object.
         """
-        with open(self.path_to_json, "r") as source:
-            return json.load(source)
+        with open_json(self.path_to_json) as source:
+            return {
+                key: list(value) if isinstance(value, Iterator) else value
+                for key, value in _JsonStream(source).members()
+            }
+
+    def iter_images(self) -> Iterator[Dict]:
+        """
+        Streams the image objects, holding only one of them in memory at a time.
+        :return: The image objects of the JSON.
+        """
+        with open_json(self.path_to_json) as source:
+            for key, value in _JsonStream(source).members():
+                if key == "images":
+                    yield from value
+                    return
+                if isinstance(value, Iterator):
+                    for _ in value:
+                        pass
+
+    def __read_member(self, name: str) -> Any:
+        """
+        Streams the JSON, skipping the items of every other array.
+        :param name: A top level member.
+        :return: Its value, None when it is missing.
+        """
+        with open_json(self.path_to_json) as source:
+            for key, value in _JsonStream(source).members():
+                if key == name:
+                    return list(value) if isinstance(value, Iterator) else value
+                if isinstance(value, Iterator):
+                    for _ in value:
+                        pass
+        return None
 
     @staticmethod
     def is_confidence_rating_minimum_or_above(confidence_rating: float) -> bool:
@@ -53,15 +229,39 @@ class JSONParser:
         """
         return int(category) == Categories.ANIMAL.value
 
+    @staticmethod
+    def max_category_confidence(detections: List[Dict], category: Categories) -> float:
+        """
+        :param detections: The detections of a single image.
+        :param category: One of the `Categories`.
+        :return: The highest confidence among detections of that category, 0.0 if none.
+        """
+        return max(
+            (d["conf"] for d in detections if int(d["category"]) == category.value),
+            default=0.0,
+        )
+
+    @staticmethod
+    def max_animal_confidence(detections: List[Dict]) -> float:
+        """
+        :param detections: The detections of a single image.
+        :return: The highest confidence among detections of type "Animal", 0.0 if none.
+        """
+        return max(
+            (
+                d["conf"]
+                for d in detections
+                if JSONParser.is_category_of_type_animal(d["category"])
+            ),
+            default=0.0,
+        )
+
     def filter_json_for_detection_results(self) -> List[Dict]:
         """
         :return: A list of detection results.
         """
         animals = []
-        mega_detector_json = JSONParser.read(self)
-        images = mega_detector_json["images"]
-
-        for image in images:
+        for image in self.iter_images():
             detections = image["detections"]
 
             if detections:
@@ -74,10 +274,141 @@ class JSONParser:
                     animals.append(image)
         return animals
 
+    @staticmethod
+    def summarise_videos(images: Iterable[Dict]) -> List[Dict]:
+        """
+        Images produced before frame provenance was recorded carry no "source", in which
+        case the video is recovered from the JPEG name. Videos read from an archive keep
+        their "archive" and "member".
+        :param images: A list of image objects as produced by `convert_result`.
+        :return: One verdict per source video, in order of first appearance, holding the
+          max animal confidence, the number of positive frames and the first positive
+          timestamp.
+        """
+        videos = {}
+        for image in images:
+            source = image.get("source")
+            if source is None:
+                source = str(
+                    JSONParser.__convert_jpeg_path_to_original_avi(image["file"])
+                )
+
+            video = videos.setdefault(
+                source,
+                {
+                    "file": source,
+                    "max_animal_conf": 0.0,
+                    "positive_frames": 0,
+                    "first_positive_timestamp": None,
+                    **{
+                        key: image[key] for key in ("archive", "member") if key in image
+                    },
+                },
+            )
+            confidence = JSONParser.max_animal_confidence(image["detections"])
+            video["max_animal_conf"] = max(video["max_animal_conf"], confidence)
+
+            if JSONParser.is_confidence_rating_minimum_or_above(confidence):
+                video["positive_frames"] += 1
+                timestamp = image.get("timestamp")
+                first = video["first_positive_timestamp"]
+                if timestamp is not None and (first is None or timestamp < first):
+                    video["first_positive_timestamp"] = timestamp
+        return list(videos.values())
+
+    def filter_json_for_positive_videos(self) -> List[Dict]:
+        """
+        Reads the per-video verdicts written by pre pro, streaming past the images.
+        Older JSONs without verdicts are summarised from their images instead.
+        :return: A list of per-video verdicts with at least one positive frame.
+        """
+        videos = self.__read_member("videos")
+        if videos is None:
+            videos = JSONParser.summarise_videos(self.iter_images())
+        return [video for video in videos if video["positive_frames"]]
+
+    def sweep_thresholds(
+        self,
+        thresholds: Iterable[float],
+        categories: Iterable[Categories] = (Categories.ANIMAL,),
+    ) -> List[Dict]:
+        """
+        Streams the JSON once and counts positives for every threshold and category.
+        Per-image and per-video max confidences are sorted once per category, so each
+        threshold is a binary search rather than another pass over the detections.
+        Videos skipped by event grouping have no images; they count as their
+        representative's "inferred_from" video does, as in post pro.
+        :param thresholds: Confidences at or above which an image counts as positive.
+        :param categories: The `Categories` to report on.
+        :return: One row per category and threshold, holding the number of positive
+          images and positive videos.
+        """
+        categories = list(categories)
+        image_confidences = {category: [] for category in categories}
+        video_confidences = {category: {} for category in categories}
+        inferred = {}
+        with open_json(self.path_to_json) as source:
+            for key, value in _JsonStream(source).members():
+                if key == "images":
+                    for image in value:
+                        self.__add_image_confidences(
+                            image, categories, image_confidences, video_confidences
+                        )
+                elif key == "videos":
+                    for video in value:
+                        if "inferred_from" in video:
+                            inferred[video["file"]] = video["inferred_from"]
+                elif isinstance(value, Iterator):
+                    for _ in value:
+                        pass
+
+        rows = []
+        for category in categories:
+            for file, representative in inferred.items():
+                video_confidences[category][file] = video_confidences[category].get(
+                    representative, 0.0
+                )
+            images = np.sort(image_confidences[category])
+            videos = np.sort(list(video_confidences[category].values()))
+            for threshold in thresholds:
+                rows.append(
+                    {
+                        "category": category.name.lower(),
+                        "threshold": threshold,
+                        "positive_images": len(images)
+                        - int(np.searchsorted(images, threshold)),
+                        "positive_videos": len(videos)
+                        - int(np.searchsorted(videos, threshold)),
+                    }
+                )
+        return rows
+
+    @staticmethod
+    def __add_image_confidences(
+        image: Dict,
+        categories: List[Categories],
+        image_confidences: Dict[Categories, List[float]],
+        video_confidences: Dict[Categories, Dict[str, float]],
+    ) -> None:
+        """
+        Records the max confidence of each category in `image`, and raises its video's.
+        """
+        source = image.get("source") or str(
+            JSONParser.__convert_jpeg_path_to_original_avi(image["file"])
+        )
+        for category in categories:
+            confidence = JSONParser.max_category_confidence(
+                image["detections"], category
+            )
+            image_confidences[category].append(confidence)
+            videos = video_confidences[category]
+            videos[source] = max(videos.get(source, 0.0), confidence)
+
     @staticmethod
     def extract_file_paths(detection_results: List[Dict]) -> List[str]:
         """
-        :param detection_results: A list of dicts, i.e image objects containing animals.
+        :param detection_results: A list of dicts, i.e image objects containing animals
+          or per-video verdicts.
         :return: A list of file paths for each positive result.
         """
         return [d["file"] for d in detection_results]
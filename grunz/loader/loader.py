@@ -0,0 +1,73 @@
+"""This module handles reading and decoding images ahead of MegaDetector inference."""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """This class decodes the next batch of images while the current one is inferred."""
+
+    def __init__(
+        self,
+        frames: Iterable[Dict],
+        batch_size: int = 8,
+        workers: int = 4,
+        load_image: Optional[Callable[[str], np.ndarray]] = None,
+        on_skip: Optional[Callable[[Dict], None]] = None,
+    ):
+        """
+        :param frames: Frame records, each with the image path under "file".
+        :param batch_size: Number of images inferred together. Up to two batches are
+          decoded ahead of the consumer. It may be changed while iterating.
+        :param workers: Number of decoding threads.
+        :param load_image: Decodes one image path. Defaults to `Prefetcher.load_image`.
+        :param on_skip: Called with the frame record of every image that is skipped,
+          e.g. to release it from scratch.
+        """
+        self.frames = frames
+        self.batch_size = batch_size
+        self.workers = workers
+        self.load_image = load_image or Prefetcher.load_image
+        self.on_skip = on_skip
+
+    @staticmethod
+    def load_image(file_path: str) -> np.ndarray:
+        """
+        :param file_path: Path to an image.
+        :return: The decoded image as an RGB array.
+        """
+        with Image.open(file_path) as image:
+            return np.asarray(image.convert("RGB"))
+
+    def __iter__(self) -> Iterator[Tuple[Dict, np.ndarray]]:
+        """
+        Images that cannot be decoded are logged and skipped, see `on_skip`.
+        :return: (frame record, decoded image) pairs in the order of `frames`.
+        """
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="prefetch") as pool:
+            pending = deque()
+            for frame in self.frames:
+                pending.append((frame, pool.submit(self.load_image, frame["file"])))
+                while len(pending) >= 2 * self.batch_size:
+                    yield from self.__take(pending)
+
+            while pending:
+                yield from self.__take(pending)
+
+    def __take(self, pending: deque) -> Iterator[Tuple[Dict, np.ndarray]]:
+        frame, future = pending.popleft()
+        try:
+            image = future.result()
+        except OSError:
+            logger.error("%s could not be read", frame["file"], exc_info=True)
+            if self.on_skip:
+                self.on_skip(frame)
+            return
+        yield frame, image
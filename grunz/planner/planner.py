@@ -0,0 +1,99 @@
+"""This module handles estimating the cost of a pre pro run from video headers alone."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from grunz.splitter.splitter import Splitter, SplitterBackend
+
+# Rough frames/sec on a 4 core CPU. Measure your own with `python -m
+# benchmarks.bench_splitter`
+# and `python -m benchmarks.bench_detector` and pass them to the Planner.
+SPLIT_THROUGHPUT = {SplitterBackend.MOVIEPY: 3.0, SplitterBackend.FFMPEG: 7.0}
+DETECT_THROUGHPUT = 2.0
+
+# JPEGs written at PIL's default quality average about this many bytes per pixel.
+JPEG_BYTES_PER_PIXEL = 0.2
+
+PROBE_WORKERS = 8
+
+
+class Planner:
+    """This class probes video headers on a thread pool to plan a pre pro run.
+
+    Frame counts, scratch bytes and runtime are estimated without decoding a single
+    frame, and files whose headers cannot be read are flagged before the run starts.
+    """
+
+    def __init__(
+        self,
+        fps_value: float,
+        max_size: Optional[int] = None,
+        split_throughput: float = SPLIT_THROUGHPUT[SplitterBackend.MOVIEPY],
+        detect_throughput: float = DETECT_THROUGHPUT,
+        workers: int = PROBE_WORKERS,
+    ):
+        """
+        :param fps_value: Number of frames per second pre pro samples.
+        :param max_size: Longer side frames are downscaled to during decode, if any.
+        :param split_throughput: Frames/sec the splitter writes.
+        :param detect_throughput: Frames/sec the detector scores.
+        :param workers: Number of headers probed at once.
+        """
+        self.fps_value = fps_value
+        self.max_size = max_size
+        self.split_throughput = split_throughput
+        self.detect_throughput = detect_throughput
+        self.workers = workers
+
+    def probe(self, file_path: str) -> Dict:
+        """
+        :param file_path: Path to a video.
+        :return: The video's header metadata with its estimated "frames" and
+          "scratch_bytes", or its "error" when the header cannot be read.
+        """
+        try:
+            metadata = Splitter.probe_metadata(str(file_path))
+        except (OSError, KeyError, ValueError) as error:
+            return {
+                "file": str(file_path),
+                "error": str(error).strip() or type(error).__name__,
+            }
+        if not metadata["duration"]:
+            return {"file": str(file_path), "error": "no duration in header"}
+
+        size = metadata["size"]
+        if self.max_size:
+            size = Splitter.fit_within(size, self.max_size)
+        frames = Splitter.frame_count(metadata["duration"], self.fps_value)
+        return {
+            "file": str(file_path),
+            **metadata,
+            "frames": frames,
+            "scratch_bytes": int(frames * size[0] * size[1] * JPEG_BYTES_PER_PIXEL),
+        }
+
+    def plan(self, file_paths: Iterable[str]) -> Dict:
+        """
+        Splitting and detection overlap, so the runtime is bounded by the slower of the
+        two.
+        :param file_paths: Paths to the videos of the run.
+        :return: The probed "videos", the "unreadable" ones, and the total "frames",
+          "scratch_bytes" (written over the run), "largest_video_bytes" and
+          "runtime_seconds" estimated for the readable videos.
+        """
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="probe") as pool:
+            probed = list(pool.map(self.probe, file_paths))
+
+        videos: List[Dict] = [video for video in probed if "error" not in video]
+        frames = sum(video["frames"] for video in videos)
+        return {
+            "videos": videos,
+            "unreadable": [video for video in probed if "error" in video],
+            "frames": frames,
+            "scratch_bytes": sum(video["scratch_bytes"] for video in videos),
+            "largest_video_bytes": max(
+                (video["scratch_bytes"] for video in videos), default=0
+            ),
+            "runtime_seconds": frames
+            / min(self.split_throughput, self.detect_throughput),
+        }
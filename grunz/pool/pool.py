@@ -0,0 +1,204 @@
+"""This module handles running several MegaDetector instances side by side."""
+
+import logging
+import multiprocessing
+import os
+import queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from grunz.detector import (
+    Detections,
+    available_core_ids,
+    create_detector,
+    detector_input_size,
+)
+
+logger = logging.getLogger(__name__)
+
+# A single MegaDetector instance stops scaling well past a handful of threads.
+CORES_PER_WORKER = 4
+
+# Seconds between checks that every worker is still alive while waiting for results.
+POLL_INTERVAL = 1.0
+
+
+def auto_workers(cores: int, cores_per_worker: int = CORES_PER_WORKER) -> int:
+    """
+    :param cores: Number of cores available.
+    :param cores_per_worker: Cores each detector instance is given.
+    :return: The number of detector workers to start.
+    """
+    return max(1, cores // cores_per_worker)
+
+
+def split_cores(cores: List[int], workers: int) -> List[List[int]]:
+    """
+    :param cores: Core ids available to the pool.
+    :param workers: Number of workers.
+    :return: One disjoint, contiguous group of core ids per worker.
+    """
+    return [group.tolist() for group in np.array_split(np.array(cores), workers)]
+
+
+def _worker(
+    cores: List[int],
+    factory: Callable,
+    factory_kwargs: Dict,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    """
+    Detector process. Pins itself to its core group, creates its own detector with
+    one intra-op thread per core, then scores image paths until it receives `None`.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    detector = factory(threads=len(cores), **factory_kwargs)
+    results.put(("ready", detector_input_size(detector), None))
+
+    for index, img_path in iter(tasks.get, None):
+        try:
+            pw_result = detector.single_image_detection(img_path)
+        except Exception as error:  # Reported to, and logged by, the parent.
+            results.put((index, None, f"{type(error).__name__}: {error}"))
+            continue
+
+        detections = pw_result["detections"]
+        results.put(
+            (
+                index,
+                {
+                    "img_id": pw_result["img_id"],
+                    "detections": Detections(
+                        np.asarray(detections.xyxy),
+                        np.asarray(detections.confidence),
+                        np.asarray(detections.class_id),
+                    ),
+                },
+                None,
+            )
+        )
+
+
+class DetectorPool:
+    """This class runs detector worker processes, each pinned to its own cores."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        factory: Callable = create_detector,
+        cores: Optional[List[int]] = None,
+        **factory_kwargs,
+    ):
+        """
+        :param workers: Number of detector processes. Sized from the available cores by
+          default.
+        :param factory: Creates a detector in each worker. Must be importable by name.
+          It is called with `threads` and `factory_kwargs`.
+        :param cores: Core ids to spread the workers over. Defaults to those available.
+        """
+        if workers is not None and workers < 1:
+            raise ValueError(
+                f"A detector pool needs at least one worker, got {workers}"
+            )
+        cores = cores or available_core_ids()
+        self.workers = min(workers or auto_workers(len(cores)), len(cores))
+        self.core_groups = split_cores(cores, self.workers)
+        self.factory = factory
+        self.factory_kwargs = factory_kwargs
+        self.IMAGE_SIZE = None
+        self._processes = []
+
+    def __enter__(self) -> "DetectorPool":
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+
+        # The first worker starts alone so one-off work such as an ONNX export
+        # and its cache are finished before the others look for them.
+        first, *rest = self.core_groups
+        self.__start_workers(context, [first])
+        self.__start_workers(context, rest)
+        logger.info("Detector pool started on core groups %s", self.core_groups)
+        return self
+
+    def __start_workers(self, context, core_groups: List[List[int]]) -> None:
+        for cores in core_groups:
+            process = context.Process(
+                target=_worker,
+                args=(
+                    cores,
+                    self.factory,
+                    self.factory_kwargs,
+                    self._tasks,
+                    self._results,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        for _ in core_groups:
+            _, self.IMAGE_SIZE, _ = self.__next_result()
+
+    def __exit__(self, *exc_info) -> None:
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+        self._processes = []
+
+    def __next_result(self) -> Tuple:
+        while True:
+            try:
+                return self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                dead = [p.pid for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Detector workers {dead} exited unexpectedly")
+
+    def imap(
+        self,
+        frames: Iterable[Dict],
+        on_skip: Optional[Callable[[Dict], None]] = None,
+    ) -> Iterator[Tuple[Dict, Dict]]:
+        """
+        Workers read and decode the images themselves. Images they fail on are logged
+        and skipped.
+        :param frames: Frame records, each with the image path under "file".
+        :param on_skip: Called with the frame record of every image that is skipped,
+          e.g. to release it from scratch.
+        :return: (frame record, detection result) pairs in the order of `frames`.
+        """
+        pending = {}
+        finished = {}
+        next_index = 0
+        max_in_flight = 2 * self.workers
+
+        def collect() -> Iterator[Tuple[Dict, Dict]]:
+            nonlocal next_index
+            index, result, error = self.__next_result()
+            finished[index] = (result, error)
+            while next_index in finished:
+                result, error = finished.pop(next_index)
+                frame = pending.pop(next_index)
+                next_index += 1
+                if error:
+                    logger.error("%s could not be scored: %s", frame["file"], error)
+                    if on_skip:
+                        on_skip(frame)
+                else:
+                    yield frame, result
+
+        for index, frame in enumerate(frames):
+            pending[index] = frame
+            self._tasks.put((index, frame["file"]))
+            while len(pending) >= max_in_flight:
+                yield from collect()
+
+        while pending:
+            yield from collect()
@@ -0,0 +1,158 @@
+"""This module handles profiling CPU time and memory allocations per pipeline stage."""
+
+import contextlib
+import cProfile
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_EVERY = 10
+DEFAULT_TOP = 25
+
+
+class StageProfiler:
+    """This class samples pipeline stages with cProfile and tracemalloc.
+
+    Every call of a stage is timed. One in `sample_every` calls is also run under
+    cProfile with tracemalloc tracing allocations, so overhead stays low on long
+    runs. tracemalloc is process wide, as is cProfile from Python 3.12, so only one
+    stage is sampled at a time and a sampled call overlapping another is only timed.
+    Stages on other threads, such as splitting and prefetching, keep running while a
+    call is sampled. What they allocate counts towards the sampled stage's peak, and
+    from Python 3.12 their calls appear in its dump. Retained memory is therefore
+    reported per allocation site rather than per stage.
+    """
+
+    def __init__(
+        self,
+        profile_dir: Path,
+        sample_every: int = DEFAULT_SAMPLE_EVERY,
+        top: int = DEFAULT_TOP,
+    ):
+        """
+        :param profile_dir: Directory the per-stage dumps and the allocation report are
+          written to.
+        :param sample_every: Profile one in this many calls of each stage.
+        :param top: Number of allocation sites reported.
+        """
+        self.profile_dir = Path(profile_dir)
+        self.sample_every = max(1, sample_every)
+        self.top = top
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()
+        self._calls = Counter()
+        self._sampled = Counter()
+        self._seconds = Counter()
+        self._peak = Counter()
+        self._stats = {}
+        self._allocations = Counter()
+        self._allocation_counts = Counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        :param name: The pipeline stage the enclosed code belongs to.
+        """
+        with self._lock:
+            call = self._calls[name]
+            self._calls[name] += 1
+
+        sampled = call % self.sample_every == 0 and self._sampling.acquire(
+            blocking=False
+        )
+        start = time.perf_counter()
+        if not sampled:
+            try:
+                yield
+            finally:
+                self.__add_time(name, start)
+            return
+
+        profile = cProfile.Profile()
+        tracemalloc.start()
+        try:
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                self.__add_time(name, start)
+                self.__record_sample(name, profile)
+        finally:
+            tracemalloc.stop()
+            self._sampling.release()
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        """
+        :return: `function` with every call run as stage `name`.
+        """
+
+        def staged(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return staged
+
+    def write(self) -> Path:
+        """
+        Writes a cProfile dump per sampled stage and a report of stage timings and the
+        allocation sites retaining the most memory across sampled calls.
+        :return: The profile directory.
+        """
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        for name, stats in self._stats.items():
+            stats.dump_stats(str(self.profile_dir / f"{name}.prof"))
+
+        with open(self.profile_dir / "allocations.txt", "w") as report:
+            report.write(
+                f"{'stage':<10}{'calls':>10}{'sampled':>10}"
+                f"{'seconds':>12}{'peak MiB':>12}\n"
+            )
+            for name in self._calls:
+                report.write(
+                    f"{name:<10}{self._calls[name]:>10}{self._sampled[name]:>10}"
+                    f"{self._seconds[name]:>12.3f}{self._peak[name] / 2 ** 20:>12.2f}\n"
+                )
+            report.write(
+                "Peak memory is process wide and includes stages running concurrently "
+                "with the sampled calls.\n"
+            )
+
+            if self._allocations:
+                report.write(
+                    f"\nTop {self.top} allocation sites retained by sampled calls, "
+                    "from every thread\n"
+                )
+            for site, size in self._allocations.most_common(self.top):
+                count = self._allocation_counts[site]
+                report.write(f"{size / 1024:>12.1f} KiB {count:>8} blocks  {site}\n")
+
+        logger.info("Profile written to %s", self.profile_dir)
+        return self.profile_dir
+
+    def __add_time(self, name: str, start: float) -> None:
+        with self._lock:
+            self._seconds[name] += time.perf_counter() - start
+
+    def __record_sample(self, name: str, profile: cProfile.Profile) -> None:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        statistics = snapshot.statistics("lineno")
+        with self._lock:
+            self._sampled[name] += 1
+            self._peak[name] = max(self._peak[name], peak)
+            if name in self._stats:
+                self._stats[name].add(profile)
+            else:
+                self._stats[name] = pstats.Stats(profile)
+            for statistic in statistics:
+                site = str(statistic.traceback)
+                self._allocations[site] += statistic.size
+                self._allocation_counts[site] += statistic.count
@@ -0,0 +1,83 @@
+"""This module manages the scratch directory extracted frames are written to."""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Scratch:
+    """This class tracks the disk use of extracted frames and throttles splitting."""
+
+    def __init__(
+        self, directory: Optional[Path] = None, quota_bytes: Optional[int] = None
+    ):
+
+        self.directory = Path(directory) if directory else Scratch.default_directory()
+        self.quota_bytes = quota_bytes
+        self.used_bytes = 0
+        self.run_directory = None
+        self._sizes = {}
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> "Scratch":
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.run_directory = Path(tempfile.mkdtemp(prefix="run-", dir=self.directory))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        shutil.rmtree(self.run_directory, ignore_errors=True)
+
+    @staticmethod
+    def default_directory() -> Path:
+        """
+        tmpfs is preferred so frames never touch the archive or a spinning disk.
+        :return: `/dev/shm/grunz` if writable, otherwise `grunz` in the system temp
+          directory.
+        """
+        shm = Path("/dev/shm")
+        if shm.is_dir() and os.access(shm, os.W_OK):
+            return shm / "grunz"
+        return Path(tempfile.gettempdir()) / "grunz"
+
+    def wait_for_space(self) -> None:
+        """
+        Block while the frames held in scratch are at or above the quota.
+        :return: None.
+        """
+        with self._condition:
+            if self.quota_bytes is not None and self.used_bytes >= self.quota_bytes:
+                logger.info(
+                    "Scratch quota of %d bytes reached, throttling splitting",
+                    self.quota_bytes,
+                )
+            self._condition.wait_for(
+                lambda: self.quota_bytes is None or self.used_bytes < self.quota_bytes
+            )
+
+    def add(self, file_paths: Iterable[str]) -> None:
+        """
+        :param file_paths: Paths of frames written to scratch.
+        :return: None.
+        """
+        with self._condition:
+            for file_path in file_paths:
+                size = Path(file_path).stat().st_size
+                self._sizes[str(file_path)] = size
+                self.used_bytes += size
+
+    def release(self, file_path: str) -> None:
+        """
+        Delete a frame once it has been scored and wake up a throttled splitter.
+        :param file_path: Path of a frame previously added.
+        :return: None.
+        """
+        Path(file_path).unlink(missing_ok=True)
+        with self._condition:
+            self.used_bytes -= self._sizes.pop(str(file_path), 0)
+            self._condition.notify_all()
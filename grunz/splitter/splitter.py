@@ -1,29 +1,224 @@
 """This module handles splitting video into component JPEGs for passing to MegaDetector."""
 
+import subprocess
+import tempfile
+from enum import Enum
 from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 from moviepy import VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from PIL import Image
 
 from grunz.file_utils.file_utils import FileUtils
 
 
+class SplitterBackend(Enum):
+    """Decoders available to the Splitter."""
+
+    MOVIEPY = "moviepy"
+    FFMPEG = "ffmpeg"
+
+
 class Splitter:
     """This class splits videos into component JPEGs."""
 
-    def __init__(self, file_path):
-
+    def __init__(self, file_path, export_dir=None, backend=SplitterBackend.MOVIEPY):
+        """
+        :param file_path: Path to the video to split.
+        :param export_dir: Directory the JPEGs are written to. Defaults to the
+          directory of the video.
+        :param backend: A `SplitterBackend` or its value. moviepy by default.
+        """
         self.file_path = file_path
+        self.export_dir = export_dir
+        self.backend = SplitterBackend(backend)
+
+    @staticmethod
+    def probe_metadata(file_path: str) -> Dict:
+        """
+        Only the container header is read; nothing is decoded.
+        :param file_path: Path to a video.
+        :return: The "duration" in seconds, the frame "size" as displayed (width,
+          height)
+          and the "fps" of the video. Duration and fps are None when the header lacks
+          them.
+        """
+        infos = ffmpeg_parse_infos(file_path)
+        width, height = infos["video_size"]
+        if abs(infos.get("video_rotation", 0)) in (90, 270):
+            width, height = height, width
+        return {
+            "duration": infos.get("duration"),
+            "size": (width, height),
+            "fps": infos.get("video_fps"),
+        }
+
+    @staticmethod
+    def probe_size(file_path: str) -> Tuple[int, int]:
+        """
+        :param file_path: Path to a video.
+        :return: The (width, height) of its frames as displayed, read from the container
+          header.
+        """
+        return Splitter.probe_metadata(file_path)["size"]
+
+    @staticmethod
+    def frame_count(duration: float, fps_value: float) -> int:
+        """
+        :return: The number of frames sampled from a video of `duration` seconds.
+        """
+        return len(np.arange(0, duration, 1.0 / fps_value))
 
-    def export_frames_to_jpeg(self, fps_value: float) -> None:
+    @staticmethod
+    def fit_within(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+        """
+        :param size: A (width, height) pair.
+        :param max_size: Maximum length of the longer side. Frames are never upscaled.
+        :return: The (width, height) scaled down to fit, keeping the aspect ratio.
+        """
+        scale = min(1.0, max_size / max(size))
+        return tuple(max(1, round(side * scale)) for side in size)
+
+    def export_frames_to_jpeg(
+        self, fps_value: float, max_size: Optional[int] = None
+    ) -> List[Dict]:
         """
         :param fps_value: Number of frames per second to consider when writing the
           clip. 0.4 loosely corresponds to 5 images per 1 minute clip.
-        :return: None.
+        :param max_size: When given, ffmpeg scales frames during decode so their longer
+          side is at most this many pixels. The scaling is recorded per frame under
+          "letterbox" so detections can be mapped back to original pixels.
+        :return: A list of frame records, one per JPEG written. Each holds the JPEG
+          path, the source video path, the frame index and the timestamp in seconds.
         """
-        clip = VideoFileClip(self.file_path)
+        letterbox = None
+        frame_size = None
+        if max_size or self.backend is SplitterBackend.FFMPEG:
+            source_size = Splitter.probe_size(self.file_path)
+            frame_size = (
+                Splitter.fit_within(source_size, max_size) if max_size else source_size
+            )
+            if frame_size != source_size:
+                letterbox = {
+                    "scale": [f / s for f, s in zip(frame_size, source_size)],
+                    "pad": [0.0, 0.0],
+                }
 
-        export_parent_path = f"{Path(self.file_path).parent}"
-        jpeg_filename = FileUtils.convert_path_name(self.file_path)
-        return clip.write_images_sequence(
-            f"{export_parent_path}/{jpeg_filename}-%03d.jpeg", fps=fps_value
+        export_parent_path = f"{self.export_dir or Path(self.file_path).parent}"
+        jpeg_prefix = (
+            f"{export_parent_path}/{FileUtils.convert_path_name(self.file_path)}"
         )
+
+        if self.backend is SplitterBackend.FFMPEG:
+            written = self.__write_frames_with_ffmpeg(
+                fps_value, frame_size, jpeg_prefix
+            )
+        else:
+            target_resolution = frame_size if letterbox else None
+            written = self.__write_frames_with_moviepy(
+                fps_value, target_resolution, jpeg_prefix
+            )
+
+        frames = []
+        for frame_index, timestamp, jpeg_path in written:
+            frame = {
+                "file": jpeg_path,
+                "source": str(self.file_path),
+                "frame_index": frame_index,
+                "timestamp": float(timestamp),
+            }
+            if letterbox:
+                frame["letterbox"] = letterbox
+            frames.append(frame)
+        return frames
+
+    def __write_frames_with_moviepy(
+        self, fps_value: float, target_resolution, jpeg_prefix: str
+    ) -> Iterator[Tuple[int, float, str]]:
+        clip = VideoFileClip(self.file_path, target_resolution=target_resolution)
+        try:
+            for frame_index, timestamp in enumerate(
+                np.arange(0, clip.duration, 1.0 / fps_value)
+            ):
+                jpeg_path = f"{jpeg_prefix}-{frame_index:03d}.jpeg"
+                clip.save_frame(jpeg_path, timestamp)
+                yield frame_index, timestamp, jpeg_path
+        finally:
+            clip.close()
+
+    def __write_frames_with_ffmpeg(
+        self, fps_value: float, frame_size: Tuple[int, int], jpeg_prefix: str
+    ) -> Iterator[Tuple[int, float, str]]:
+        for frame_index, timestamp, rgb in self.iter_rgb_frames(fps_value, frame_size):
+            jpeg_path = f"{jpeg_prefix}-{frame_index:03d}.jpeg"
+            Image.fromarray(rgb).save(jpeg_path)
+            yield frame_index, timestamp, jpeg_path
+
+    def iter_rgb_frames(
+        self, fps_value: float, frame_size: Tuple[int, int]
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """
+        Decode with a single ffmpeg subprocess piping rawvideo RGB24. Sampling and
+        scaling happen inside ffmpeg through the fps and scale filters.
+        :param fps_value: Number of frames per second to sample.
+        :param frame_size: The (width, height) ffmpeg scales frames to.
+        :return: (frame index, timestamp, frame) tuples. The frame is a pre-allocated
+          buffer that is overwritten by the next frame; copy it to keep it.
+        """
+        width, height = frame_size
+        command = [
+            FFMPEG_BINARY,
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-i",
+            str(self.file_path),
+            "-an",
+            "-sn",
+            "-vf",
+            f"fps={fps_value},scale={width}:{height}",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "pipe:1",
+        ]
+        buffer = np.empty((height, width, 3), dtype=np.uint8)
+        view = memoryview(buffer).cast("B")
+
+        # stderr goes to a file so a chatty ffmpeg can never block on a full pipe.
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                frame_index = 0
+                while Splitter.__read_exactly(process.stdout, view):
+                    yield frame_index, frame_index / fps_value, buffer
+                    frame_index += 1
+
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    raise IOError(
+                        f"ffmpeg could not decode {self.file_path}: "
+                        f"{stderr.read().decode(errors='replace').strip()}"
+                    )
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+
+    @staticmethod
+    def __read_exactly(stream: BinaryIO, view: memoryview) -> bool:
+        """
+        :return: True if the view was filled, False on end of stream.
+        """
+        filled = 0
+        while filled < len(view):
+            count = stream.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
@@ -0,0 +1,235 @@
+"""This module handles splitting videos in a killable subprocess under a timeout."""
+
+import glob
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from grunz.file_utils.file_utils import FileUtils
+from grunz.splitter.splitter import Splitter, SplitterBackend
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the wall-clock and CPU time of a job.
+POLL_INTERVAL = 0.25
+
+PROC = Path("/proc")
+
+
+class SplitTimeout(IOError):
+    """Raised when a video is not split within its wall-clock or CPU time limit."""
+
+
+def _context():
+    # A fork server forks each job from a clean, single-threaded process with the
+    # splitter already imported, so jobs start quickly without forking our threads.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["grunz.watchdog.watchdog"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _group_cpu_seconds(pgid: int) -> Optional[float]:
+    """
+    :param pgid: A process group.
+    :return: CPU seconds used by the processes in the group and the children they
+      reaped, None where /proc is not available.
+    """
+    if not PROC.joinpath("self", "stat").exists():
+        return None
+    ticks = 0
+    for stat_path in PROC.glob("[0-9]*/stat"):
+        try:
+            stat = stat_path.read_text()
+        except OSError:  # The process exited.
+            continue
+        # Fields after the parenthesised command name, which may itself hold spaces.
+        fields = stat[stat.rindex(")") + 2 :].split()
+        if int(fields[2]) == pgid:
+            ticks += sum(int(field) for field in fields[11:15])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def _split_job(
+    connection,
+    file_path: str,
+    export_dir: Optional[str],
+    backend: str,
+    fps_value: float,
+    max_size: Optional[int],
+) -> None:
+    """
+    Runs in the subprocess. Sends ("frames", frame records) or ("error", message) back.
+    """
+    if hasattr(os, "setpgrp"):
+        # Own process group, so ffmpeg children are killed along with this process.
+        os.setpgrp()
+
+    try:
+        frames = Splitter(file_path, export_dir, backend).export_frames_to_jpeg(
+            fps_value, max_size
+        )
+    except Exception as error:
+        connection.send(("error", f"{type(error).__name__}: {error}"))
+    else:
+        connection.send(("frames", frames))
+    finally:
+        connection.close()
+
+
+class SplitWatchdog:
+    """This class splits each video in its own subprocess and kills it when it hangs.
+
+    Corrupt videos can make moviepy or ffmpeg hang rather than raise. A job that
+    exceeds the wall-clock timeout, or whose process group, ffmpeg children included,
+    exceeds the CPU timeout, is killed along with its children. Either way SplitTimeout
+    is raised and any JPEGs the job already wrote are removed.
+    """
+
+    def __init__(
+        self, wall_timeout: Optional[float] = None, cpu_timeout: Optional[float] = None
+    ):
+        """
+        :param wall_timeout: Seconds a video may take to split. Unbounded when None.
+        :param cpu_timeout: CPU seconds a video may use to split. Unbounded when None.
+          Not enforced on platforms without /proc.
+        """
+        self.wall_timeout = wall_timeout
+        self.cpu_timeout = cpu_timeout
+        self._context = _context()
+
+    def export_frames_to_jpeg(
+        self,
+        file_path: str,
+        export_dir: Optional[Path],
+        backend: str = SplitterBackend.MOVIEPY.value,
+        fps_value: float = 0.4,
+        max_size: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        :return: The frame records of `Splitter.export_frames_to_jpeg`.
+        :raises SplitTimeout: When the job exceeds a timeout.
+        :raises IOError: When the job fails.
+        """
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_split_job,
+            args=(
+                sender,
+                str(file_path),
+                str(export_dir) if export_dir else None,
+                SplitterBackend(backend).value,
+                fps_value,
+                max_size,
+            ),
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+
+        try:
+            self.__wait(receiver, process, file_path)
+            try:
+                status, payload = receiver.recv()
+            except EOFError:
+                process.join()
+                raise IOError(
+                    f"{file_path} split exited with code {process.exitcode}"
+                ) from None
+            if status == "error":
+                raise IOError(f"{file_path} could not be split: {payload}")
+            return payload
+        except IOError:
+            SplitWatchdog.__kill(process)
+            SplitWatchdog.__remove_partial_frames(file_path, export_dir)
+            raise
+        finally:
+            receiver.close()
+            process.join()
+
+    def __wait(self, receiver, process, file_path: str) -> None:
+        """
+        Waits for the job to send its result.
+        :raises SplitTimeout: When the job exceeds a timeout first.
+        """
+        started = time.monotonic()
+        while not receiver.poll(POLL_INTERVAL):
+            if self.wall_timeout and time.monotonic() - started >= self.wall_timeout:
+                raise SplitTimeout(
+                    f"{file_path} was not split within {self.wall_timeout} seconds"
+                )
+            if self.cpu_timeout:
+                cpu_seconds = _group_cpu_seconds(process.pid)
+                if cpu_seconds is not None and cpu_seconds > self.cpu_timeout:
+                    raise SplitTimeout(
+                        f"{file_path} was not split within "
+                        f"{self.cpu_timeout} CPU seconds"
+                    )
+
+    @staticmethod
+    def __kill(process) -> None:
+        if process.exitcode is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # No process groups, or the job has not made its own yet.
+            process.kill()
+        process.join()
+
+    @staticmethod
+    def __remove_partial_frames(file_path: str, export_dir: Optional[Path]) -> None:
+        parent = export_dir or Path(file_path).parent
+        prefix = glob.escape(f"{parent}/{FileUtils.convert_path_name(str(file_path))}")
+        for jpeg_path in glob.glob(f"{prefix}-*.jpeg"):
+            os.remove(jpeg_path)
+
+
+class Quarantine:
+    """This class keeps the list of videos that timed out, so later runs can skip them.
+
+    The list is a text file with one tab separated video path and reason per line.
+    """
+
+    def __init__(self, list_path: Path):
+        self.list_path = Path(list_path)
+        self.entries = {}
+        if self.list_path.exists():
+            for line in self.list_path.read_text().splitlines():
+                file_path, _, reason = line.partition("\t")
+                if file_path:
+                    self.entries[file_path] = reason
+
+    def __contains__(self, file_path) -> bool:
+        return str(file_path) in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, file_path: str, reason: str) -> None:
+        """
+        :param file_path: A video that could not be split in time.
+        :param reason: Why it was quarantined.
+        """
+        self.entries[str(file_path)] = reason.replace("\n", " ")
+        self.__save()
+
+    def remove(self, file_path: str) -> None:
+        """
+        :param file_path: A video that has since been split successfully.
+        """
+        if self.entries.pop(str(file_path), None) is not None:
+            self.__save()
+
+    def __save(self) -> None:
+        self.list_path.parent.mkdir(parents=True, exist_ok=True)
+        self.list_path.write_text(
+            "".join(
+                f"{file_path}\t{reason}\n" for file_path, reason in self.entries.items()
+            )
+        )
@@ -2,16 +2,49 @@
 MegaDetector pipeline."""
 
 import argparse
-import json
+import contextlib
+import datetime
 import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from grunz.detector import convert_result, create_detector
+from grunz.archive.archive import Archive
+from grunz.background.background import BackgroundMode, BandwidthLimiter
+from grunz.batcher.batcher import AdaptiveBatcher
+from grunz.detector import (
+    DEFAULT_CASCADE_BAND,
+    SCREEN_MODEL_VERSION,
+    CpuProfile,
+    DetectorBackend,
+    convert_result,
+    create_cascade,
+    create_detector,
+    detect_batch,
+    detector_input_size,
+    model_input_size,
+)
+from grunz.events.events import DEFAULT_EVENT_GAP, EventScheduler, GroupingPolicy
 from grunz.file_utils.file_utils import FileUtils
-from grunz.json_parser.json_parser import JSONParser
-from grunz.splitter.splitter import Splitter
-
+from grunz.json_parser.json_parser import (
+    CODECS,
+    Categories,
+    ConfidenceRating,
+    JSONParser,
+    write_json,
+)
+from grunz.loader.loader import Prefetcher
+from grunz.planner.planner import DETECT_THROUGHPUT, SPLIT_THROUGHPUT, Planner
+from grunz.pool.pool import DetectorPool
+from grunz.profiler.profiler import DEFAULT_SAMPLE_EVERY, DEFAULT_TOP, StageProfiler
+from grunz.scratch.scratch import Scratch
+from grunz.splitter.splitter import Splitter, SplitterBackend
+from grunz.watchdog.watchdog import Quarantine, SplitTimeout, SplitWatchdog
 
 logger = logging.getLogger(__name__)
 
@@ -20,57 +53,561 @@ class OneMinuteVideo(Enum):
     FIVE_IMAGES = 0.4
 
 
-def pre_pro(root_video_directory: str) -> str:
+class InputMode(Enum):
+    """Kinds of camera trap input pre pro accepts."""
+
+    VIDEO = "video"
+    STILLS = "stills"
+
+
+STILL_EXTENSIONS = ("JPG", "jpg", "JPEG", "jpeg")
+
+OUTPUT_FORMATS = ["json"] + [f"json{suffix}" for suffix in CODECS]
+
+
+@dataclass
+class PreProSettings:
+    """Options of a pre pro run, see `pre_pro`.
+
+    :param scratch_directory: Directory for extracted JPEGs. Defaults to tmpfs when
+      available.
+    :param scratch_quota_bytes: Splitting pauses while scratch holds this many bytes.
+      Unbounded by default.
+    :param decode_at_detector_size: Downscale frames during decode to the detector's
+      input size. Detections are still reported in source video pixels.
+    :param splitter_backend: "moviepy", or "ffmpeg" to decode through a rawvideo pipe.
+    :param input_mode: "video" to split AVIs, or "stills" for camera traps shooting
+      JPEGs.
+    :param detector_backend: "pytorch", or "onnx" to run a cached ONNX export on CPU.
+    :param quantize: Use an int8 dynamically quantized model with the ONNX backend.
+    :param cpu_profile: Threading, layout and precision profile for the PyTorch backend.
+    :param detector_workers: Number of detector processes, each pinned to its own cores.
+      1 scores in this process. None sizes the pool from the available cores.
+    :param batch_size: Pin the detection batch size. Tuned at runtime by default.
+    :param memory_budget_bytes: RSS above which the tuned batch size backs off.
+    :param latency_budget: Seconds a batch may take before the tuned batch size backs
+      off.
+    :param cascade_screen: Screen every image with this model version first and only run
+      the full model where its max animal confidence falls within `cascade_band`.
+    :param cascade_band: Low and high screening confidences that escalate an image.
+    :param profile: Profile the split, load, detect and write stages with cProfile and
+      tracemalloc. Dumps and an allocation report are written next to the output JSON.
+    :param profile_every: Profile one in this many calls of each stage.
+    :param profile_top: Number of allocation sites reported.
+    :param split_timeout: Wall-clock seconds a video may take to split. Setting either
+      timeout splits each video in a subprocess that is killed when it is exceeded.
+    :param split_cpu_timeout: CPU seconds a video may use to split.
+    :param quarantine_file: List of videos that timed out. Defaults to `quarantine.txt`
+      in the output directory. Listed videos are skipped.
+    :param retry_quarantined: Split quarantined videos again, unlisting those that
+      succeed.
+    :param background: Run with capped resources and lowered CPU and I/O priority, then
+      report throughput against the caps.
+    :param max_threads: CPU threads a background run may use. A quarter of the cores by
+      default.
+    :param max_bandwidth_bytes: Bytes/sec a background run may read and write while
+      splitting.
+    :param output_format: "json", or a compressed format such as "json.gz" which is
+      compressed as it is written.
+    :param group_events: Group videos into trigger bursts per camera directory and score
+      one representative per event first. See `EventScheduler`.
+    :param event_gap: Longest gap in seconds between file timestamps within an event.
+    :param event_policy: "representative" scores the rest of an event only when its
+      representative is inconclusive, "all" always scores them.
+    """
+
+    scratch_directory: Optional[str] = None
+    scratch_quota_bytes: Optional[int] = None
+    decode_at_detector_size: bool = False
+    splitter_backend: str = SplitterBackend.MOVIEPY.value
+    input_mode: str = InputMode.VIDEO.value
+    detector_backend: str = DetectorBackend.PYTORCH.value
+    quantize: bool = False
+    cpu_profile: str = CpuProfile.DEFAULT.value
+    detector_workers: Optional[int] = 1
+    batch_size: Optional[int] = None
+    memory_budget_bytes: Optional[int] = None
+    latency_budget: Optional[float] = None
+    cascade_screen: Optional[str] = None
+    cascade_band: Tuple[float, float] = DEFAULT_CASCADE_BAND
+    profile: bool = False
+    profile_every: int = DEFAULT_SAMPLE_EVERY
+    profile_top: int = DEFAULT_TOP
+    split_timeout: Optional[float] = None
+    split_cpu_timeout: Optional[float] = None
+    quarantine_file: Optional[str] = None
+    retry_quarantined: bool = False
+    background: bool = False
+    max_threads: Optional[int] = None
+    max_bandwidth_bytes: Optional[int] = None
+    output_format: str = "json"
+    group_events: bool = False
+    event_gap: float = DEFAULT_EVENT_GAP
+    event_policy: str = GroupingPolicy.REPRESENTATIVE.value
+
+
+@dataclass
+class SplitContext:
+    """What the split producer needs besides the videos, see `_split_videos`.
+
+    :param scratch: Scratch the frames are extracted to.
+    :param max_size: Longest side frames are downscaled to during decode. Full size when
+      None.
+    :param splitter_backend: "moviepy" or "ffmpeg".
+    :param profiler: Profiles the split stage when given.
+    :param watchdog: Splits each video in a killable subprocess when given.
+    :param quarantine: Videos that timed out are added to it.
+    :param limiter: Paces the bytes each video reads and writes.
+    :param archive: The archive the videos are spooled out of.
+    """
+
+    scratch: Scratch
+    max_size: Optional[int] = None
+    splitter_backend: str = SplitterBackend.MOVIEPY.value
+    profiler: Optional[StageProfiler] = None
+    watchdog: Optional[SplitWatchdog] = None
+    quarantine: Optional[Quarantine] = None
+    limiter: Optional[BandwidthLimiter] = None
+    archive: Optional[Archive] = None
+
+
+def _split_videos(
+    avi_file_paths: Iterable[str],
+    context: SplitContext,
+    frame_queue: queue.Queue,
+) -> None:
+    """
+    Producer side of pre pro. Splits each video into scratch, waiting whenever the
+    scratch quota is reached, and queues the frame records for scoring.
+    With a watchdog each video is split in a subprocess that is killed when it hangs,
+    and videos that time out are added to the quarantine. With a limiter each video's
+    reads and writes are paced to its bandwidth. Videos spooled out of an archive are
+    recorded under the archive and member they came from.
+    Any other error ends the split and is queued for the consumer to raise.
+    A `None` sentinel is queued once every video has been handled.
+    """
+    scratch, archive, quarantine = context.scratch, context.archive, context.quarantine
+    try:
+        for avi_file_path in avi_file_paths:
+            source = avi_file_path
+            if archive is not None:
+                member = archive.member_of(avi_file_path)
+                source = archive.source(member)
+            scratch.wait_for_space()
+            try:
+                with _stage(context.profiler, "split"):
+                    if context.watchdog:
+                        frames = context.watchdog.export_frames_to_jpeg(
+                            avi_file_path,
+                            scratch.run_directory,
+                            context.splitter_backend,
+                            OneMinuteVideo.FIVE_IMAGES.value,
+                            context.max_size,
+                        )
+                    else:
+                        frames = Splitter(
+                            str(avi_file_path),
+                            scratch.run_directory,
+                            context.splitter_backend,
+                        ).export_frames_to_jpeg(
+                            OneMinuteVideo.FIVE_IMAGES.value, context.max_size
+                        )
+            except IOError as error:
+                logger.error("%s could not be read", source, exc_info=True)
+                if isinstance(error, SplitTimeout) and quarantine is not None:
+                    quarantine.add(source, str(error))
+                continue
+
+            if quarantine is not None:
+                quarantine.remove(source)
+            if archive is not None:
+                for frame in frames:
+                    frame.update(
+                        source=source, archive=archive.archive_path, member=member
+                    )
+            if context.limiter is not None:
+                context.limiter.consume(
+                    os.path.getsize(avi_file_path)
+                    + sum(os.path.getsize(frame["file"]) for frame in frames)
+                )
+
+            scratch.add(frame["file"] for frame in frames)
+            for frame in frames:
+                frame_queue.put(frame)
+    except Exception as error:
+        frame_queue.put(error)
+    finally:
+        frame_queue.put(None)
+
+
+def _iter_split_frames(
+    avi_file_paths: Iterable[str], context: SplitContext
+) -> Iterator[Dict]:
+    """
+    :return: Frame records, yielded while the remaining videos are split in the
+      background.
+    :raises Exception: Whatever error ended the split, once its frames have been
+      yielded.
+    """
+    frame_queue = queue.Queue()
+    threading.Thread(
+        target=_split_videos, args=(avi_file_paths, context, frame_queue), daemon=True
+    ).start()
+
+    while (frame := frame_queue.get()) is not None:
+        if isinstance(frame, Exception):
+            raise frame
+        yield frame
+
+
+def _iter_still_frames(file_utils: FileUtils) -> Iterator[Dict]:
+    """
+    :return: A frame record for every still image, each being its own source.
+    """
+    still_file_paths = sorted(
+        {
+            file_path
+            for extension in STILL_EXTENSIONS
+            for file_path in file_utils.find_files_recursively(extension)
+        }
+    )
+    for still_file_path in still_file_paths:
+        yield {
+            "file": still_file_path,
+            "source": still_file_path,
+            "frame_index": 0,
+            "timestamp": None,
+        }
+
+
+def _stage(profiler: Optional[StageProfiler], name: str):
+    """
+    :return: A context profiling stage `name`, or doing nothing when not profiling.
+    """
+    return profiler.stage(name) if profiler else contextlib.nullcontext()
+
+
+def _score_batches(
+    detector,
+    frames: Iterable[Dict],
+    batcher: AdaptiveBatcher,
+    profiler: Optional[StageProfiler] = None,
+    prefetch_workers: int = 4,
+    on_skip: Optional[Callable[[Dict], None]] = None,
+) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    :param on_skip: Called with the frame record of every image that cannot be read.
+    :return: (frame record, detection result) pairs, scored in batches sized by
+      `batcher`.
+    """
+    load_image = profiler.wrap("load", Prefetcher.load_image) if profiler else None
+    prefetcher = Prefetcher(
+        frames, batcher.batch_size, prefetch_workers, load_image, on_skip
+    )
+
+    def score(pairs):
+        with _stage(profiler, "detect"):
+            return detect_batch(
+                detector,
+                [image for _, image in pairs],
+                [frame["file"] for frame, _ in pairs],
+            )
+
+    for batch in batcher.batches(prefetcher):
+        results = batcher.run(batch, score)
+        prefetcher.batch_size = batcher.batch_size
+        yield from zip((frame for frame, _ in batch), results)
+
+
+def _event_scheduler(
+    sources: Dict[str, str],
+    archive: Optional[Archive],
+    event_gap: float,
+    event_policy: str,
+) -> EventScheduler:
+    """
+    :param sources: Video file paths, or archive members, by source.
+    :return: A scheduler grouping the sources by camera directory and file timestamp.
+    """
+    if archive:
+        member_times = archive.member_times()
+        return EventScheduler(
+            sources,
+            lambda source: str(Path(sources[source]).parent),
+            lambda source: member_times[sources[source]],
+            event_gap,
+            event_policy,
+        )
+    return EventScheduler(
+        sources,
+        lambda source: str(Path(source).parent),
+        os.path.getmtime,
+        event_gap,
+        event_policy,
+    )
+
+
+def _score_events(
+    scheduler: EventScheduler,
+    split: Callable[[List[str]], Iterator[Dict]],
+    score: Callable[[Iterable[Dict]], None],
+    results: List[Dict],
+) -> List[Dict]:
+    """
+    Scores the representative of every event, then the rest of the events that need it.
+    :param split: Returns the frame records of the given sources.
+    :param score: Scores frame records into `results`.
+    :return: The verdicts inferred for videos that were skipped.
+    """
+    score(split(scheduler.representatives()))
+    verdicts = {video["file"]: video for video in JSONParser.summarise_videos(results)}
+    score(split(scheduler.remaining(verdicts)))
+
+    frames_per_video = {}
+    for image in results:
+        frames_per_video[image["source"]] = frames_per_video.get(image["source"], 0) + 1
+    logger.info(scheduler.report(frames_per_video, verdicts))
+    return scheduler.inferred(verdicts)
+
+
+def _score_frames(
+    detector,
+    frames: Iterable[Dict],
+    pooled: bool,
+    batcher: AdaptiveBatcher,
+    profiler: Optional[StageProfiler] = None,
+    prefetch_workers: int = 4,
+    on_skip: Optional[Callable[[Dict], None]] = None,
+) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    :param on_skip: Called with the frame record of every image that cannot be scored.
+    :return: (frame record, detection result) pairs in the order of `frames`.
+    """
+    if pooled:
+        return detector.imap(frames, on_skip)
+    return _score_batches(
+        detector, frames, batcher, profiler, prefetch_workers, on_skip
+    )
+
+
+def pre_pro(
+    root_video_directory: str, settings: Optional[PreProSettings] = None
+) -> str:
     """
     This is the procedural glue for pre pro. It includes:
         - Recursively returning AVI files.
         - Splitting the resultant files into component JPEGs.
-        - Formatting JPEG filenames for retrieval during post.
+        - Recording the source video, frame index and timestamp of each JPEG.
         - Running MegaDetector model against resultant JPEGs.
-        - Producing a JSON representing the detection results.
-    Running this function will result in an output.json file here: `grunz/output`.
-    :param root_video_directory: Top level directory containing video files.
-    :return: None.
+        - Producing a JSON representing the detection results and a verdict per video.
+    JPEGs are written to a scratch directory and deleted as soon as they are scored,
+    so peak disk use is bounded by the scratch quota rather than the archive size.
+    In stills mode the JPEGs found under the root are scored directly instead.
+    Images are decoded on a thread pool ahead of inference either way.
+    Running this function will result in a time stamped output file here:
+    `<root parent>/output/<YYYYmmdd-HHMM>.<output format>`, e.g. `20260101-1200.json`.
+    :param root_video_directory: Top level directory containing video files, or a tar or
+      zip archive of them. Archive members are spooled into scratch one at a time.
+    :param settings: Options of the run. The defaults of `PreProSettings` when None.
+    :return: Path to the output file.
     """
+    start = time.monotonic()
+    settings = settings or PreProSettings()
+    input_mode = InputMode(settings.input_mode)
     file_utils = FileUtils(Path(root_video_directory))
-    avi_file_paths = file_utils.find_files_recursively("AVI")
 
-    for avi_file_path in avi_file_paths:
-        try:
-            Splitter(str(avi_file_path)).export_frames_to_jpeg(
-                OneMinuteVideo.FIVE_IMAGES.value
-            )
-        except IOError:
-            logger.error("%s could not be read", avi_file_path, exc_info=True)
-            continue
+    archive = None
+    if Archive.is_archive(root_video_directory):
+        if input_mode is InputMode.STILLS:
+            raise ValueError("Archives can only be read in video input mode")
+        archive = Archive(Path(root_video_directory).resolve())
 
-    detector = create_detector()
-    jpeg_file_paths = file_utils.find_files_recursively("jpeg")
+    background_mode = None
+    prefetch_workers = 4
+    if settings.background:
+        background_mode = BackgroundMode(
+            settings.max_threads, settings.max_bandwidth_bytes
+        )
+        background_mode.apply()
+        prefetch_workers = background_mode.decode_threads
+
+    detector_settings = dict(
+        backend=settings.detector_backend,
+        quantize=settings.quantize,
+        cpu_profile=settings.cpu_profile,
+    )
+    factory = create_detector
+    if settings.cascade_screen:
+        factory = create_cascade
+        detector_settings.update(
+            screen_version=settings.cascade_screen, band=tuple(settings.cascade_band)
+        )
+
+    pooled = settings.detector_workers != 1
+    if pooled:
+        cores = background_mode.cores if background_mode else None
+        detector_context = DetectorPool(
+            settings.detector_workers, factory, cores, **detector_settings
+        )
+    else:
+        if background_mode:
+            detector_settings["threads"] = background_mode.inference_threads
+        detector_context = contextlib.nullcontext(factory(**detector_settings))
     output_dir = Path(root_video_directory).parent / "output"
-    output_json = file_utils.create_json_output_file(output_dir)
+    output_json = file_utils.create_json_output_file(output_dir, settings.output_format)
+    watchdog = None
+    if settings.split_timeout or settings.split_cpu_timeout:
+        watchdog = SplitWatchdog(settings.split_timeout, settings.split_cpu_timeout)
+    quarantine = Quarantine(settings.quarantine_file or output_dir / "quarantine.txt")
+
+    profiler = None
+    if settings.profile:
+        profile_dir = Path(output_json).with_name(
+            f"{Path(output_json).name.split('.')[0]}-profile"
+        )
+        profiler = StageProfiler(
+            profile_dir, settings.profile_every, settings.profile_top
+        )
+
+    batcher = AdaptiveBatcher(
+        initial_size=settings.batch_size or 1,
+        memory_budget_bytes=settings.memory_budget_bytes,
+        latency_budget=settings.latency_budget,
+        fixed=settings.batch_size is not None,
+    )
+    if pooled:
+        # Workers score one image at a time in their own processes, out of reach of
+        # the batcher and the profiler.
+        logger.info("Batch size tuning is off with --detector-workers")
+        if profiler:
+            logger.info("The load and detect stages are not profiled with workers")
+        if (
+            settings.batch_size
+            or settings.memory_budget_bytes
+            or settings.latency_budget
+        ):
+            logger.warning(
+                "--batch-size, --memory-budget and --latency-budget are ignored with "
+                "--detector-workers"
+            )
 
     results = []
-    for image_path in jpeg_file_paths:
-        pw_result = detector.single_image_detection(image_path)
-        results.append(convert_result(pw_result))
+    inferred_videos = []
+    with (
+        Scratch(settings.scratch_directory, settings.scratch_quota_bytes) as scratch,
+        detector_context as detector,
+    ):
+        split_context = SplitContext(
+            scratch,
+            detector_input_size(detector) if settings.decode_at_detector_size else None,
+            settings.splitter_backend,
+            profiler,
+            watchdog,
+            quarantine,
+            background_mode.limiter if background_mode else None,
+            archive,
+        )
+
+        def release(frame: Dict) -> None:
+            if input_mode is InputMode.VIDEO:
+                scratch.release(frame["file"])
+
+        def score(frames: Iterable[Dict]) -> None:
+            scored = _score_frames(
+                detector, frames, pooled, batcher, profiler, prefetch_workers, release
+            )
+            for frame, pw_result in scored:
+                results.append(convert_result(pw_result, frame))
+                release(frame)
+
+        def split(selected_sources: List[str]) -> Iterator[Dict]:
+            avi_file_paths = [sources[source] for source in selected_sources]
+            if archive:
+                avi_file_paths = archive.spool_members(
+                    avi_file_paths, scratch.run_directory
+                )
+            return _iter_split_frames(avi_file_paths, split_context)
+
+        if input_mode is InputMode.STILLS:
+            score(_iter_still_frames(file_utils))
+        else:
+            if archive:
+                sources = {archive.source(m): m for m in archive.list_members("AVI")}
+            else:
+                sources = {p: p for p in file_utils.find_files_recursively("AVI")}
+            if not settings.retry_quarantined:
+                for source in sources:
+                    if source in quarantine:
+                        logger.warning("%s is quarantined, skipping", source)
+                sources = {
+                    s: path for s, path in sources.items() if s not in quarantine
+                }
+
+            if settings.group_events:
+                inferred_videos = _score_events(
+                    _event_scheduler(
+                        sources, archive, settings.event_gap, settings.event_policy
+                    ),
+                    split,
+                    score,
+                    results,
+                )
+                if archive:
+                    for video in inferred_videos:
+                        video.update(
+                            archive=archive.archive_path, member=sources[video["file"]]
+                        )
+            else:
+                score(split(list(sources)))
+
+    if len(quarantine):
+        logger.warning(
+            "%d videos are quarantined, see %s", len(quarantine), quarantine.list_path
+        )
+    if not pooled:
+        logger.info("Detection batch size ended at %d", batcher.batch_size)
+        if settings.cascade_screen:
+            logger.info(
+                "Cascade escalated %.1f%% of images", 100 * detector.escalation_rate
+            )
+
+    videos = JSONParser.summarise_videos(results) + inferred_videos
+
+    with _stage(profiler, "write"):
+        write_json(output_json, {"images": results, "videos": videos})
 
-    with open(output_json, "w") as output_file:
-        json.dump({"images": results}, output_file)
+    if profiler:
+        profiler.write()
+    if background_mode:
+        logger.info(background_mode.report(len(results), time.monotonic() - start))
 
     return output_json
 
 
-def post_pro(mega_detector_json, output_dir: Path = None) -> None:
+def post_pro(
+    mega_detector_json,
+    output_dir: Path = None,
+    background: bool = False,
+    max_bandwidth_bytes: Optional[int] = None,
+) -> None:
     """
     This is the procedural glue for post pro. It includes:
-        - Parsing MegaDetector JSON to ascertain positive results.
-        - Finding the AVI from which the JPEG derives.
+        - Parsing MegaDetector JSON to ascertain positive videos.
         - Sorting positive results from negative.
+    Positive videos read from an archive are extracted from it, and only those.
     :param mega_detector_json: Path to the MegaDetector JSON output file.
     :param output_dir: Base directory for positive detection output.
         Defaults to the parent directory of the JSON file.
+    :param background: Copy with lowered CPU and I/O priority.
+    :param max_bandwidth_bytes: Bytes/sec a background copy may read and write.
     :return: None.
     """
+    limiter = None
+    if background:
+        background_mode = BackgroundMode(bandwidth_bytes=max_bandwidth_bytes)
+        background_mode.apply()
+        limiter = background_mode.limiter
+
     if output_dir is None:
         output_dir = Path(mega_detector_json).parent
 
@@ -81,12 +618,19 @@ def post_pro(mega_detector_json, output_dir: Path = None) -> None:
 
     json_parser = JSONParser(mega_detector_json)
 
-    positive_detection_results = json_parser.filter_json_for_detection_results()
-    positive_jpeg_file_paths = json_parser.extract_file_paths(
-        positive_detection_results
-    )
-    positive_avi_paths = json_parser.convert_jpeg_paths_to_avi_paths(positive_jpeg_file_paths)
-    avi_paths_set = file_utils.remove_duplicates_from_list(positive_avi_paths)
+    positive_videos = json_parser.filter_json_for_positive_videos()
+
+    archived_members = {}
+    for video in positive_videos:
+        if "archive" in video:
+            archived_members.setdefault(video["archive"], []).append(video["member"])
+    for archive_path, members in archived_members.items():
+        Archive(archive_path).extract_members(
+            members, positive_detection_path / Path(archive_path).name, limiter
+        )
+
+    positive_videos = [video for video in positive_videos if "archive" not in video]
+    avi_paths_set = [Path(f) for f in json_parser.extract_file_paths(positive_videos)]
 
     for f in avi_paths_set:
         file_name = Path(f.name)
@@ -97,7 +641,110 @@ def post_pro(mega_detector_json, output_dir: Path = None) -> None:
             original_path_to_file = Path(".")
         dest_dir = positive_detection_path / original_path_to_file
         file_utils.create_directory(dest_dir)
-        file_utils.copy_file(f, str(dest_dir / file_name))
+        file_utils.copy_file(f, str(dest_dir / file_name), limiter)
+
+
+def sweep(
+    mega_detector_json,
+    thresholds: Iterable[float],
+    categories: Iterable[str] = ("animal",),
+) -> str:
+    """
+    Counts positive images and videos at many thresholds from a single read of the
+    detection JSON. Nothing is copied.
+    :param mega_detector_json: Path to the MegaDetector JSON output file.
+    :param thresholds: Confidences to report on.
+    :param categories: Names of the `Categories` to report on.
+    :return: A table with one row per category and threshold.
+    """
+    rows = JSONParser(mega_detector_json).sweep_thresholds(
+        sorted(thresholds), [Categories[category.upper()] for category in categories]
+    )
+    lines = [f"{'category':<10}{'threshold':>10}{'images':>10}{'videos':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['category']:<10}{row['threshold']:>10.3f}"
+            f"{row['positive_images']:>10}{row['positive_videos']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def plan(
+    root_video_directory: str,
+    decode_at_detector_size: bool = False,
+    splitter_backend: str = SplitterBackend.MOVIEPY.value,
+    detector_backend: str = DetectorBackend.PYTORCH.value,
+    split_throughput: Optional[float] = None,
+    detect_throughput: Optional[float] = None,
+) -> str:
+    """
+    Estimates a pre pro run from the container headers of its AVIs, without decoding.
+    Videos whose headers cannot be read are logged and listed.
+    :param root_video_directory: Top level directory containing video files.
+    :param decode_at_detector_size: Estimate scratch bytes for frames downscaled during
+      decode.
+    :param splitter_backend: Backend whose default throughput is assumed.
+    :param detector_backend: Backend whose input size frames are downscaled to.
+    :param split_throughput: Frames/sec the splitter writes, as measured by
+      bench_splitter.
+    :param detect_throughput: Frames/sec the detector scores, as measured by
+      bench_detector.
+    :return: A report of the frame count, scratch bytes and expected runtime.
+    """
+    split_throughput = (
+        split_throughput or SPLIT_THROUGHPUT[SplitterBackend(splitter_backend)]
+    )
+    detect_throughput = detect_throughput or DETECT_THROUGHPUT
+    planner = Planner(
+        OneMinuteVideo.FIVE_IMAGES.value,
+        model_input_size(detector_backend) if decode_at_detector_size else None,
+        split_throughput,
+        detect_throughput,
+    )
+    file_utils = FileUtils(Path(root_video_directory))
+    run = planner.plan(file_utils.find_files_recursively("AVI"))
+
+    for video in run["unreadable"]:
+        logger.error("%s could not be read: %s", video["file"], video["error"])
+
+    runtime = datetime.timedelta(seconds=round(run["runtime_seconds"]))
+    lines = [
+        f"Videos:           {len(run['videos'])} ({len(run['unreadable'])} unreadable)",
+        f"Frames:           {run['frames']} at {planner.fps_value} fps",
+        f"Scratch written:  {run['scratch_bytes'] / 2 ** 20:.1f} MiB "
+        f"(largest video {run['largest_video_bytes'] / 2 ** 20:.1f} MiB)",
+        f"Expected runtime: {runtime} "
+        f"(split {split_throughput} frames/s, detect {detect_throughput} frames/s)",
+    ]
+    if run["unreadable"]:
+        lines.append("Unreadable:")
+        lines.extend(
+            f"  {video['file']}: {video['error'].splitlines()[-1]}"
+            for video in run["unreadable"]
+        )
+    return "\n".join(lines)
+
+
+def _megabytes(value: Optional[int]) -> Optional[int]:
+    return value * 1024 * 1024 if value else None
+
+
+def _worker_count(value: str) -> Optional[int]:
+    """
+    :param value: A positive number of workers, or "auto".
+    :return: The number of workers, None for "auto".
+    """
+    if value == "auto":
+        return None
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise argparse.ArgumentTypeError(
+            f"expected a positive integer or auto, got {value!r}"
+        )
+    return workers
 
 
 def _configure_logging(log_dir: Path) -> None:
@@ -129,15 +776,312 @@ def main():
         type=str,
     )
 
+    parser.add_argument(
+        "--plan",
+        help="Estimate frames, scratch bytes and runtime of pre pro from video "
+        "headers. Switch expects the root path containing AVI files.",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--split-throughput",
+        help="Frames/sec the splitter writes, used by --plan. Measure with "
+        "benchmarks.bench_splitter.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--detect-throughput",
+        help="Frames/sec the detector scores, used by --plan. Measure with "
+        "benchmarks.bench_detector.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--sweep",
+        help="Report positive image and video counts at several thresholds. Switch "
+        "expects path to MegaDetector JSON.",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--thresholds",
+        help="Confidences reported by --sweep. Defaults to 0.7 0.8 0.85 0.9.",
+        nargs="+",
+        type=float,
+        default=[0.7, 0.8, ConfidenceRating.MINIMUM.value, 0.9],
+    )
+
+    parser.add_argument(
+        "--categories",
+        help="Categories reported by --sweep. Defaults to animal.",
+        nargs="+",
+        choices=[category.name.lower() for category in Categories],
+        default=["animal"],
+    )
+
+    parser.add_argument(
+        "--scratch",
+        help="Directory extracted JPEGs are written to. Defaults to tmpfs when "
+        "available.",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--scratch-quota",
+        help="Pause splitting while scratch holds this many megabytes of JPEGs.",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--decode-at-detector-size",
+        help="Downscale frames during decode to the detector's input size.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--splitter-backend",
+        help="Video decoder used for splitting. Defaults to moviepy.",
+        choices=[backend.value for backend in SplitterBackend],
+        default=SplitterBackend.MOVIEPY.value,
+    )
+
+    parser.add_argument(
+        "--input-mode",
+        help="Split AVIs (video) or score JPEG stills directly (stills). Defaults to "
+        "video.",
+        choices=[mode.value for mode in InputMode],
+        default=InputMode.VIDEO.value,
+    )
+
+    parser.add_argument(
+        "--detector-backend",
+        help="Inference engine. onnx exports the model once and runs it on CPU.",
+        choices=[backend.value for backend in DetectorBackend],
+        default=DetectorBackend.PYTORCH.value,
+    )
+
+    parser.add_argument(
+        "--quantize",
+        help="Use int8 dynamic quantization with the onnx detector backend.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--cpu-profile",
+        help="CPU optimization profile for the pytorch detector backend. Defaults to "
+        "torch defaults.",
+        choices=[profile.value for profile in CpuProfile],
+        default=CpuProfile.DEFAULT.value,
+    )
+
+    parser.add_argument(
+        "--detector-workers",
+        help="Run this many detector processes, each pinned to its own cores. "
+        "Without a value the pool is sized from the available cores. Defaults to 1.",
+        type=_worker_count,
+        nargs="?",
+        const=None,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        help="Pin the detection batch size. Tuned at runtime by default.",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        help="Back the tuned batch size off while RSS exceeds this many megabytes.",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--latency-budget",
+        help="Back the tuned batch size off when a batch takes longer than this many "
+        "seconds.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Profile each pre pro stage with cProfile and tracemalloc. Dumps and an "
+        "allocation report are written next to the output JSON.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--profile-every",
+        help="Profile one in this many calls of each stage. Defaults to "
+        f"{DEFAULT_SAMPLE_EVERY}.",
+        type=int,
+        default=DEFAULT_SAMPLE_EVERY,
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        help=f"Number of allocation sites reported. Defaults to {DEFAULT_TOP}.",
+        type=int,
+        default=DEFAULT_TOP,
+    )
+
+    parser.add_argument(
+        "--split-timeout",
+        help="Kill and quarantine the split of a video after this many seconds.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--split-cpu-timeout",
+        help="Kill and quarantine the split of a video after this many CPU seconds.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--quarantine",
+        help="List of videos that timed out, skipped by later runs. Defaults to "
+        "quarantine.txt in the output directory.",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--retry-quarantined",
+        help="Split quarantined videos again, unlisting those that succeed.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--output-format",
+        help="Format of the pre pro output. Compressed formats are written and read "
+        "as streams. Defaults to json.",
+        choices=OUTPUT_FORMATS,
+        default="json",
+    )
+
+    parser.add_argument(
+        "--group-events",
+        help="Group trigger bursts per camera directory and score one representative "
+        "video per event first.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--event-gap",
+        help="Longest gap in seconds between videos of one event. Defaults to "
+        f"{DEFAULT_EVENT_GAP:g}.",
+        type=float,
+        default=DEFAULT_EVENT_GAP,
+    )
+
+    parser.add_argument(
+        "--event-policy",
+        help="representative: score the rest of an event only when its "
+        "representative is inconclusive. all: always score them. Defaults to "
+        "representative.",
+        choices=[policy.value for policy in GroupingPolicy],
+        default=GroupingPolicy.REPRESENTATIVE.value,
+    )
+
+    parser.add_argument(
+        "--background",
+        help="Run with capped CPU threads and bandwidth and lowered CPU and I/O "
+        "priority.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--max-threads",
+        help="CPU threads a --background run may use. Defaults to a quarter of the "
+        "cores.",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--max-bandwidth",
+        help="Megabytes/sec a --background run may read and write while splitting "
+        "and copying.",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--cascade",
+        help="Screen every image with a compact model and only run the full model on "
+        "uncertain ones. Optionally names the screening model. Defaults to "
+        f"{SCREEN_MODEL_VERSION}.",
+        nargs="?",
+        const=SCREEN_MODEL_VERSION,
+    )
+
+    parser.add_argument(
+        "--cascade-band",
+        help="Screening confidences from LOW up to HIGH escalate to the full model. "
+        f"Defaults to {DEFAULT_CASCADE_BAND[0]} {DEFAULT_CASCADE_BAND[1]}.",
+        nargs=2,
+        type=float,
+        metavar=("LOW", "HIGH"),
+        default=DEFAULT_CASCADE_BAND,
+    )
+
     args = parser.parse_args()
 
-    log_dir = Path(args.pre or args.post or ".").parent / "logs"
+    log_dir = (
+        Path(args.pre or args.post or args.sweep or args.plan or ".").parent / "logs"
+    )
     _configure_logging(log_dir)
 
+    if args.plan:
+        print(
+            plan(
+                args.plan,
+                decode_at_detector_size=args.decode_at_detector_size,
+                splitter_backend=args.splitter_backend,
+                detector_backend=args.detector_backend,
+                split_throughput=args.split_throughput,
+                detect_throughput=args.detect_throughput,
+            )
+        )
+
     if args.pre:
-        pre_pro(args.pre)
+        settings = PreProSettings(
+            scratch_directory=args.scratch,
+            scratch_quota_bytes=_megabytes(args.scratch_quota),
+            decode_at_detector_size=args.decode_at_detector_size,
+            splitter_backend=args.splitter_backend,
+            input_mode=args.input_mode,
+            detector_backend=args.detector_backend,
+            quantize=args.quantize,
+            cpu_profile=args.cpu_profile,
+            detector_workers=args.detector_workers,
+            batch_size=args.batch_size,
+            memory_budget_bytes=_megabytes(args.memory_budget),
+            latency_budget=args.latency_budget,
+            cascade_screen=args.cascade,
+            cascade_band=args.cascade_band,
+            profile=args.profile,
+            profile_every=args.profile_every,
+            profile_top=args.profile_top,
+            split_timeout=args.split_timeout,
+            split_cpu_timeout=args.split_cpu_timeout,
+            quarantine_file=args.quarantine,
+            retry_quarantined=args.retry_quarantined,
+            background=args.background,
+            max_threads=args.max_threads,
+            max_bandwidth_bytes=_megabytes(args.max_bandwidth),
+            output_format=args.output_format,
+            group_events=args.group_events,
+            event_gap=args.event_gap,
+            event_policy=args.event_policy,
+        )
+        pre_pro(args.pre, settings)
     if args.post:
-        post_pro(args.post)
+        post_pro(
+            args.post,
+            background=args.background,
+            max_bandwidth_bytes=_megabytes(args.max_bandwidth),
+        )
+    if args.sweep:
+        print(sweep(args.sweep, args.thresholds, args.categories))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+"""Fixtures shared by the test modules."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def fake_detector():
+    """
+    :return: A mock detector reporting the same detections for every image, none
+      unless `fake_detector.detections` is given some.
+    """
+    detections = MagicMock()
+    detections.xyxy, detections.confidence, detections.class_id = [], [], []
+    detector = MagicMock()
+    detector.detections = detections
+    detector.single_image_detection.side_effect = lambda image, img_path: {
+        "img_id": img_path,
+        "detections": detections,
+    }
+    return detector
@@ -0,0 +1,131 @@
+"""Tests for runtime tuning of the detection batch size."""
+
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from grunz.batcher.batcher import AdaptiveBatcher, is_allocation_failure
+from grunz.detector import detect_batch
+
+
+def _record(batcher, per_frame_seconds):
+    batcher.record(batcher.batch_size, per_frame_seconds * batcher.batch_size)
+
+
+class TestGrowth:
+    """The batch size must grow while per-frame latency improves, then settle."""
+
+    def test_grows_then_settles_on_the_best_size(self, caplog):
+        batcher = AdaptiveBatcher()
+
+        with caplog.at_level(logging.INFO):
+            _record(batcher, 1.0)  # warm-up, ignored
+            _record(batcher, 0.010)
+            assert batcher.batch_size == 2
+            _record(batcher, 0.006)
+            assert batcher.batch_size == 4
+            _record(batcher, 0.006)
+
+        assert batcher.batch_size == 2
+        assert not batcher.growing
+        assert any("Detection batch size 4 -> 2" in r.message for r in caplog.records)
+
+    def test_growth_stops_at_max_size(self):
+        batcher = AdaptiveBatcher(initial_size=4, max_size=8)
+        _record(batcher, 1.0)
+        _record(batcher, 0.010)
+        _record(batcher, 0.005)
+
+        assert batcher.batch_size == 8
+        assert not batcher.growing
+
+    def test_partial_batches_are_ignored(self):
+        batcher = AdaptiveBatcher(initial_size=4)
+        _record(batcher, 1.0)
+        batcher.record(3, 0.001)
+
+        assert batcher.batch_size == 4
+
+    def test_fixed_batch_size_never_changes(self):
+        batcher = AdaptiveBatcher(initial_size=8, fixed=True)
+        for seconds in (1.0, 0.01, 0.001):
+            _record(batcher, seconds)
+
+        assert batcher.batch_size == 8
+        assert list(batcher.batches(range(10))) == [list(range(8)), [8, 9]]
+
+
+class TestBackOff:
+    """The batch size must back off on memory pressure, slow batches and OOM errors."""
+
+    @patch("grunz.batcher.batcher.current_rss", return_value=2 * 1024**3)
+    def test_backs_off_over_memory_budget(self, _mock_rss):
+        batcher = AdaptiveBatcher(initial_size=8, memory_budget_bytes=1024**3)
+        _record(batcher, 1.0)
+        _record(batcher, 0.01)
+
+        assert batcher.batch_size == 4
+        assert not batcher.growing
+
+    def test_backs_off_over_latency_budget(self):
+        batcher = AdaptiveBatcher(initial_size=8, latency_budget=0.5)
+        _record(batcher, 1.0)
+        _record(batcher, 0.1)
+
+        assert batcher.batch_size == 4
+
+    def test_allocation_failure_splits_and_retries_the_batch(self):
+        batcher = AdaptiveBatcher(initial_size=8)
+
+        def score(batch):
+            if len(batch) > 2:
+                raise MemoryError()
+            return [item * 10 for item in batch]
+
+        assert batcher.run(list(range(8)), score) == [i * 10 for i in range(8)]
+        assert batcher.batch_size == 2
+
+    def test_other_errors_are_raised(self):
+        batcher = AdaptiveBatcher(initial_size=4)
+
+        with pytest.raises(ValueError):
+            batcher.run(
+                [1, 2, 3, 4], lambda batch: (_ for _ in ()).throw(ValueError("bad"))
+            )
+
+    def test_allocation_failures_are_recognised(self):
+        assert is_allocation_failure(MemoryError())
+        assert is_allocation_failure(
+            RuntimeError("DefaultCPUAllocator: can't allocate memory")
+        )
+        assert not is_allocation_failure(RuntimeError("shape mismatch"))
+
+
+class _BatchingDetector:
+    """Stands in for a PytorchWildlife detector, which reports images by index."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def batch_image_detection(self, data_source, batch_size=16):
+        self.batch_sizes.append(batch_size)
+        return [
+            {"img_id": index, "detections": image}
+            for index, image in reversed(list(enumerate(data_source)))
+        ]
+
+
+class TestDetectBatch:
+    """detect_batch must score a PytorchWildlife batch in one call, in order."""
+
+    def test_batch_is_scored_in_one_call_and_mapped_to_paths(self):
+        detector = _BatchingDetector()
+
+        results = detect_batch(detector, ["boar", "empty"], ["a.jpeg", "b.jpeg"])
+
+        assert detector.batch_sizes == [2]
+        assert results == [
+            {"img_id": "a.jpeg", "detections": "boar"},
+            {"img_id": "b.jpeg", "detections": "empty"},
+        ]
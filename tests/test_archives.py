@@ -0,0 +1,151 @@
+"""Tests for reading videos straight out of tar and zip archives."""
+
+import json
+import subprocess
+import tarfile
+import zipfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from moviepy.config import FFMPEG_BINARY
+
+from grunz.archive.archive import Archive
+from grunz.detector import Detections
+from main import PreProSettings, post_pro, pre_pro
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = tmp_path_factory.mktemp("clips") / "clip.AVI"
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=160x120:rate=5:duration=3",
+            "-c:v",
+            "mjpeg",
+            str(path),
+        ],
+        check=True,
+    )
+    return path
+
+
+MEMBERS = ["season1/cam1/PICT0001.AVI", "season1/cam2/PICT0002.AVI"]
+
+
+def _write_archive(path, clip):
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            for member in MEMBERS:
+                archive.write(clip, member)
+            archive.writestr("season1/notes.txt", "not a video")
+    else:
+        with tarfile.open(path, "w:gz") as archive:
+            for member in MEMBERS:
+                archive.add(clip, member)
+    return path
+
+
+class TestArchive:
+    """Archive must list and stream members without extracting the archive."""
+
+    @pytest.mark.parametrize("name", ["season.tar.gz", "season.zip"])
+    def test_members_are_listed_from_headers(self, tmp_path, clip, name):
+        archive = Archive(_write_archive(tmp_path / name, clip))
+
+        assert archive.list_members("AVI") == MEMBERS
+        assert Archive.is_archive(tmp_path / name)
+        assert not Archive.is_archive(tmp_path)
+
+    @pytest.mark.parametrize("name", ["season.tar.gz", "season.zip"])
+    def test_only_one_member_is_spooled_at_a_time(self, tmp_path, clip, name):
+        archive = Archive(_write_archive(tmp_path / name, clip))
+        spool = tmp_path / "spool"
+        spool.mkdir()
+
+        seen = []
+        for spooled in archive.spool_members(MEMBERS, spool):
+            assert [path.name for path in spool.iterdir()] == [Path(spooled).name]
+            assert Path(spooled).read_bytes() == clip.read_bytes()
+            seen.append(archive.member_of(spooled))
+
+        assert seen == MEMBERS
+        assert list(spool.iterdir()) == []
+
+    def test_only_the_given_members_are_extracted(self, tmp_path, clip):
+        archive = Archive(_write_archive(tmp_path / "season.tar.gz", clip))
+
+        extracted = archive.extract_members([MEMBERS[1]], tmp_path / "out")
+
+        assert extracted == [tmp_path / "out" / MEMBERS[1]]
+        assert not (tmp_path / "out" / MEMBERS[0]).exists()
+
+    def test_unsafe_members_are_skipped(self, tmp_path, clip):
+        path = tmp_path / "unsafe.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.write(clip, "../PICT0001.AVI")
+            archive.write(clip, "PICT0002.AVI")
+
+        assert Archive(path).list_members("AVI") == ["PICT0002.AVI"]
+        assert (
+            Archive(path).extract_members(["../PICT0001.AVI"], tmp_path / "out") == []
+        )
+
+
+class TestPreProArchives:
+    """pre_pro must accept an archive root and post pro must extract positives only."""
+
+    @pytest.mark.parametrize("name", ["season.tar.gz", "season.zip"])
+    @patch("main.create_detector")
+    def test_positive_members_are_extracted(
+        self, mock_create_detector, tmp_path, clip, name
+    ):
+        archive_path = _write_archive(tmp_path / name, clip)
+
+        def single_image_detection(image, img_path):
+            # Frames are named after the spooled member, so only PICT0001 is positive.
+            confidence = 0.95 if "PICT0001" in img_path else 0.1
+            return {
+                "img_id": img_path,
+                "detections": Detections(
+                    np.array([[0.0, 0.0, 1.0, 1.0]]),
+                    np.array([confidence]),
+                    np.array([1]),
+                ),
+            }
+
+        mock_detector = MagicMock()
+        mock_detector.single_image_detection.side_effect = single_image_detection
+        mock_create_detector.return_value = mock_detector
+
+        output_json = pre_pro(
+            str(archive_path), PreProSettings(splitter_backend="ffmpeg")
+        )
+
+        output = json.loads(Path(output_json).read_text())
+        resolved = str(archive_path.resolve())
+        assert [video["file"] for video in output["videos"]] == [
+            f"{resolved}!{member}" for member in MEMBERS
+        ]
+        assert {image["member"] for image in output["images"]} == set(MEMBERS)
+        assert all(image["archive"] == resolved for image in output["images"])
+
+        post_pro(output_json)
+
+        extracted = Path(output_json).parent / "positive_detection" / name
+        assert (extracted / MEMBERS[0]).read_bytes() == clip.read_bytes()
+        assert not (extracted / MEMBERS[1]).exists()
+
+    def test_archives_are_not_read_in_stills_mode(self, tmp_path, clip):
+        archive_path = _write_archive(tmp_path / "season.zip", clip)
+
+        with pytest.raises(ValueError, match="video input mode"):
+            pre_pro(str(archive_path), PreProSettings(input_mode="stills"))
@@ -0,0 +1,144 @@
+"""Tests for the resource-capped background mode."""
+
+import logging
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from grunz.background.background import BackgroundMode, BandwidthLimiter
+from grunz.file_utils.file_utils import FileUtils
+from main import PreProSettings, pre_pro
+
+
+class TestBandwidthLimiter:
+    """BandwidthLimiter must hold the average rate at the cap."""
+
+    def test_consumers_sleep_for_the_time_their_bytes_take(self):
+        limiter = BandwidthLimiter(10_000)
+
+        start = time.monotonic()
+        limiter.consume(1_000)
+        limiter.consume(1_000)
+
+        assert time.monotonic() - start >= 0.19
+        assert limiter.total_bytes == 2_000
+
+    def test_paced_copy_is_identical(self, tmp_path):
+        source = tmp_path / "PICT0001.AVI"
+        source.write_bytes(bytes(range(256)) * 10)
+        limiter = MagicMock()
+
+        FileUtils.copy_file(str(source), str(tmp_path / "copy.AVI"), limiter)
+
+        assert (tmp_path / "copy.AVI").read_bytes() == source.read_bytes()
+        limiter.consume.assert_called_once_with(2 * 2560)
+
+
+@patch("grunz.background.background.available_core_ids", return_value=list(range(16)))
+class TestBackgroundMode:
+    """BackgroundMode must cap threads to a core group and split it between stages."""
+
+    def test_a_quarter_of_the_cores_by_default(self, _):
+        mode = BackgroundMode()
+
+        assert mode.threads == 4
+        assert mode.cores == [0, 1, 2, 3]
+        assert (mode.decode_threads, mode.inference_threads) == (1, 3)
+        assert mode.limiter is None
+
+    def test_thread_cap_never_exceeds_the_cores(self, _):
+        assert BackgroundMode(threads=64).threads == 16
+
+    @patch("grunz.background.background.subprocess.run")
+    @patch("grunz.background.background.shutil.which", return_value="/usr/bin/ionice")
+    @patch("grunz.background.background._thread_ids", return_value=[42, 43])
+    @patch("grunz.background.background.os")
+    def test_apply_pins_and_lowers_priority_of_every_thread(
+        self, mock_os, _thread_ids, _which, mock_run, _cores
+    ):
+        BackgroundMode(threads=2).apply()
+
+        assert [call.args for call in mock_os.sched_setaffinity.call_args_list] == [
+            (42, [0, 1]),
+            (43, [0, 1]),
+        ]
+        assert [call.args for call in mock_os.setpriority.call_args_list] == [
+            (mock_os.PRIO_PROCESS, 42, 19),
+            (mock_os.PRIO_PROCESS, 43, 19),
+        ]
+        assert mock_run.call_args.args[0] == [
+            "/usr/bin/ionice",
+            "-c",
+            "2",
+            "-n",
+            "7",
+            "-p",
+            "42",
+            "43",
+        ]
+
+    @pytest.mark.skipif(
+        not hasattr(os, "sched_setaffinity"), reason="needs CPU affinity"
+    )
+    @patch("grunz.background.background.subprocess.run")
+    @patch("grunz.background.background.os.setpriority")
+    def test_threads_already_running_are_pinned(self, _setpriority, _run, _cores):
+        original = os.sched_getaffinity(0)
+        core = min(original)
+        started, done = threading.Event(), threading.Event()
+        thread = threading.Thread(target=lambda: (started.set(), done.wait()))
+        thread.start()
+        started.wait()
+        mode = BackgroundMode(threads=1)
+        mode.cores = [core]
+        try:
+            mode.apply()
+
+            assert os.sched_getaffinity(thread.native_id) == {core}
+        finally:
+            for thread_id in os.listdir("/proc/self/task"):
+                os.sched_setaffinity(int(thread_id), original)
+            done.set()
+            thread.join()
+
+    def test_report_compares_throughput_with_the_caps(self, _):
+        mode = BackgroundMode(threads=2, bandwidth_bytes=2**20)
+        mode.limiter.total_bytes = 5 * 2**20
+
+        report = mode.report(frames=100, seconds=10.0)
+
+        assert "10.00 frames/s on a cap of 2 threads (5.00 per thread)" in report
+        assert "5.0 MiB moved at 0.50 MiB/s on a cap of 1.00 MiB/s" in report
+
+
+class TestPreProBackground:
+    """pre_pro in background mode must cap inference threads and report throughput."""
+
+    @patch("main.BackgroundMode")
+    @patch("main.create_detector")
+    def test_caps_are_applied_and_reported(
+        self, mock_create_detector, mock_mode_cls, tmp_path, caplog, fake_detector
+    ):
+        root = tmp_path / "stills"
+        root.mkdir()
+        Image.new("RGB", (16, 8)).save(root / "IMG0001.JPG")
+        mock_create_detector.return_value = fake_detector
+        caplog.set_level(logging.INFO)
+        mode = mock_mode_cls.return_value
+        mode.decode_threads, mode.inference_threads = 1, 3
+        mode.report.return_value = "Background run: report"
+
+        pre_pro(
+            str(root),
+            PreProSettings(input_mode="stills", background=True, max_threads=4),
+        )
+
+        mock_mode_cls.assert_called_once_with(4, None)
+        mode.apply.assert_called_once()
+        assert mock_create_detector.call_args.kwargs["threads"] == 3
+        assert mode.report.call_args.args[0] == 1
+        assert "Background run: report" in caplog.text
@@ -0,0 +1,127 @@
+"""Tests for the two-stage screening cascade."""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from grunz.detector import (
+    CascadeDetector,
+    Detections,
+    create_cascade,
+    decode_yolo_output,
+    evaluate_cascade,
+)
+
+
+def _result(confidence, img_path="frame.jpeg"):
+    """A detection result with one animal at `confidence`, or none for None."""
+    if confidence is None:
+        detections = Detections(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int))
+    else:
+        detections = Detections(
+            np.array([[0.0, 0.0, 1.0, 1.0]]), np.array([confidence]), np.array([1])
+        )
+    return {"img_id": img_path, "detections": detections}
+
+
+class _FakeDetector:
+    """Scores each image as the confidence it holds and counts the images it sees."""
+
+    IMAGE_SIZE = 640
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.seen = []
+
+    def single_image_detection(self, img, img_path=None):
+        self.seen.append(img_path)
+        return _result(img + self.offset, img_path)
+
+
+class TestCascadeDetector:
+    """Only images the screen is unsure about may reach the full model."""
+
+    def test_confident_images_keep_the_screening_result(self):
+        screen, full = _FakeDetector(), _FakeDetector(offset=0.01)
+        cascade = CascadeDetector(screen, full, band=(0.5, 0.95))
+
+        results = cascade.detect_batch([0.1, 0.97], ["empty.jpeg", "boar.jpeg"])
+
+        assert full.seen == []
+        assert [float(r["detections"].confidence[0]) for r in results] == [0.1, 0.97]
+        assert cascade.escalation_rate == 0.0
+
+    def test_uncertain_images_escalate_in_order(self):
+        screen, full = _FakeDetector(), _FakeDetector(offset=0.01)
+        cascade = CascadeDetector(screen, full, band=(0.5, 0.95))
+
+        results = cascade.detect_batch([0.6, 0.1, 0.9], ["a.jpeg", "b.jpeg", "c.jpeg"])
+
+        assert full.seen == ["a.jpeg", "c.jpeg"]
+        assert [r["img_id"] for r in results] == ["a.jpeg", "b.jpeg", "c.jpeg"]
+        assert np.isclose(float(results[0]["detections"].confidence[0]), 0.61)
+        assert cascade.escalation_rate == 2 / 3
+
+    def test_single_image_detection_goes_through_the_cascade(self):
+        screen, full = _FakeDetector(), _FakeDetector(offset=0.01)
+        cascade = CascadeDetector(screen, full, band=(0.5, 0.95))
+
+        result = cascade.single_image_detection(0.7, img_path="a.jpeg")
+
+        assert full.seen == ["a.jpeg"]
+        assert np.isclose(float(result["detections"].confidence[0]), 0.71)
+
+    def test_input_size_follows_the_full_model(self):
+        full = _FakeDetector()
+        full.IMAGE_SIZE = 1280
+        assert CascadeDetector(_FakeDetector(), full).IMAGE_SIZE == 1280
+
+    @patch("grunz.detector.create_detector")
+    def test_create_cascade_shares_settings_between_models(self, mock_create_detector):
+        mock_create_detector.return_value = MagicMock(IMAGE_SIZE=640)
+
+        cascade = create_cascade(
+            backend="onnx", threads=4, screen_version="screen", band=(0.3, 0.9)
+        )
+
+        screen_call, full_call = mock_create_detector.call_args_list
+        assert screen_call.kwargs["version"] == "screen"
+        assert "version" not in full_call.kwargs
+        assert screen_call.kwargs["threads"] == full_call.kwargs["threads"] == 4
+        assert cascade.band == (0.3, 0.9)
+
+
+class TestEvaluateCascade:
+    """The validation report must compare cascade verdicts with the full model's."""
+
+    def test_reports_escalation_agreement_and_missed_positives(self):
+        screen = [_result(0.1), _result(0.6), _result(0.97), _result(None)]
+        full = [_result(0.3), _result(0.4), _result(0.9), _result(0.9)]
+
+        report = evaluate_cascade(screen, full, band=(0.5, 0.95))
+
+        assert report["images"] == 4
+        assert report["escalation_rate"] == 0.25
+        assert report["agreement"] == 0.75
+        assert report["missed_positives"] == 1
+
+    def test_empty_validation_set(self):
+        report = evaluate_cascade([], [])
+        assert report["escalation_rate"] == 0.0
+        assert report["agreement"] == 1.0
+
+
+class TestNmsFreeOutput:
+    """Compact screening models export already suppressed (N, 6) detections."""
+
+    def test_rows_below_threshold_are_dropped(self):
+        output = np.array(
+            [[10.0, 20.0, 30.0, 40.0, 0.9, 1.0], [0.0, 0.0, 5.0, 5.0, 0.05, 0.0]],
+            dtype=np.float32,
+        )
+
+        boxes, scores, class_ids = decode_yolo_output(output, 0.2, 0.7, 300)
+
+        assert boxes.tolist() == [[10.0, 20.0, 30.0, 40.0]]
+        assert np.allclose(scores, [0.9])
+        assert class_ids.tolist() == [1]
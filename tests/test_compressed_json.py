@@ -0,0 +1,147 @@
+"""Tests for compressed detection output and streaming JSON I/O."""
+
+import gzip
+import json
+import lzma
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from grunz.json_parser.json_parser import JSONParser, open_json, write_json
+from main import PreProSettings, pre_pro
+
+DOCUMENT = {
+    "info": {"format": "1.0", "detector": "MDV6"},
+    "images": [
+        {
+            "file": f"/scratch/PICT0001.AVI-{index:03d}.jpeg",
+            "max_detection_conf": 0.9 - index / 100,
+            "detections": [
+                {"category": "1", "conf": 0.9 - index / 100, "bbox": [0, 0, 12345, 1]}
+            ],
+            "source": "/videos/Fläming/PICT0001.AVI",
+            "frame_index": index,
+            "timestamp": index * 2.5,
+        }
+        for index in range(20)
+    ],
+    "videos": [],
+    "count": 1234567890,
+}
+
+
+class TestStreamingJson:
+    """The codec must follow the extension and decoding survive any chunk boundary."""
+
+    @pytest.mark.parametrize(
+        "name",
+        ["out.json", "out.json.gz", "out.json.bz2", "out.json.xz", "out.json.lzma"],
+    )
+    def test_round_trip(self, tmp_path, name):
+        path = tmp_path / name
+
+        write_json(path, DOCUMENT)
+
+        assert JSONParser(str(path)).read() == DOCUMENT
+        with open_json(path) as stream:
+            assert json.load(stream) == DOCUMENT
+
+    def test_gzip_output_is_compressed(self, tmp_path):
+        path = tmp_path / "out.json.gz"
+
+        write_json(path, DOCUMENT)
+
+        assert path.read_bytes()[:2] == b"\x1f\x8b"
+        assert json.loads(gzip.decompress(path.read_bytes())) == DOCUMENT
+
+    def test_lzma_output_is_the_legacy_container(self, tmp_path):
+        path = tmp_path / "out.json.lzma"
+
+        write_json(path, DOCUMENT)
+
+        decompressed = lzma.decompress(path.read_bytes(), format=lzma.FORMAT_ALONE)
+        assert json.loads(decompressed) == DOCUMENT
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 16])
+    def test_scalars_split_across_chunks(self, tmp_path, chunk_size):
+        path = tmp_path / "out.json"
+        document = {
+            "thresholds": [0.85, 0.9, 1500.0, 12, -1e-05, True, None],
+            "count": 7,
+        }
+        write_json(path, document)
+
+        with patch("grunz.json_parser.json_parser.CHUNK_SIZE", chunk_size):
+            assert JSONParser(str(path)).read() == document
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64])
+    def test_values_split_across_chunks(self, tmp_path, chunk_size):
+        path = tmp_path / "out.json.gz"
+        write_json(path, DOCUMENT)
+
+        with patch("grunz.json_parser.json_parser.CHUNK_SIZE", chunk_size):
+            assert JSONParser(str(path)).read() == DOCUMENT
+
+    def test_reads_json_written_by_json_dump(self, tmp_path):
+        path = tmp_path / "legacy.json"
+        path.write_text(json.dumps(DOCUMENT, indent=2))
+
+        with patch("grunz.json_parser.json_parser.CHUNK_SIZE", 5):
+            assert JSONParser(str(path)).read() == DOCUMENT
+
+    def test_iter_images_skips_other_members(self, tmp_path):
+        path = tmp_path / "out.json.xz"
+        write_json(path, {"videos": [{"file": "a"}], "images": DOCUMENT["images"][:2]})
+
+        images = list(JSONParser(str(path)).iter_images())
+
+        assert [image["frame_index"] for image in images] == [0, 1]
+
+    @patch("grunz.json_parser.json_parser.JSONParser.read")
+    def test_positive_videos_skip_the_images(self, mock_read, tmp_path):
+        path = tmp_path / "out.json.gz"
+        videos = [
+            {"file": "/videos/PICT0001.AVI", "positive_frames": 2},
+            {"file": "/videos/PICT0002.AVI", "positive_frames": 0},
+        ]
+        write_json(path, {"images": DOCUMENT["images"], "videos": videos})
+
+        assert JSONParser(str(path)).filter_json_for_positive_videos() == videos[:1]
+        mock_read.assert_not_called()
+
+    def test_truncated_json_raises(self, tmp_path):
+        path = tmp_path / "truncated.json"
+        path.write_text(json.dumps(DOCUMENT)[:-40])
+
+        with pytest.raises(ValueError):
+            JSONParser(str(path)).read()
+
+
+class TestCompressedPreProOutput:
+    """pre_pro must write the output format it is asked for."""
+
+    @patch("main.create_detector")
+    def test_gzip_output_is_readable_by_post_pro(
+        self, mock_create_detector, tmp_path, fake_detector
+    ):
+        root = tmp_path / "stills"
+        root.mkdir()
+        Image.new("RGB", (16, 8)).save(root / "IMG0001.JPG")
+        detections = fake_detector.detections
+        detections.xyxy, detections.confidence, detections.class_id = (
+            [[0, 0, 1, 1]],
+            [0.9],
+            [1],
+        )
+        mock_create_detector.return_value = fake_detector
+
+        output_json = pre_pro(
+            str(root), PreProSettings(input_mode="stills", output_format="json.gz")
+        )
+
+        assert output_json.endswith(".json.gz")
+        positives = JSONParser(output_json).filter_json_for_positive_videos()
+        assert [video["file"] for video in positives] == [
+            str(root.resolve() / "IMG0001.JPG")
+        ]
@@ -0,0 +1,100 @@
+"""Tests for the CPU optimization profiles of the PyTorch detector."""
+
+import sys
+from unittest.mock import MagicMock, patch
+
+from grunz.detector import (
+    CpuProfile,
+    TunedDetector,
+    cpu_profile_settings,
+    tune_detector,
+)
+
+
+class TestCpuProfileSettings:
+    """cpu_profile_settings must map each profile to its torch settings."""
+
+    def test_default_profile_changes_nothing(self):
+        assert cpu_profile_settings(CpuProfile.DEFAULT) == {}
+
+    def test_throughput_uses_every_core_for_intra_op(self):
+        settings = cpu_profile_settings("throughput", cores=8)
+
+        assert settings["intra_op_threads"] == 8
+        assert settings["inter_op_threads"] == 1
+        assert settings["inference_mode"] and settings["channels_last"]
+        assert not settings["bfloat16"] and not settings["compile"]
+
+    def test_shared_leaves_half_the_cores_for_splitting(self):
+        assert cpu_profile_settings("shared", cores=8)["intra_op_threads"] == 4
+        assert cpu_profile_settings("shared", cores=1)["intra_op_threads"] == 1
+
+    def test_bfloat16_and_compiled_build_on_throughput(self):
+        assert cpu_profile_settings("bfloat16", cores=8)["bfloat16"]
+        assert cpu_profile_settings("compiled", cores=8)["compile"]
+
+
+class TestTuneDetector:
+    """tune_detector must apply the profile to torch and the detector's network."""
+
+    def _make_detector(self):
+        network = MagicMock()
+        autobackend = MagicMock()
+        autobackend.model = network
+        detector = MagicMock()
+        detector.model = None
+        detector.predictor.model = autobackend
+        return detector, autobackend, network
+
+    def test_threads_layout_and_inference_mode_are_applied(self):
+        mock_torch = MagicMock()
+        detector, autobackend, network = self._make_detector()
+
+        with patch.dict(sys.modules, {"torch": mock_torch}):
+            tuned = tune_detector(detector, "throughput", cores=6)
+            tuned.single_image_detection("frame.jpeg")
+
+        mock_torch.set_num_threads.assert_called_once_with(6)
+        mock_torch.set_num_interop_threads.assert_called_once_with(1)
+        network.to.assert_called_once_with(memory_format=mock_torch.channels_last)
+        assert autobackend.model is network.to.return_value
+        mock_torch.inference_mode.assert_called_once()
+        detector.single_image_detection.assert_called_once_with("frame.jpeg")
+
+    def test_compiled_profile_compiles_the_network(self):
+        mock_torch = MagicMock()
+        detector, autobackend, network = self._make_detector()
+
+        with patch.dict(sys.modules, {"torch": mock_torch}):
+            tune_detector(detector, "compiled", cores=2)
+
+        mock_torch.compile.assert_called_once_with(network.to.return_value)
+        assert autobackend.model is mock_torch.compile.return_value
+
+    def test_default_profile_returns_detector_untouched(self):
+        detector, _, _ = self._make_detector()
+
+        with patch.dict(sys.modules, {"torch": MagicMock()}):
+            assert tune_detector(detector, "default") is detector
+
+
+class TestTunedDetector:
+    """TunedDetector must delegate everything but detection to the wrapped detector."""
+
+    def test_attributes_are_delegated(self):
+        detector = MagicMock()
+        detector.IMAGE_SIZE = 640
+
+        assert TunedDetector(detector, inference_mode=False).IMAGE_SIZE == 640
+
+    def test_batches_run_under_the_inference_guard(self):
+        detector = MagicMock()
+        torch = MagicMock()
+
+        with patch.dict(sys.modules, {"torch": torch}):
+            TunedDetector(detector, inference_mode=True).batch_image_detection(
+                ["frame"], batch_size=1
+            )
+
+        torch.inference_mode.return_value.__enter__.assert_called_once()
+        detector.batch_image_detection.assert_called_once_with(["frame"], batch_size=1)
@@ -0,0 +1,84 @@
+"""Tests for decoding frames at the detector input resolution."""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from grunz.detector import DEFAULT_INPUT_SIZE, convert_result, detector_input_size
+from grunz.splitter.splitter import Splitter
+
+
+class TestFitWithin:
+    """fit_within must keep the aspect ratio and never upscale."""
+
+    def test_full_hd_is_scaled_to_longer_side(self):
+        assert Splitter.fit_within((1920, 1080), 640) == (640, 360)
+
+    def test_portrait_is_scaled_by_height(self):
+        assert Splitter.fit_within((1080, 1920), 640) == (360, 640)
+
+    def test_small_frames_are_not_upscaled(self):
+        assert Splitter.fit_within((320, 240), 640) == (320, 240)
+
+
+class TestSplitterResize:
+    """export_frames_to_jpeg must resize in ffmpeg and record the letterbox."""
+
+    @patch("grunz.splitter.splitter.Splitter.probe_size", return_value=(1920, 1080))
+    @patch("grunz.splitter.splitter.VideoFileClip")
+    def test_target_resolution_and_letterbox(self, mock_clip_cls, _mock_probe):
+        mock_clip = MagicMock()
+        mock_clip.duration = 1.0
+        mock_clip_cls.return_value = mock_clip
+
+        frames = Splitter("/videos/PICT0001.AVI").export_frames_to_jpeg(
+            0.4, max_size=640
+        )
+
+        assert mock_clip_cls.call_args.kwargs["target_resolution"] == (640, 360)
+        assert frames[0]["letterbox"] == {"scale": [1 / 3, 1 / 3], "pad": [0.0, 0.0]}
+
+    @patch("grunz.splitter.splitter.VideoFileClip")
+    def test_no_resize_by_default(self, mock_clip_cls):
+        mock_clip = MagicMock()
+        mock_clip.duration = 1.0
+        mock_clip_cls.return_value = mock_clip
+
+        frames = Splitter("/videos/PICT0001.AVI").export_frames_to_jpeg(0.4)
+
+        assert mock_clip_cls.call_args.kwargs["target_resolution"] is None
+        assert "letterbox" not in frames[0]
+
+
+class TestConvertResultLetterbox:
+    """convert_result must map bboxes of downscaled frames back to source pixels."""
+
+    def test_bbox_is_mapped_back_to_source_pixels(self):
+        detections = MagicMock()
+        detections.xyxy = np.array([[10.0, 20.0, 100.0, 200.0]])
+        detections.confidence = np.array([0.9])
+        detections.class_id = np.array([1])
+        frame = {
+            "file": "a.jpeg",
+            "source": "PICT0001.AVI",
+            "frame_index": 0,
+            "timestamp": 0.0,
+            "letterbox": {"scale": [0.5, 0.25], "pad": [0.0, 0.0]},
+        }
+
+        result = convert_result({"img_id": "a.jpeg", "detections": detections}, frame)
+
+        assert result["detections"][0]["bbox"] == [20.0, 80.0, 200.0, 800.0]
+        assert "letterbox" not in result
+
+
+class TestDetectorInputSize:
+    """detector_input_size must prefer the model's own image size."""
+
+    def test_model_image_size_is_used(self):
+        detector = MagicMock()
+        detector.IMAGE_SIZE = 1280
+        assert detector_input_size(detector) == 1280
+
+    def test_default_when_model_has_no_image_size(self):
+        assert detector_input_size(object()) == DEFAULT_INPUT_SIZE
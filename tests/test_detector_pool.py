@@ -0,0 +1,162 @@
+"""Tests for the multi-instance detector pool."""
+
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from grunz.detector import Detections
+from grunz.pool.pool import DetectorPool, auto_workers, split_cores
+from main import PreProSettings, _worker_count, pre_pro
+
+
+class _FakeDetector:
+    """Scores an image by its file content and reports the cores it runs on.
+
+    Images reading "slow" take a fifth of a second and score 0.5.
+    """
+
+    IMAGE_SIZE = 320
+
+    def __init__(self, threads):
+        self.threads = threads
+
+    def single_image_detection(self, img_path):
+        content = Path(img_path).read_text()
+        if content == "corrupt":
+            raise OSError("cannot identify image file")
+        if content == "slow":
+            time.sleep(0.2)
+            content = "0.5"
+        cores = sorted(os.sched_getaffinity(0))
+        return {
+            "img_id": f"{img_path}|{cores}|{self.threads}",
+            "detections": Detections(
+                np.array([[0.0, 0.0, 1.0, 1.0]]),
+                np.array([float(content)]),
+                np.array([0]),
+            ),
+        }
+
+
+def fake_factory(threads):
+    return _FakeDetector(threads)
+
+
+class TestCoreSplitting:
+    """The pool must size itself from the cores and give each worker its own group."""
+
+    def test_auto_workers_gives_each_worker_four_cores(self):
+        assert auto_workers(64) == 16
+        assert auto_workers(2) == 1
+
+    def test_core_groups_are_disjoint_and_contiguous(self):
+        assert split_cores(list(range(8)), 3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+    def test_zero_workers_are_rejected(self):
+        with pytest.raises(ValueError, match="at least one worker"):
+            DetectorPool(0, fake_factory, [0, 1])
+
+
+class TestWorkerCountArgument:
+    """--detector-workers must take a positive integer or auto."""
+
+    def test_values(self):
+        assert _worker_count("auto") is None
+        assert _worker_count("3") == 3
+
+    @pytest.mark.parametrize("value", ["0", "-2", "x"])
+    def test_invalid_values_are_rejected(self, value):
+        with pytest.raises(
+            argparse.ArgumentTypeError, match="positive integer or auto"
+        ):
+            _worker_count(value)
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs CPU affinity")
+class TestDetectorPool:
+    """DetectorPool must pin workers, keep result order and skip failed images."""
+
+    def _write_frames(self, tmp_path, contents):
+        frames = []
+        for index, content in enumerate(contents):
+            path = tmp_path / f"frame-{index:03d}.jpeg"
+            path.write_text(content)
+            frames.append({"file": str(path), "frame_index": index})
+        return frames
+
+    def test_results_are_returned_in_frame_order(self, tmp_path):
+        frames = self._write_frames(tmp_path, [f"0.{i}" for i in range(1, 10)])
+        cores = sorted(os.sched_getaffinity(0))[:2]
+
+        with DetectorPool(2, fake_factory, cores) as pool:
+            scored = list(pool.imap(frames))
+
+        assert [frame for frame, _ in scored] == frames
+        assert [float(r["detections"].confidence[0]) for _, r in scored] == [
+            float(f"0.{i}") for i in range(1, 10)
+        ]
+        assert pool.IMAGE_SIZE == 320
+
+    def test_each_worker_is_pinned_to_its_own_cores(self, tmp_path):
+        # Slow frames keep one worker busy long enough for the other to score some.
+        frames = self._write_frames(tmp_path, ["slow"] * 8)
+        cores = sorted(os.sched_getaffinity(0))[:4]
+        if len(cores) < 2:
+            pytest.skip("needs two cores")
+
+        with DetectorPool(2, fake_factory, cores) as pool:
+            pinned = {
+                tuple(result["img_id"].split("|")[1:])
+                for _, result in pool.imap(frames)
+            }
+
+        assert pinned == {
+            (str(group), str(len(group))) for group in split_cores(cores, 2)
+        }
+        first, second = (set(json.loads(group)) for group, _ in pinned)
+        assert not first & second
+
+    def test_failed_image_is_logged_and_skipped(self, tmp_path, caplog):
+        frames = self._write_frames(tmp_path, ["0.5", "corrupt", "0.7"])
+
+        skipped = []
+
+        with DetectorPool(1, fake_factory, sorted(os.sched_getaffinity(0))[:1]) as pool:
+            scored = list(pool.imap(frames, skipped.append))
+
+        assert [frame["frame_index"] for frame, _ in scored] == [0, 2]
+        assert skipped == frames[1:2]
+        assert any("frame-001.jpeg" in record.message for record in caplog.records)
+
+
+class TestPreProPool:
+    """pre_pro must say what is off while detection runs in the workers."""
+
+    @patch("main.DetectorPool")
+    def test_batching_and_profiling_are_reported_off(
+        self, mock_pool_cls, tmp_path, caplog
+    ):
+        caplog.set_level(logging.INFO)
+        pool = mock_pool_cls.return_value.__enter__.return_value
+        pool.imap.return_value = iter([])
+        stills = tmp_path / "stills"
+        stills.mkdir()
+
+        pre_pro(
+            str(stills),
+            PreProSettings(
+                input_mode="stills", detector_workers=2, profile=True, batch_size=8
+            ),
+        )
+
+        messages = [record.getMessage() for record in caplog.records]
+        assert "Batch size tuning is off with --detector-workers" in messages
+        assert "The load and detect stages are not profiled with workers" in messages
+        assert any("--batch-size" in message for message in messages)
@@ -0,0 +1,178 @@
+"""Tests for grouping trigger bursts into events."""
+
+import io
+import logging
+import os
+import tarfile
+import time
+import zipfile
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from grunz.archive.archive import Archive
+from grunz.events.events import EventScheduler, GroupingPolicy
+from grunz.json_parser.json_parser import JSONParser
+from main import PreProSettings, pre_pro
+
+TIMES = {
+    "/cam1/PICT0001.AVI": 0.0,
+    "/cam1/PICT0002.AVI": 30.0,
+    "/cam1/PICT0003.AVI": 70.0,
+    "/cam1/PICT0004.AVI": 500.0,
+    "/cam2/PICT0001.AVI": 10.0,
+}
+
+
+def _scheduler(policy=GroupingPolicy.REPRESENTATIVE):
+    return EventScheduler(
+        TIMES, lambda source: os.path.dirname(source), TIMES.get, 60.0, policy
+    )
+
+
+def _verdict(source, confidence):
+    return {
+        "file": source,
+        "max_animal_conf": confidence,
+        "positive_frames": int(confidence >= 0.85),
+        "first_positive_timestamp": 0.0 if confidence >= 0.85 else None,
+    }
+
+
+class TestEventScheduler:
+    """EventScheduler must group per camera on timestamp gaps, skip decided events."""
+
+    def test_events_split_on_the_gap_and_camera(self):
+        assert _scheduler().events == [
+            ["/cam1/PICT0001.AVI", "/cam1/PICT0002.AVI", "/cam1/PICT0003.AVI"],
+            ["/cam1/PICT0004.AVI"],
+            ["/cam2/PICT0001.AVI"],
+        ]
+        assert _scheduler().representatives() == [
+            "/cam1/PICT0001.AVI",
+            "/cam1/PICT0004.AVI",
+            "/cam2/PICT0001.AVI",
+        ]
+
+    def test_decided_events_are_inferred(self):
+        scheduler = _scheduler()
+        verdicts = {"/cam1/PICT0001.AVI": _verdict("/cam1/PICT0001.AVI", 0.95)}
+
+        assert scheduler.remaining(verdicts) == []
+        inferred = scheduler.inferred(verdicts)
+        assert [video["file"] for video in inferred] == [
+            "/cam1/PICT0002.AVI",
+            "/cam1/PICT0003.AVI",
+        ]
+        assert all(video["inferred_from"] == "/cam1/PICT0001.AVI" for video in inferred)
+        assert all(video["max_animal_conf"] == 0.95 for video in inferred)
+        assert all(video["first_positive_timestamp"] is None for video in inferred)
+
+    def test_inconclusive_and_missing_representatives_are_scored(self):
+        scheduler = _scheduler()
+        remaining = ["/cam1/PICT0002.AVI", "/cam1/PICT0003.AVI"]
+
+        inconclusive = {"/cam1/PICT0001.AVI": _verdict("/cam1/PICT0001.AVI", 0.5)}
+
+        assert scheduler.remaining(inconclusive) == remaining
+        assert scheduler.remaining({}) == remaining
+        assert scheduler.inferred({}) == []
+
+    def test_all_policy_scores_every_video(self):
+        scheduler = _scheduler(GroupingPolicy.ALL.value)
+        verdicts = {"/cam1/PICT0001.AVI": _verdict("/cam1/PICT0001.AVI", 0.01)}
+
+        assert scheduler.remaining(verdicts) == [
+            "/cam1/PICT0002.AVI",
+            "/cam1/PICT0003.AVI",
+        ]
+        assert scheduler.inferred(verdicts) == []
+
+    def test_report_counts_frames_saved(self):
+        verdicts = {"/cam1/PICT0001.AVI": _verdict("/cam1/PICT0001.AVI", 0.01)}
+        frames = {
+            "/cam1/PICT0001.AVI": 10,
+            "/cam1/PICT0004.AVI": 10,
+            "/cam2/PICT0001.AVI": 10,
+        }
+
+        report = _scheduler().report(frames, verdicts)
+
+        assert report == (
+            "Event grouping: 3 events, 2 videos skipped, ~20 of ~50 frames saved "
+            "(40.0%)"
+        )
+
+
+class TestPreProEvents:
+    """pre_pro must only split the videos the scheduler asks for and infer the rest."""
+
+    @patch("main.create_detector")
+    @patch("main.Splitter")
+    def test_skipped_videos_inherit_the_representative_verdict(
+        self, mock_splitter_cls, mock_create_detector, tmp_path, caplog
+    ):
+        root = tmp_path / "videos"
+        (root / "cam1").mkdir(parents=True)
+        for name, mtime in (("PICT0001", 1000), ("PICT0002", 1030), ("PICT0003", 5000)):
+            path = root / "cam1" / f"{name}.AVI"
+            path.write_bytes(b"")
+            os.utime(path, (mtime, mtime))
+
+        split = []
+
+        def splitter(file_path, export_dir, backend):
+            split.append(os.path.basename(file_path))
+            frame = os.path.join(export_dir, f"{os.path.basename(file_path)}-000.jpeg")
+            Image.new("RGB", (16, 8)).save(frame)
+            instance = MagicMock()
+            instance.export_frames_to_jpeg.return_value = [
+                {"file": frame, "source": file_path, "frame_index": 0, "timestamp": 0.0}
+            ]
+            return instance
+
+        mock_splitter_cls.side_effect = splitter
+
+        def single_image_detection(image, img_path):
+            detections = MagicMock()
+            detections.xyxy, detections.confidence = [[0, 0, 1, 1]], [0.95]
+            detections.class_id = [1]
+            return {"img_id": img_path, "detections": detections}
+
+        mock_detector = MagicMock()
+        mock_detector.single_image_detection.side_effect = single_image_detection
+        mock_create_detector.return_value = mock_detector
+        caplog.set_level(logging.INFO)
+
+        output_json = pre_pro(str(root), PreProSettings(group_events=True))
+
+        videos = {
+            video["file"]: video for video in JSONParser(output_json).read()["videos"]
+        }
+        assert sorted(split) == ["PICT0001.AVI", "PICT0003.AVI"]
+        first = str(root.resolve() / "cam1" / "PICT0001.AVI")
+        second = str(root.resolve() / "cam1" / "PICT0002.AVI")
+        assert videos[second]["inferred_from"] == first
+        assert videos[second]["max_animal_conf"] == videos[first]["max_animal_conf"]
+        assert "2 events, 1 videos skipped, ~1 of ~3 frames saved" in caplog.text
+
+
+class TestArchiveMemberTimes:
+    """Archive must read member timestamps from the headers."""
+
+    def test_zip_and_tar_times(self, tmp_path):
+        zip_path = tmp_path / "season.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.writestr(
+                zipfile.ZipInfo("cam1/PICT0001.AVI", (2024, 5, 1, 12, 0, 0)), b""
+            )
+        tar_path = tmp_path / "season.tar"
+        with tarfile.open(tar_path, "w") as archive:
+            info = tarfile.TarInfo("cam1/PICT0001.AVI")
+            info.mtime = 1714564800
+            archive.addfile(info, io.BytesIO(b""))
+
+        zip_time = Archive(zip_path).member_times()["cam1/PICT0001.AVI"]
+
+        assert time.localtime(zip_time)[:6] == (2024, 5, 1, 12, 0, 0)
+        assert Archive(tar_path).member_times() == {"cam1/PICT0001.AVI": 1714564800.0}
@@ -0,0 +1,66 @@
+"""Tests for the ffmpeg rawvideo pipe backend of the Splitter."""
+
+import subprocess
+
+import pytest
+from moviepy.config import FFMPEG_BINARY
+from PIL import Image
+
+from grunz.splitter.splitter import Splitter, SplitterBackend
+
+
+@pytest.fixture(scope="module")
+def synthetic_avi(tmp_path_factory):
+    """A 5 second 320x240 MJPEG AVI generated by ffmpeg's test source."""
+    path = tmp_path_factory.mktemp("videos") / "MOVI0001.AVI"
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=320x240:rate=10:duration=5",
+            "-c:v",
+            "mjpeg",
+            str(path),
+        ],
+        check=True,
+    )
+    return str(path)
+
+
+class TestFfmpegBackend:
+    """The ffmpeg backend must sample, scale and record frames like moviepy does."""
+
+    def test_frames_are_sampled_at_fps_value(self, synthetic_avi, tmp_path):
+        splitter = Splitter(synthetic_avi, tmp_path, SplitterBackend.FFMPEG)
+
+        frames = splitter.export_frames_to_jpeg(1.0)
+
+        assert [f["timestamp"] for f in frames] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert all(Image.open(f["file"]).size == (320, 240) for f in frames)
+
+    def test_frames_are_scaled_inside_ffmpeg(self, synthetic_avi, tmp_path):
+        splitter = Splitter(synthetic_avi, tmp_path, "ffmpeg")
+
+        frames = splitter.export_frames_to_jpeg(1.0, max_size=160)
+
+        assert Image.open(frames[0]["file"]).size == (160, 120)
+        assert frames[0]["letterbox"]["scale"] == [0.5, 0.5]
+
+    def test_rgb_frames_reuse_one_buffer(self, synthetic_avi):
+        splitter = Splitter(synthetic_avi, backend=SplitterBackend.FFMPEG)
+
+        buffers = {id(rgb) for _, _, rgb in splitter.iter_rgb_frames(1.0, (320, 240))}
+
+        assert len(buffers) == 1
+
+    def test_unreadable_video_raises_ioerror(self, tmp_path):
+        corrupt = tmp_path / "PICT0001.AVI"
+        corrupt.write_bytes(b"not a video")
+
+        with pytest.raises(IOError):
+            Splitter(str(corrupt), tmp_path, "ffmpeg").export_frames_to_jpeg(1.0)
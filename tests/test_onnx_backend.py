@@ -0,0 +1,230 @@
+"""Tests for the ONNX Runtime detector backend."""
+
+import sys
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+import grunz.detector as detector_module
+from grunz.detector import (
+    MODEL_VERSION,
+    OnnxDetector,
+    _network_owner,
+    convert_result,
+    create_detector,
+    decode_yolo_output,
+    detector_input_size,
+    letterbox_image,
+    model_input_size,
+)
+
+
+def _head_output(boxes, class_scores):
+    """Build a raw (4 + classes, anchors) YOLO head output from cxcywh boxes."""
+    return np.concatenate(
+        [
+            np.array(boxes, dtype=np.float32).T,
+            np.array(class_scores, dtype=np.float32).T,
+        ]
+    )
+
+
+def _write_constant_model(path, output, size=640):
+    """Write an ONNX model returning `output` for every image of the given batch."""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [
+            helper.make_node(
+                "Constant",
+                [],
+                ["head"],
+                value=numpy_helper.from_array(output[np.newaxis]),
+            ),
+            helper.make_node(
+                "Constant",
+                [],
+                ["zero"],
+                value=numpy_helper.from_array(np.zeros((1, 1, 1), np.float32)),
+            ),
+            helper.make_node(
+                "ReduceMean", ["images"], ["mean"], axes=[1, 2, 3], keepdims=1
+            ),
+            helper.make_node("Squeeze", ["mean", "axes"], ["per_image"]),
+            helper.make_node("Mul", ["per_image", "zero"], ["batch_zeros"]),
+            helper.make_node("Add", ["batch_zeros", "head"], ["output"]),
+        ],
+        "constant_head",
+        [
+            helper.make_tensor_value_info(
+                "images", TensorProto.FLOAT, ["batch", 3, size, size]
+            )
+        ],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, None)],
+        [numpy_helper.from_array(np.array([3], np.int64), "axes")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return path
+
+
+class TestDecodeYoloOutput:
+    """decode_yolo_output must threshold, convert to xyxy and apply per-class NMS."""
+
+    def test_overlapping_boxes_of_one_class_are_suppressed(self):
+        output = _head_output(
+            [[100, 100, 50, 50], [102, 101, 50, 50], [400, 400, 20, 20]],
+            [[0.9, 0.0, 0.0], [0.8, 0.0, 0.0], [0.1, 0.0, 0.0]],
+        )
+
+        detections = decode_yolo_output(output)
+
+        np.testing.assert_allclose(detections.xyxy, [[75, 75, 125, 125]])
+        np.testing.assert_allclose(detections.confidence, [0.9])
+        assert detections.class_id.tolist() == [0]
+
+    def test_overlapping_boxes_of_different_classes_are_kept(self):
+        output = _head_output(
+            [[100, 100, 50, 50], [100, 100, 50, 50]],
+            [[0.9, 0.0, 0.0], [0.0, 0.8, 0.0]],
+        )
+
+        detections = decode_yolo_output(output)
+
+        assert detections.class_id.tolist() == [0, 1]
+
+
+class TestLetterboxImage:
+    """letterbox_image must centre the resized image on a square canvas."""
+
+    def test_landscape_image_is_padded_vertically(self):
+        tensor, letterbox = letterbox_image(np.zeros((720, 1280, 3), np.uint8), 640)
+
+        assert tensor.shape == (1, 3, 640, 640)
+        assert letterbox == {"scale": [0.5, 0.5], "pad": [0, 140]}
+        assert tensor[0, 0, 0, 0] == pytest.approx(114 / 255)
+        assert tensor[0, 0, 320, 320] == 0.0
+
+
+class TestOnnxDetector:
+    """OnnxDetector must return PytorchWildlife-shaped results in image pixels."""
+
+    def test_detections_are_mapped_back_to_image_pixels(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        output = _head_output([[320, 320, 100, 50]], [[0.95, 0.0, 0.0]])
+        model_path = _write_constant_model(tmp_path / "head.onnx", output)
+
+        detector = OnnxDetector(model_path)
+        result = detector.single_image_detection(
+            np.zeros((720, 1280, 3), np.uint8), img_path="frame.jpeg"
+        )
+        converted = convert_result(result)
+
+        assert converted["file"] == "frame.jpeg"
+        assert converted["max_detection_conf"] == pytest.approx(0.95)
+        assert converted["detections"][0]["bbox"] == pytest.approx([540, 310, 740, 410])
+
+    def test_batch_is_scored_in_one_call(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        output = _head_output([[320, 320, 100, 50]], [[0.95, 0.0, 0.0]])
+        detector = OnnxDetector(_write_constant_model(tmp_path / "head.onnx", output))
+        images = [np.zeros((640, 640, 3), np.uint8), np.zeros((720, 1280, 3), np.uint8)]
+
+        results = detector.detect_batch(images, ["a.jpeg", "b.jpeg"])
+
+        assert [result["img_id"] for result in results] == ["a.jpeg", "b.jpeg"]
+        np.testing.assert_allclose(
+            results[0]["detections"].xyxy, [[270, 295, 370, 345]]
+        )
+        np.testing.assert_allclose(
+            results[1]["detections"].xyxy, [[540, 310, 740, 410]]
+        )
+
+    def test_cached_artifact_is_loaded_without_export(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        output = _head_output([[320, 320, 100, 50]], [[0.95, 0.0, 0.0]])
+        _write_constant_model(tmp_path / f"{MODEL_VERSION}-640.onnx", output)
+
+        with patch("grunz.detector.export_onnx") as mock_export:
+            detector = create_detector("onnx", cache_dir=tmp_path)
+
+        mock_export.assert_not_called()
+        assert isinstance(detector, OnnxDetector)
+        assert detector.IMAGE_SIZE == 640
+
+    def test_export_is_cached_under_the_model_input_size(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        output = _head_output([[320, 320, 100, 50]], [[0.95, 0.0, 0.0]])
+        pytorch_wildlife = MagicMock()
+        pw_model = pytorch_wildlife.models.detection.MegaDetectorV6.return_value
+        pw_model.IMAGE_SIZE = 1280
+        modules = {
+            "PytorchWildlife": pytorch_wildlife,
+            "PytorchWildlife.models": pytorch_wildlife.models,
+        }
+
+        with (
+            patch.dict(sys.modules, modules),
+            patch.object(detector_module, "export_onnx") as mock_export,
+        ):
+            mock_export.side_effect = lambda model, path: _write_constant_model(
+                path, output, size=model.IMAGE_SIZE
+            )
+            detector = create_detector("onnx", cache_dir=tmp_path)
+
+        assert (tmp_path / f"{MODEL_VERSION}-1280.onnx").exists()
+        assert detector.IMAGE_SIZE == 1280
+
+    def test_model_input_size_is_read_from_the_cached_artifact(self, tmp_path):
+        (tmp_path / f"{MODEL_VERSION}-640.onnx").write_bytes(b"")
+        (tmp_path / "MDV6-yolov10-c-320.onnx").write_bytes(b"")
+
+        assert model_input_size("onnx", cache_dir=tmp_path) == 640
+
+    def test_quantized_artifact_is_cached_next_to_the_export(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        output = _head_output([[320, 320, 100, 50]], [[0.95, 0.0, 0.0]])
+        _write_constant_model(tmp_path / f"{MODEL_VERSION}-640.onnx", output)
+
+        create_detector("onnx", quantize=True, cache_dir=tmp_path)
+
+        assert (tmp_path / f"{MODEL_VERSION}-640.int8.onnx").exists()
+
+
+@pytest.fixture(scope="module")
+def pytorch_detector():
+    return create_detector()
+
+
+@pytest.fixture(scope="module")
+def onnx_detector(tmp_path_factory):
+    return create_detector("onnx", cache_dir=tmp_path_factory.mktemp("onnx"))
+
+
+@pytest.mark.integration
+class TestOnnxParity:
+    """The ONNX export must compute what the PyTorch network computes, at its size."""
+
+    def test_input_size_matches_pytorch_backend(self, pytorch_detector, onnx_detector):
+        assert onnx_detector.IMAGE_SIZE == detector_input_size(pytorch_detector)
+
+    def test_head_output_matches_pytorch_network(self, pytorch_detector, onnx_detector):
+        import torch
+
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        tensor, _ = letterbox_image(image, detector_input_size(pytorch_detector))
+
+        network = getattr(*_network_owner(pytorch_detector))
+        with torch.inference_mode():
+            expected = network(torch.from_numpy(tensor))
+        expected = expected[0] if isinstance(expected, (list, tuple)) else expected
+        actual = onnx_detector.session.run(None, {onnx_detector.input_name: tensor})[0]
+
+        assert actual.shape == tuple(expected.shape)
+        np.testing.assert_allclose(
+            actual, expected.float().numpy(), rtol=1e-3, atol=1e-2
+        )
@@ -0,0 +1,128 @@
+"""Tests for the metadata probe and run planner."""
+
+import subprocess
+from unittest.mock import patch
+
+import pytest
+from moviepy.config import FFMPEG_BINARY
+
+from grunz.planner.planner import JPEG_BYTES_PER_PIXEL, Planner
+from grunz.splitter.splitter import Splitter
+from main import plan
+
+
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    """Two 640x480 MJPEG AVIs of 10 and 5 seconds plus one corrupt AVI."""
+    root = tmp_path_factory.mktemp("videos")
+    for name, duration in (("PICT0001.AVI", 10), ("cam2/PICT0002.AVI", 5)):
+        path = root / name
+        path.parent.mkdir(exist_ok=True)
+        subprocess.run(
+            [
+                FFMPEG_BINARY,
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "lavfi",
+                "-i",
+                f"testsrc2=size=640x480:rate=5:duration={duration}",
+                "-c:v",
+                "mjpeg",
+                str(path),
+            ],
+            check=True,
+        )
+    (root / "PICT0003.AVI").write_bytes(b"RIFF" + bytes(100))
+    return root
+
+
+class TestProbeMetadata:
+    """Splitter must read duration, size and fps from the header alone."""
+
+    def test_header_metadata(self, archive):
+        metadata = Splitter.probe_metadata(str(archive / "PICT0001.AVI"))
+
+        assert metadata["size"] == (640, 480)
+        assert metadata["duration"] == pytest.approx(10.0, abs=0.1)
+        assert metadata["fps"] == 5
+
+    def test_frame_count_matches_the_moviepy_sampling(self):
+        assert Splitter.frame_count(6.0, 0.4) == 3
+        assert Splitter.frame_count(60.0, 0.4) == 24
+
+
+class TestPlanner:
+    """Planner must estimate the run and flag unreadable videos before decoding."""
+
+    def test_estimates_frames_scratch_and_runtime(self, archive):
+        planner = Planner(1.0, split_throughput=4.0, detect_throughput=2.0)
+
+        run = planner.plan(sorted(str(path) for path in archive.rglob("*.AVI")))
+
+        assert [video["frames"] for video in run["videos"]] == [10, 5]
+        assert run["frames"] == 15
+        assert run["scratch_bytes"] == int(15 * 640 * 480 * JPEG_BYTES_PER_PIXEL)
+        assert run["largest_video_bytes"] == int(10 * 640 * 480 * JPEG_BYTES_PER_PIXEL)
+        assert run["runtime_seconds"] == 7.5
+
+    def test_unreadable_videos_are_flagged(self, archive):
+        run = Planner(1.0).plan(
+            [str(archive / "PICT0003.AVI"), str(archive / "missing.AVI")]
+        )
+
+        assert run["videos"] == []
+        assert [video["file"] for video in run["unreadable"]] == [
+            str(archive / "PICT0003.AVI"),
+            str(archive / "missing.AVI"),
+        ]
+        assert all(video["error"] for video in run["unreadable"])
+
+    def test_downscaled_decode_shrinks_the_scratch_estimate(self, archive):
+        video = Planner(1.0, max_size=320).probe(str(archive / "PICT0001.AVI"))
+
+        assert video["scratch_bytes"] == int(10 * 320 * 240 * JPEG_BYTES_PER_PIXEL)
+
+    @patch("grunz.planner.planner.Splitter.probe_metadata")
+    def test_headers_without_duration_are_flagged(self, mock_probe_metadata):
+        mock_probe_metadata.return_value = {
+            "duration": None,
+            "size": (640, 480),
+            "fps": None,
+        }
+
+        assert Planner(1.0).probe("PICT0004.AVI")["error"] == "no duration in header"
+
+
+class TestPlanReport:
+    """plan must report the run without decoding a frame."""
+
+    @patch("grunz.splitter.splitter.VideoFileClip")
+    def test_report_lists_totals_and_unreadable_videos(
+        self, mock_clip_cls, archive, caplog
+    ):
+        report = plan(str(archive), split_throughput=1.0, detect_throughput=1.0)
+
+        assert "Videos:           2 (1 unreadable)" in report
+        assert "Frames:           6 at 0.4 fps" in report
+        assert "Expected runtime: 0:00:06" in report
+        assert str(archive / "PICT0003.AVI") in report.split("Unreadable:")[1]
+        assert any(
+            "PICT0003.AVI could not be read" in r.message for r in caplog.records
+        )
+        mock_clip_cls.assert_not_called()
+
+    @patch("main.model_input_size", return_value=320)
+    def test_frames_are_sized_for_the_selected_backend(self, mock_input_size, archive):
+        report = plan(
+            str(archive),
+            decode_at_detector_size=True,
+            detector_backend="onnx",
+            split_throughput=1.0,
+            detect_throughput=1.0,
+        )
+
+        mock_input_size.assert_called_once_with("onnx")
+        scratch_bytes = 6 * 320 * 240 * JPEG_BYTES_PER_PIXEL
+        assert f"Scratch written:  {scratch_bytes / 2 ** 20:.1f} MiB" in report
@@ -0,0 +1,145 @@
+"""Tests for the per-stage CPU and memory profiler."""
+
+import pstats
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from grunz.profiler.profiler import StageProfiler
+from main import PreProSettings, pre_pro
+
+
+def _allocate(size):
+    return [bytearray(1024) for _ in range(size)]
+
+
+class TestStageProfiler:
+    """StageProfiler must time every call and profile one in `sample_every`."""
+
+    def test_one_in_sample_every_calls_is_profiled(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=3)
+
+        for _ in range(7):
+            with profiler.stage("detect"):
+                _allocate(10)
+        profiler.write()
+
+        report = (tmp_path / "allocations.txt").read_text().splitlines()
+        assert report[1].split()[:3] == ["detect", "7", "3"]
+
+    def test_dumps_hold_the_profiled_functions(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=1)
+
+        with profiler.stage("split"):
+            _allocate(10)
+        profiler.write()
+
+        stats = pstats.Stats(str(tmp_path / "split.prof"))
+        assert any(function == "_allocate" for _, _, function in stats.stats)
+
+    def test_report_lists_the_sites_retaining_memory(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=1, top=5)
+        retained = []
+
+        with profiler.stage("load"):
+            retained.extend(_allocate(200))
+        profiler.write()
+
+        report = (tmp_path / "allocations.txt").read_text()
+        assert "Top 5 allocation sites" in report
+        assert "test_profiler.py" in report
+
+    def test_allocations_of_concurrent_stages_are_reported_by_site(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=1, top=5)
+        retained = []
+        inside, release = threading.Event(), threading.Event()
+
+        def split():
+            inside.wait()
+            retained.extend(_allocate(500))
+            release.set()
+
+        thread = threading.Thread(target=split)
+        thread.start()
+        with profiler.stage("detect"):
+            inside.set()
+            release.wait()
+        thread.join()
+        profiler.write()
+
+        report = (tmp_path / "allocations.txt").read_text()
+        assert "includes stages running concurrently" in report
+        assert "detect:" not in report
+        assert "test_profiler.py" in report.split("from every thread")[1]
+
+    def test_overlapping_samples_are_only_timed(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=1)
+        inside, release = threading.Event(), threading.Event()
+
+        def load():
+            with profiler.stage("load"):
+                inside.set()
+                release.wait()
+
+        thread = threading.Thread(target=load)
+        thread.start()
+        inside.wait()
+        with profiler.stage("detect"):
+            pass
+        release.set()
+        thread.join()
+        profiler.write()
+
+        assert not (tmp_path / "detect.prof").exists()
+        assert (tmp_path / "load.prof").exists()
+
+    def test_wrap_runs_the_function_as_a_stage(self, tmp_path):
+        profiler = StageProfiler(tmp_path, sample_every=1)
+
+        assert profiler.wrap("load", _allocate)(2)[0] == bytearray(1024)
+        profiler.write()
+
+        assert (tmp_path / "load.prof").exists()
+
+
+class TestPreProProfile:
+    """pre_pro must write the profile of each stage next to the output JSON."""
+
+    @patch("main.create_detector")
+    def test_profile_is_written_next_to_the_output(
+        self, mock_create_detector, tmp_path, fake_detector
+    ):
+        root = tmp_path / "stills"
+        root.mkdir()
+        for index in range(3):
+            Image.new("RGB", (16, 8)).save(root / f"IMG000{index}.JPG")
+
+        mock_create_detector.return_value = fake_detector
+
+        output_json = pre_pro(
+            str(root),
+            PreProSettings(input_mode="stills", profile=True, profile_every=1),
+        )
+
+        profile_dir = Path(output_json).with_name(f"{Path(output_json).stem}-profile")
+        assert {path.name for path in profile_dir.iterdir()} == {
+            "load.prof",
+            "detect.prof",
+            "write.prof",
+            "allocations.txt",
+        }
+
+    @patch("main.StageProfiler")
+    @patch("main.create_detector")
+    def test_nothing_is_profiled_by_default(
+        self, mock_create_detector, mock_profiler_cls, tmp_path
+    ):
+        root = tmp_path / "stills"
+        root.mkdir()
+        mock_create_detector.return_value = MagicMock()
+
+        pre_pro(str(root), PreProSettings(input_mode="stills"))
+
+        mock_profiler_cls.assert_not_called()
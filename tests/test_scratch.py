@@ -0,0 +1,170 @@
+"""Tests for scratch-directory frame storage with bounded disk usage."""
+
+import json
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from grunz.scratch.scratch import Scratch
+from main import PreProSettings, SplitContext, _iter_split_frames, pre_pro
+
+
+class TestScratchAccounting:
+    """Scratch must track the bytes held and delete frames on release."""
+
+    def test_run_directory_is_removed_on_exit(self, tmp_path):
+        with Scratch(tmp_path) as scratch:
+            run_directory = scratch.run_directory
+            assert run_directory.parent == tmp_path
+            (run_directory / "frame.jpeg").write_bytes(b"x")
+
+        assert not run_directory.exists()
+
+    def test_release_deletes_frame_and_frees_bytes(self, tmp_path):
+        with Scratch(tmp_path) as scratch:
+            frame = scratch.run_directory / "frame.jpeg"
+            frame.write_bytes(b"x" * 10)
+
+            scratch.add([str(frame)])
+            assert scratch.used_bytes == 10
+
+            scratch.release(str(frame))
+            assert scratch.used_bytes == 0
+            assert not frame.exists()
+
+    def test_wait_for_space_blocks_until_release(self, tmp_path):
+        with Scratch(tmp_path, quota_bytes=5) as scratch:
+            frame = scratch.run_directory / "frame.jpeg"
+            frame.write_bytes(b"x" * 10)
+            scratch.add([str(frame)])
+
+            waiter = threading.Thread(target=scratch.wait_for_space)
+            waiter.start()
+            waiter.join(timeout=0.2)
+            assert waiter.is_alive()
+
+            scratch.release(str(frame))
+            waiter.join(timeout=2)
+            assert not waiter.is_alive()
+
+
+class TestPreProScratch:
+    """pre_pro must split into scratch and delete each frame once it is scored."""
+
+    @patch("main.create_detector")
+    @patch("main.Splitter")
+    @patch("main.FileUtils")
+    def test_frames_are_written_to_scratch_and_deleted(
+        self,
+        mock_file_utils_cls,
+        mock_splitter_cls,
+        mock_create_detector,
+        tmp_path,
+        fake_detector,
+    ):
+        mock_fu = MagicMock()
+        mock_fu.find_files_recursively.return_value = ["/videos/PICT0001.AVI"]
+        mock_fu.create_json_output_file.return_value = str(tmp_path / "out.json")
+        mock_file_utils_cls.return_value = mock_fu
+
+        written = []
+
+        def make_splitter(file_path, export_dir, *args):
+            def export(fps_value, max_size=None):
+                frame = Path(export_dir) / "PICT0001.AVI-000.jpeg"
+                Image.new("RGB", (8, 8)).save(frame)
+                written.append(frame)
+                return [
+                    {
+                        "file": str(frame),
+                        "source": file_path,
+                        "frame_index": 0,
+                        "timestamp": 0.0,
+                    }
+                ]
+
+            splitter = MagicMock()
+            splitter.export_frames_to_jpeg.side_effect = export
+            return splitter
+
+        mock_splitter_cls.side_effect = make_splitter
+
+        mock_create_detector.return_value = fake_detector
+
+        scratch_directory = tmp_path / "scratch"
+        pre_pro(str(tmp_path), PreProSettings(scratch_directory=str(scratch_directory)))
+
+        assert written and written[0].is_relative_to(scratch_directory)
+        assert not any(path.exists() for path in written)
+        output = json.loads((tmp_path / "out.json").read_text())
+        assert output["images"][0]["source"] == "/videos/PICT0001.AVI"
+
+    @patch("main.create_detector")
+    @patch("main.Splitter")
+    @patch("main.FileUtils")
+    def test_unreadable_frames_are_released(
+        self, mock_file_utils_cls, mock_splitter_cls, mock_create_detector, tmp_path
+    ):
+        videos = [f"/videos/PICT000{index}.AVI" for index in range(4)]
+        mock_fu = MagicMock()
+        mock_fu.find_files_recursively.return_value = videos
+        mock_fu.create_json_output_file.return_value = str(tmp_path / "out.json")
+        mock_file_utils_cls.return_value = mock_fu
+
+        written = []
+
+        def make_splitter(file_path, export_dir, *args):
+            def export(fps_value, max_size=None):
+                frame = Path(export_dir) / f"{Path(file_path).name}-000.jpeg"
+                frame.write_bytes(b"not a jpeg")
+                written.append(frame)
+                return [{"file": str(frame), "source": file_path, "frame_index": 0}]
+
+            splitter = MagicMock()
+            splitter.export_frames_to_jpeg.side_effect = export
+            return splitter
+
+        mock_splitter_cls.side_effect = make_splitter
+        # Two frames fit the quota, so the prefetcher still has a batch to look ahead
+        # at.
+        # Frames that are never released would stall splitting at the quota for good.
+        settings = PreProSettings(
+            scratch_directory=str(tmp_path / "scratch"), scratch_quota_bytes=25
+        )
+
+        run = threading.Thread(
+            target=pre_pro, args=(str(tmp_path), settings), daemon=True
+        )
+        run.start()
+        run.join(timeout=30)
+
+        assert not run.is_alive()
+        assert len(written) == 4
+        assert not any(path.exists() for path in written)
+        mock_create_detector.return_value.single_image_detection.assert_not_called()
+
+
+class TestSplitErrors:
+    """Errors that end the split must reach the consumer instead of ending the run."""
+
+    @patch("main.Splitter")
+    def test_unexpected_errors_are_raised_by_the_consumer(
+        self, mock_splitter_cls, tmp_path
+    ):
+        mock_splitter_cls.return_value.export_frames_to_jpeg.side_effect = [
+            [{"file": str(tmp_path / "frame.jpeg")}],
+            KeyError("video_size"),
+            [{"file": str(tmp_path / "other.jpeg")}],
+        ]
+        frames = _iter_split_frames(
+            ["/videos/PICT0001.AVI", "/videos/PICT0002.AVI", "/videos/PICT0003.AVI"],
+            SplitContext(MagicMock(run_directory=tmp_path)),
+        )
+
+        assert next(frames) == {"file": str(tmp_path / "frame.jpeg")}
+        with pytest.raises(KeyError, match="video_size"):
+            next(frames)
+        assert mock_splitter_cls.call_count == 2
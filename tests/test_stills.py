@@ -0,0 +1,89 @@
+"""Tests for the still-image input mode and the prefetching loader."""
+
+import json
+from unittest.mock import patch
+
+from PIL import Image
+
+from grunz.loader.loader import Prefetcher
+from main import PreProSettings, pre_pro
+
+
+def _write_jpeg(path, color=(0, 0, 0)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (16, 8), color).save(path)
+    return str(path)
+
+
+class TestPrefetcher:
+    """Prefetcher must decode ahead of the consumer and keep the frame mapping."""
+
+    def test_images_are_yielded_in_order_with_their_frames(self, tmp_path):
+        frames = [
+            {"file": _write_jpeg(tmp_path / f"{i}.jpeg", (i * 50, 0, 0))}
+            for i in range(5)
+        ]
+
+        loaded = list(Prefetcher(frames, batch_size=2))
+
+        assert [frame for frame, _ in loaded] == frames
+        assert [round(int(image[0, 0, 0]) / 50) for _, image in loaded] == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+        assert loaded[0][1].shape == (8, 16, 3)
+
+    def test_next_batch_is_requested_before_the_first_image_is_consumed(self, tmp_path):
+        pulled = []
+
+        def frames():
+            for i in range(6):
+                pulled.append(i)
+                yield {"file": _write_jpeg(tmp_path / f"{i}.jpeg")}
+
+        iterator = iter(Prefetcher(frames(), batch_size=2))
+        next(iterator)
+
+        assert len(pulled) == 4
+
+    def test_unreadable_image_is_skipped_and_logged(self, tmp_path, caplog):
+        corrupt = tmp_path / "corrupt.jpeg"
+        corrupt.write_bytes(b"not a jpeg")
+        frames = [{"file": str(corrupt)}, {"file": _write_jpeg(tmp_path / "ok.jpeg")}]
+
+        skipped = []
+
+        loaded = list(Prefetcher(frames, on_skip=skipped.append))
+
+        assert [frame["file"] for frame, _ in loaded] == [frames[1]["file"]]
+        assert skipped == frames[:1]
+        assert any("corrupt.jpeg" in record.message for record in caplog.records)
+
+
+class TestPreProStills:
+    """pre_pro in stills mode must score stills directly and keep them in place."""
+
+    @patch("main.create_detector")
+    def test_stills_are_scored_with_their_source(
+        self, mock_create_detector, tmp_path, fake_detector
+    ):
+        root = tmp_path / "stills"
+        _write_jpeg(root / "cam1" / "IMG0001.JPG")
+        _write_jpeg(root / "cam2" / "IMG0002.jpeg")
+
+        mock_create_detector.return_value = fake_detector
+
+        output_json = pre_pro(str(root), PreProSettings(input_mode="stills"))
+
+        output = json.loads(open(output_json).read())
+        sources = [image["source"] for image in output["images"]]
+        assert sources == [
+            str(root.resolve() / "cam1" / "IMG0001.JPG"),
+            str(root.resolve() / "cam2" / "IMG0002.jpeg"),
+        ]
+        assert [video["file"] for video in output["videos"]] == sources
+        assert (root / "cam1" / "IMG0001.JPG").exists()
+        assert (root / "cam2" / "IMG0002.jpeg").exists()
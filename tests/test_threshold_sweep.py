@@ -0,0 +1,146 @@
+"""Tests for the multi-threshold sweep report."""
+
+import json
+from unittest.mock import patch
+
+from grunz.json_parser.json_parser import Categories, JSONParser, open_json
+from main import sweep
+
+
+def _image(source, frame_index, detections):
+    return {
+        "file": f"/scratch/frame-{frame_index:03d}.jpeg",
+        "max_detection_conf": max((conf for _, conf in detections), default=0.0),
+        "detections": [
+            {"category": str(category), "conf": conf, "bbox": [0, 0, 1, 1]}
+            for category, conf in detections
+        ],
+        "source": source,
+        "frame_index": frame_index,
+    }
+
+
+def _write_json(tmp_path, images):
+    path = tmp_path / "output.json"
+    path.write_text(json.dumps({"images": images}))
+    return str(path)
+
+
+IMAGES = [
+    _image("/videos/PICT0001.AVI", 0, [(1, 0.75)]),
+    _image("/videos/PICT0001.AVI", 1, [(1, 0.92), (2, 0.95)]),
+    _image("/videos/PICT0002.AVI", 0, [(1, 0.85)]),
+    _image("/videos/PICT0003.AVI", 0, []),
+    _image("/videos/PICT0003.AVI", 1, [(2, 0.6)]),
+]
+
+
+class TestSweepThresholds:
+    """Positive counts must match a separate post pro run at each threshold."""
+
+    def test_counts_images_and_videos_at_each_threshold(self, tmp_path):
+        parser = JSONParser(_write_json(tmp_path, IMAGES))
+
+        rows = parser.sweep_thresholds([0.7, 0.85, 0.9, 0.95])
+
+        assert [(r["positive_images"], r["positive_videos"]) for r in rows] == [
+            (3, 2),
+            (2, 2),
+            (1, 1),
+            (0, 0),
+        ]
+
+    def test_thresholds_are_inclusive_like_post_pro(self, tmp_path):
+        parser = JSONParser(_write_json(tmp_path, IMAGES))
+
+        (row,) = parser.sweep_thresholds([0.85])
+
+        assert row["positive_images"] == len(parser.filter_json_for_detection_results())
+        assert row["positive_videos"] == len(parser.filter_json_for_positive_videos())
+
+    def test_reports_every_category(self, tmp_path):
+        parser = JSONParser(_write_json(tmp_path, IMAGES))
+
+        rows = parser.sweep_thresholds([0.5], [Categories.ANIMAL, Categories.PERSON])
+
+        assert [
+            (r["category"], r["positive_images"], r["positive_videos"]) for r in rows
+        ] == [
+            ("animal", 3, 2),
+            ("person", 2, 2),
+        ]
+
+    def test_reads_the_json_once(self, tmp_path):
+        parser = JSONParser(_write_json(tmp_path, IMAGES))
+
+        with patch(
+            "grunz.json_parser.json_parser.open_json", wraps=open_json
+        ) as mock_open:
+            parser.sweep_thresholds([0.7, 0.8, 0.85, 0.9], list(Categories))
+
+        assert mock_open.call_count == 1
+
+    def test_videos_inferred_by_event_grouping_are_counted(self, tmp_path):
+        path = tmp_path / "output.json"
+        inferred = {
+            "file": "/videos/PICT0004.AVI",
+            "max_animal_conf": 0.92,
+            "positive_frames": 2,
+            "first_positive_timestamp": None,
+            "inferred_from": "/videos/PICT0001.AVI",
+        }
+        videos = JSONParser.summarise_videos(IMAGES) + [inferred]
+        path.write_text(json.dumps({"images": IMAGES, "videos": videos}))
+        parser = JSONParser(str(path))
+
+        rows = parser.sweep_thresholds(
+            [0.85, 0.9], [Categories.ANIMAL, Categories.PERSON]
+        )
+
+        assert [(r["category"], r["positive_videos"]) for r in rows] == [
+            ("animal", 3),
+            ("animal", 2),
+            ("person", 2),
+            ("person", 2),
+        ]
+        assert rows[0]["positive_videos"] == len(
+            parser.filter_json_for_positive_videos()
+        )
+
+    def test_videos_without_provenance_are_recovered_from_jpeg_names(self, tmp_path):
+        images = [
+            {
+                "file": "/videos/PICT0001.AVI-001.jpeg",
+                "detections": [{"category": "1", "conf": 0.9, "bbox": [0, 0, 1, 1]}],
+            },
+            {
+                "file": "/videos/PICT0001.AVI-002.jpeg",
+                "detections": [{"category": "1", "conf": 0.95, "bbox": [0, 0, 1, 1]}],
+            },
+        ]
+        parser = JSONParser(_write_json(tmp_path, images))
+
+        (row,) = parser.sweep_thresholds([0.85])
+
+        assert row["positive_images"] == 2
+        assert row["positive_videos"] == 1
+
+
+class TestSweepTable:
+    """The sweep command must print a table and copy nothing."""
+
+    @patch("main.FileUtils")
+    def test_prints_one_row_per_category_and_threshold(
+        self, mock_file_utils_cls, tmp_path
+    ):
+        table = sweep(_write_json(tmp_path, IMAGES), [0.9, 0.7], ["animal", "person"])
+
+        lines = table.splitlines()
+        assert lines[0].split() == ["category", "threshold", "images", "videos"]
+        assert [line.split() for line in lines[1:]] == [
+            ["animal", "0.700", "3", "2"],
+            ["animal", "0.900", "1", "1"],
+            ["person", "0.700", "1", "1"],
+            ["person", "0.900", "1", "1"],
+        ]
+        mock_file_utils_cls.assert_not_called()
@@ -0,0 +1,128 @@
+"""Tests for frame provenance and per-video verdicts in pre and post pro."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from grunz.detector import convert_result
+from grunz.json_parser.json_parser import JSONParser
+from grunz.splitter.splitter import Splitter
+from main import post_pro
+
+
+def _make_frame_result(source, frame_index, timestamp, category, confidence):
+    return {
+        "file": f"/scratch/frame-{frame_index:03d}.jpeg",
+        "max_detection_conf": confidence,
+        "detections": [
+            {"category": str(category), "conf": confidence, "bbox": [0, 0, 1, 1]}
+        ],
+        "source": source,
+        "frame_index": frame_index,
+        "timestamp": timestamp,
+    }
+
+
+class TestSplitterProvenance:
+    """export_frames_to_jpeg must return the provenance of every JPEG it writes."""
+
+    @patch("grunz.splitter.splitter.VideoFileClip")
+    def test_frame_records_hold_source_index_and_timestamp(self, mock_clip_cls):
+        mock_clip = MagicMock()
+        mock_clip.duration = 6.0
+        mock_clip_cls.return_value = mock_clip
+
+        frames = Splitter("/videos/cam1/MOVI0001.AVI").export_frames_to_jpeg(0.4)
+
+        assert [f["frame_index"] for f in frames] == [0, 1, 2]
+        assert [f["timestamp"] for f in frames] == [0.0, 2.5, 5.0]
+        assert all(f["source"] == "/videos/cam1/MOVI0001.AVI" for f in frames)
+        assert mock_clip.save_frame.call_count == 3
+        mock_clip.close.assert_called_once()
+
+
+class TestConvertResultProvenance:
+    """convert_result must carry the frame provenance into the image entry."""
+
+    def test_provenance_keys_are_copied_from_frame(self):
+        detections = MagicMock()
+        detections.xyxy = np.array([[1.0, 2.0, 3.0, 4.0]])
+        detections.confidence = np.array([0.9])
+        detections.class_id = np.array([1])
+        frame = {
+            "file": "/scratch/a-000.jpeg",
+            "source": "/videos/MOVI0001.AVI",
+            "frame_index": 0,
+            "timestamp": 0.0,
+        }
+
+        result = convert_result(
+            {"img_id": frame["file"], "detections": detections}, frame
+        )
+
+        assert result["source"] == "/videos/MOVI0001.AVI"
+        assert result["frame_index"] == 0
+        assert result["timestamp"] == 0.0
+
+
+class TestSummariseVideos:
+    """summarise_videos must produce one verdict per source video."""
+
+    def test_verdict_fields_are_aggregated_per_video(self):
+        images = [
+            _make_frame_result("/v/A.AVI", 0, 0.0, category=1, confidence=0.5),
+            _make_frame_result("/v/A.AVI", 1, 2.5, category=1, confidence=0.95),
+            _make_frame_result("/v/A.AVI", 2, 5.0, category=1, confidence=0.90),
+            _make_frame_result("/v/B.AVI", 0, 0.0, category=2, confidence=0.99),
+        ]
+
+        videos = JSONParser.summarise_videos(images)
+
+        assert videos == [
+            {
+                "file": "/v/A.AVI",
+                "max_animal_conf": 0.95,
+                "positive_frames": 2,
+                "first_positive_timestamp": 2.5,
+            },
+            {
+                "file": "/v/B.AVI",
+                "max_animal_conf": 0.0,
+                "positive_frames": 0,
+                "first_positive_timestamp": None,
+            },
+        ]
+
+    def test_legacy_images_fall_back_to_jpeg_name(self):
+        image = _make_frame_result(None, 0, None, category=1, confidence=0.9)
+        del image["source"]
+        image["file"] = "data/PICT0001.AVI-001.jpeg"
+
+        videos = JSONParser.summarise_videos([image])
+
+        assert videos[0]["file"] == "data/PICT0001.AVI"
+        assert videos[0]["positive_frames"] == 1
+
+
+class TestPostProReadsVerdicts:
+    """post_pro must copy positive videos using the recorded verdicts."""
+
+    def test_non_pict_video_names_are_copied(self, tmp_path):
+        video = tmp_path / "cam1" / "MOVI0042.AVI"
+        video.parent.mkdir()
+        video.write_bytes(b"avi")
+        images = [_make_frame_result(str(video), 0, 0.0, category=1, confidence=0.95)]
+        json_path = tmp_path / "out.json"
+        json_path.write_text(
+            json.dumps(
+                {"images": images, "videos": JSONParser.summarise_videos(images)}
+            )
+        )
+
+        post_pro(str(json_path), output_dir=tmp_path / "sorted")
+
+        copied = list(
+            (tmp_path / "sorted" / "positive_detection").rglob("MOVI0042.AVI")
+        )
+        assert len(copied) == 1
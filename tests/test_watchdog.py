@@ -0,0 +1,185 @@
+"""Tests for the split watchdog and the quarantine list."""
+
+import os
+import queue
+import signal
+import subprocess
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from moviepy.config import FFMPEG_BINARY
+
+from grunz.watchdog.watchdog import (
+    Quarantine,
+    SplitTimeout,
+    SplitWatchdog,
+    _group_cpu_seconds,
+)
+from main import SplitContext, _split_videos
+
+
+@pytest.fixture(scope="module")
+def synthetic_avi(tmp_path_factory):
+    path = tmp_path_factory.mktemp("videos") / "PICT0001.AVI"
+    subprocess.run(
+        [
+            FFMPEG_BINARY,
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=160x120:rate=5:duration=3",
+            "-c:v",
+            "mjpeg",
+            str(path),
+        ],
+        check=True,
+    )
+    return str(path)
+
+
+class TestSplitWatchdog:
+    """SplitWatchdog must return the frames of healthy videos and kill hung ones."""
+
+    def test_frames_are_returned_from_the_subprocess(self, synthetic_avi, tmp_path):
+        watchdog = SplitWatchdog(wall_timeout=60)
+
+        frames = watchdog.export_frames_to_jpeg(synthetic_avi, tmp_path, "ffmpeg", 1.0)
+
+        assert [frame["frame_index"] for frame in frames] == [0, 1, 2]
+        assert all(os.path.exists(frame["file"]) for frame in frames)
+
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+    def test_hung_split_is_killed_at_the_wall_clock_timeout(self, tmp_path):
+        # Opening a named pipe nobody writes to blocks ffmpeg forever.
+        hung_avi = tmp_path / "PICT0002.AVI"
+        os.mkfifo(hung_avi)
+        watchdog = SplitWatchdog(wall_timeout=1)
+
+        start = time.monotonic()
+        with pytest.raises(SplitTimeout, match="within 1 seconds"):
+            watchdog.export_frames_to_jpeg(str(hung_avi), tmp_path, "moviepy", 1.0)
+
+        assert time.monotonic() - start < 30
+
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+    @patch("grunz.watchdog.watchdog._group_cpu_seconds", return_value=2.5)
+    def test_busy_process_group_is_killed_at_the_cpu_timeout(self, _cpu, tmp_path):
+        hung_avi = tmp_path / "PICT0002.AVI"
+        os.mkfifo(hung_avi)
+        watchdog = SplitWatchdog(cpu_timeout=2)
+
+        with pytest.raises(SplitTimeout, match="within 2 CPU seconds"):
+            watchdog.export_frames_to_jpeg(str(hung_avi), tmp_path, "ffmpeg", 1.0)
+
+    def test_failed_split_raises_ioerror(self, tmp_path):
+        corrupt = tmp_path / "PICT0003.AVI"
+        corrupt.write_bytes(b"RIFF" + bytes(100))
+
+        with pytest.raises(IOError, match="could not be split") as raised:
+            SplitWatchdog(wall_timeout=60).export_frames_to_jpeg(
+                str(corrupt), tmp_path, "ffmpeg"
+            )
+
+        assert not isinstance(raised.value, SplitTimeout)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="needs /proc")
+class TestGroupCpuSeconds:
+    """The CPU time of a job must include its children."""
+
+    def test_children_are_counted(self):
+        busy = f"{sys.executable} -c 'import time; end = time.process_time() + 1; "
+        busy += 'exec("while time.process_time() < end: pass")\''
+        group = subprocess.Popen(
+            ["sh", "-c", f"{busy} & {busy}; wait; sleep 30"], start_new_session=True
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while _group_cpu_seconds(group.pid) < 1.8 and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+            assert _group_cpu_seconds(group.pid) >= 1.8
+        finally:
+            os.killpg(group.pid, signal.SIGKILL)
+            group.wait()
+
+
+class TestKill:
+    """Jobs that have not made their own process group yet must still be killed."""
+
+    @patch("grunz.watchdog.watchdog.os.killpg", side_effect=ProcessLookupError)
+    def test_falls_back_to_killing_the_job(self, _killpg):
+        process = MagicMock(exitcode=None)
+
+        SplitWatchdog._SplitWatchdog__kill(process)
+
+        process.kill.assert_called_once()
+
+
+class TestQuarantine:
+    """Quarantine must persist timed out videos between runs."""
+
+    def test_entries_survive_a_reload(self, tmp_path):
+        list_path = tmp_path / "quarantine.txt"
+        Quarantine(list_path).add("/videos/PICT0001.AVI", "not split\nwithin 1 seconds")
+
+        quarantine = Quarantine(list_path)
+
+        assert "/videos/PICT0001.AVI" in quarantine
+        assert (
+            quarantine.entries["/videos/PICT0001.AVI"] == "not split within 1 seconds"
+        )
+
+    def test_removed_entries_are_unlisted(self, tmp_path):
+        list_path = tmp_path / "quarantine.txt"
+        quarantine = Quarantine(list_path)
+        quarantine.add("/videos/PICT0001.AVI", "timeout")
+
+        quarantine.remove("/videos/PICT0001.AVI")
+
+        assert len(Quarantine(list_path)) == 0
+
+
+class TestSplitVideosWithWatchdog:
+    """Timed out videos must be logged like unreadable ones and quarantined."""
+
+    def test_timed_out_video_is_quarantined_and_the_rest_split(self, tmp_path, caplog):
+        scratch = MagicMock(run_directory=tmp_path)
+        watchdog = MagicMock()
+        watchdog.export_frames_to_jpeg.side_effect = [
+            SplitTimeout("/videos/PICT0001.AVI was not split within 5 seconds"),
+            [{"file": str(tmp_path / "frame.jpeg")}],
+        ]
+        quarantine = Quarantine(tmp_path / "quarantine.txt")
+        frame_queue = queue.Queue()
+
+        _split_videos(
+            ["/videos/PICT0001.AVI", "/videos/PICT0002.AVI"],
+            SplitContext(scratch, watchdog=watchdog, quarantine=quarantine),
+            frame_queue,
+        )
+
+        assert frame_queue.get() == {"file": str(tmp_path / "frame.jpeg")}
+        assert frame_queue.get() is None
+        assert "/videos/PICT0001.AVI" in quarantine
+        assert "/videos/PICT0002.AVI" not in quarantine
+        assert any(
+            "PICT0001.AVI could not be read" in r.message for r in caplog.records
+        )
+
+    @patch("main.Splitter")
+    def test_videos_are_split_in_process_without_a_watchdog(
+        self, mock_splitter_cls, tmp_path
+    ):
+        mock_splitter_cls.return_value.export_frames_to_jpeg.return_value = []
+
+        context = SplitContext(MagicMock(run_directory=tmp_path))
+
+        _split_videos(["/videos/PICT0001.AVI"], context, queue.Queue())
+
+        mock_splitter_cls.assert_called_once()